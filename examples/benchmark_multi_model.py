@@ -0,0 +1,64 @@
+'''
+==================================
+Benchmark the Multi-Model Training
+==================================
+In this example, we compare the time of training several models one after another with the
+time of training them together on the batches of one generator (MultiModelTrainer), which
+samples and converts every batch once for all the models.
+
+    $ python benchmark_multi_model.py -ds freebase15k -l 2 -b 1024
+'''
+# License: MIT
+
+import sys
+import timeit
+
+from pykg2vec.utils.kgcontroller import KnowledgeGraph
+from pykg2vec.config.config import Importer, KGEArgParser
+from pykg2vec.utils.multimodel import MultiModelTrainer
+from pykg2vec.utils.trainer import Trainer
+
+NAMES = ["transe", "transh", "transr"]
+
+
+def create_models(args):
+    """Function to create the models with the settings of the command line, without evaluation and exports."""
+    models = []
+    for name in NAMES:
+        config_def, model_def = Importer().import_model_config(name)
+        config = config_def(args=args)
+        config.test_step = config.epochs + 1
+        config.test_num = 1
+        config.save_model = False
+        config.disp_result = False
+        models.append(model_def(config))
+    return models
+
+
+def main():
+    # getting the customized configurations from the command-line arguments.
+    args = KGEArgParser().get_args(sys.argv[1:])
+
+    knowledge_graph = KnowledgeGraph(dataset=args.dataset_name)
+    knowledge_graph.prepare_data()
+
+    start = timeit.default_timer()
+    for model in create_models(args):
+        trainer = Trainer(model=model)
+        trainer.build_model()
+        trainer.train_model()
+    sequential = timeit.default_timer() - start
+
+    start = timeit.default_timer()
+    trainer = MultiModelTrainer(create_models(args))
+    trainer.build_model()
+    trainer.train_model()
+    shared = timeit.default_timer() - start
+
+    print("%-30s %10s" % ("training of " + ", ".join(NAMES), "seconds"))
+    print("%-30s %10.1f" % ("one after another", sequential))
+    print("%-30s %10.1f (%.2fx)" % ("one shared generator", shared, sequential / shared))
+
+
+if __name__ == "__main__":
+    main()
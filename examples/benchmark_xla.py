@@ -0,0 +1,89 @@
+'''
+===============================
+Benchmark the XLA Compilation
+===============================
+In this example, we compare the training steps and the scoring calls per second of every
+model with and without the XLA compilation (-xla). XLA fuses the elementwise chains of the
+models, e.g. the normalize-add-abs-sum of TransE.dissimilarity, into single kernels. The
+models with ops XLA cannot compile fall back to the plain functions and are marked so.
+
+    $ python benchmark_xla.py -ds freebase15k -b 1024
+    $ python benchmark_xla.py -mn transe -ds freebase15k -b 1024
+'''
+# License: MIT
+
+import sys
+import timeit
+
+import numpy as np
+import tensorflow as tf
+
+from pykg2vec.utils.kgcontroller import KnowledgeGraph
+from pykg2vec.config.config import Importer, KGEArgParser
+from pykg2vec.utils.evaluator import Evaluator
+from pykg2vec.utils.trainer import Trainer
+
+
+def copy_batch(batch):
+    """Function to copy a generated batch, its memory may be reused by the generator."""
+    return [field if isinstance(field, tf.SparseTensor) else np.array(field) for field in batch]
+
+
+def benchmark(args, name, jit_compile, num_batch, num_test):
+    """Function to measure the training steps and the scoring calls per second of a model."""
+    config_def, model_def = Importer().import_model_config(name)
+    config = config_def(args=args)
+    config.jit_compile = jit_compile
+
+    trainer = Trainer(model=model_def(config))
+    trainer.build_model()
+    trainer.create_workers()
+    batches = [copy_batch(next(trainer.generator)) for _ in range(num_batch + 1)]
+    trainer.stop_workers()
+
+    # the first call traces (and compiles) the functions.
+    trainer.train_batch(batches[0])
+    start = timeit.default_timer()
+    for batch in batches[1:]:
+        trainer.train_batch(batch)
+    train_speed = num_batch / (timeit.default_timer() - start)
+
+    evaluator = Evaluator(model=trainer.model, multiprocess=False)
+    tot_entity = config.kg_meta.tot_entity
+    multiclass = trainer.training_strategy == "projection_based"
+    rank = evaluator.test_tail_rank_multiclass if multiclass else evaluator.test_tail_rank
+    test_data = evaluator.eval_data[:num_test]
+    rank(tf.constant(test_data[0].h), tf.constant(test_data[0].r), tot_entity)
+    start = timeit.default_timer()
+    for triple in test_data:
+        rank(tf.constant(triple.h), tf.constant(triple.r), tot_entity).numpy()
+    test_speed = len(test_data) / (timeit.default_timer() - start)
+
+    fallback = any(function.fallback for function in trainer.compiled_steps.values())
+    return train_speed, test_speed, fallback
+
+
+def main():
+    # getting the customized configurations from the command-line arguments.
+    args = KGEArgParser().get_args(sys.argv[1:])
+
+    knowledge_graph = KnowledgeGraph(dataset=args.dataset_name)
+    knowledge_graph.prepare_data()
+
+    names = sorted(Importer().modelMap) if "-mn" not in sys.argv[1:] else [args.model_name.lower()]
+
+    print("%-16s %14s %14s %8s %14s %14s %8s" % ("model", "steps/s", "steps/s xla", "speedup", "ranks/s", "ranks/s xla", "speedup"))
+    for name in names:
+        try:
+            train_speed, test_speed, _ = benchmark(args, name, False, 50, 50)
+            xla_train_speed, xla_test_speed, fallback = benchmark(args, name, True, 50, 50)
+        except Exception as error:
+            print("%-16s failed: %s" % (name, str(error).splitlines()[0]))
+            continue
+        print("%-16s %14.1f %14.1f %7.2fx %14.1f %14.1f %7.2fx%s" % (
+            name, train_speed, xla_train_speed, xla_train_speed / train_speed,
+            test_speed, xla_test_speed, xla_test_speed / test_speed, " (fallback)" if fallback else ""))
+
+
+if __name__ == "__main__":
+    main()
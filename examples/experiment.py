@@ -2,84 +2,45 @@
 =========================
 Train multiple Algorithm
 =========================
-In this example, we will show how to import all the modules to start training and algorithm
+In this example, we will show how to train several algorithms on the batches of one generator.
+The negatives are sampled once per batch and shared by TransE, TransH, TransR, Rescal and SME,
+each with its own optimizer, evaluation and exports.
+
+    $ python experiment.py -ds freebase15k -l 5 -b 128
 '''
 # Author: Sujit Rokka Chhetri and Shiy Yuan Yu
 # License: MIT
 
-import tensorflow as tf
-
-from pykg2vec.core.TransE import TransE
-from pykg2vec.core.TransH import TransH
-from pykg2vec.core.TransR import TransR
-from pykg2vec.core.Rescal import Rescal
-from pykg2vec.core.SMEBilinear import SMEBilinear
-from pykg2vec.core.SMELinear import SMELinear
-from pykg2vec.config.config import TransEConfig, TransHConfig, TransRConfig, RescalConfig, SMEConfig
+import sys
 
-from pykg2vec.utils.dataprep import DataPrep
-from pykg2vec.utils.trainer import Trainer
+from pykg2vec.utils.kgcontroller import KnowledgeGraph
+from pykg2vec.config.config import Importer, KGEArgParser
+from pykg2vec.utils.multimodel import MultiModelTrainer
 
 
 def experiment():
-    # preparing dataset.
-    knowledge_graph = DataPrep('Freebase15k')
-
-    # preparing settings. 
-    epochs = 5
-    batch_size = 128
-    learning_rate = 0.01
-    hidden_size = 50
-
-    transEconfig = TransEConfig(learning_rate=learning_rate,
-                                batch_size=batch_size,
-                                epochs=epochs, hidden_size=hidden_size)
-
-    transHconfig = TransHConfig(learning_rate=learning_rate,
-                                batch_size=batch_size,
-                                epochs=epochs, hidden_size=hidden_size)
-
-    transRconfig = TransRConfig(learning_rate=learning_rate,
-                                batch_size=batch_size,
-                                ent_hidden_size=64,
-                                rel_hidden_size=32,
-                                epochs=epochs)
-
-    rescalconfig = RescalConfig(learning_rate=0.1,
-                                batch_size=batch_size,
-                                epochs=epochs, hidden_size=hidden_size)
+    # getting the customized configurations from the command-line arguments, shared by the models.
+    args = KGEArgParser().get_args(sys.argv[1:])
 
-    smeconfig = SMEConfig(learning_rate=learning_rate,
-                          batch_size=batch_size,
-                          epochs=epochs, hidden_size=hidden_size)
-
-    configs = [transEconfig, transHconfig, transRconfig, rescalconfig, smeconfig]
+    # preparing dataset.
+    knowledge_graph = KnowledgeGraph(dataset=args.dataset_name, negative_sample=args.sampling)
+    knowledge_graph.prepare_data()
 
-    for config in configs:
+    # preparing models, the settings of the batches (batch size, sampling, ...) must be the same.
+    models = []
+    for name in ["transe", "transh", "transr", "rescal", "sme"]:
+        config_def, model_def = Importer().import_model_config(name)
+        config = config_def(args=args)
         config.test_step = 2
         config.test_num = 100
         config.save_model = True
         config.disp_result = False
-
-    # preparing models. 
-    models = []
-    models.append(TransE(transEconfig, knowledge_graph))
-    models.append(TransH(transHconfig, knowledge_graph))
-    models.append(TransR(transRconfig, knowledge_graph))
-    models.append(Rescal(rescalconfig, knowledge_graph))
-    models.append(SMEBilinear(smeconfig, knowledge_graph))
-    models.append(SMELinear(smeconfig, knowledge_graph))
+        models.append(model_def(config))
 
     # train models.
-    for model in models:
-        print("training model %s" % model.model_name)
-        trainer = Trainer(model=model)
-
-        trainer.build_model()
-        trainer.train_model()
-        trainer.full_test()
-
-        tf.reset_default_graph()
+    trainer = MultiModelTrainer(models, debug=args.debug)
+    trainer.build_model()
+    trainer.train_model()
 
 
 if __name__ == "__main__":
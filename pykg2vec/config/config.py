@@ -11,6 +11,7 @@ across all the algorithms, and local parameters which are specific to the algori
 import tensorflow as tf
 from argparse import ArgumentParser
 import importlib
+from pathlib import Path
 
 from pykg2vec.utils.kgcontroller import KnowledgeGraph, KGMetaData
 from pykg2vec.config.hyperparams import HyperparamterLoader
@@ -162,8 +163,9 @@ class KGEArgParser:
         self.general_hyper_group.add_argument('-lmda', dest='lmbda', default=0.1, type=float, help='The lmbda for regularization.')
         self.general_hyper_group.add_argument('-b',   dest='batch_training', default=128, type=int, help='training batch size')
         self.general_hyper_group.add_argument('-mg',  dest='margin', default=0.8, type=float, help='Margin to take')
-        self.general_hyper_group.add_argument('-opt', dest='optimizer', default='adam', type=str, help='optimizer to be used in training.')
-        self.general_hyper_group.add_argument('-s',   dest='sampling', default='uniform', type=str, help='strategy to do negative sampling.')
+        self.general_hyper_group.add_argument('-opt', dest='optimizer', default='adam', type=str, help='optimizer to be used in training (choice: adam/sgd/rms/adagrad/adadelta, or the sparse lazy_adam/rowwise_adagrad/sparse_sgd).')
+        self.general_hyper_group.add_argument('-mom', dest='momentum', default=0.9, type=float, help='Momentum of the sparse_sgd optimizer.')
+        self.general_hyper_group.add_argument('-s',   dest='sampling', default='uniform', type=str, help='strategy to do negative sampling: uniform, bern, degree (degree-proportional), typed (relation domain/range) or cache (hard-negative cache).')
         self.general_hyper_group.add_argument('-ngr', dest='negrate', default=1, type=int, help='The number of negative samples generated per positve one.')
         self.general_hyper_group.add_argument('-l',   dest='epochs', default=100, type=int, help='The total number of Epochs')
         self.general_hyper_group.add_argument('-lr',  dest='learning_rate', default=0.01, type=float,help='learning rate')
@@ -177,7 +179,23 @@ class KGEArgParser:
         self.environment_group = self.parser.add_argument_group('Working Environments')
         self.environment_group.add_argument('-gp',  dest='gpu_frac', default=0.8, type=float, help='GPU fraction to use')
         self.environment_group.add_argument('-npg', dest='num_process_gen', default=2, type=int, help='number of processes used in the Generator.')
+        self.environment_group.add_argument('-gbk', dest='generator_backend', default='process', type=str, help='The backend of the Generator workers (choice: process/thread).')
         self.environment_group.add_argument('-npe', dest='num_process_evl', default=1, type=int, help='number of processes used in the Evaluator.')
+        self.environment_group.add_argument('-aev', dest='async_evaluation', default=False, type=lambda x: (str(x).lower() == 'true'), help='Evaluate snapshots of the model in a background thread while the training continues.')
+        self.environment_group.add_argument('-shm', dest='shared_memory', default=False, type=lambda x: (str(x).lower() == 'true'), help='Pass the generated batches through a shared-memory ring buffer (pairwise and pointwise models).')
+        self.environment_group.add_argument('-gst', dest='generator_stats', default=False, type=lambda x: (str(x).lower() == 'true'), help='Log the throughput and back-pressure statistics of the Generator every epoch.')
+        self.environment_group.add_argument('-rs',  dest='random_seed', default=None, type=int, help='Seed of the random streams of the Generator workers, unseeded if not given.')
+        self.environment_group.add_argument('-spc', dest='steps_per_call', default=1, type=int, help='Run that many training steps per call of one compiled function over stacked batches (pairwise, pointwise and shared negative training).')
+        self.environment_group.add_argument('-xla', dest='jit_compile', default=False, type=lambda x: (str(x).lower() == 'true'), help='Compile the training steps and the scoring functions with XLA, falling back to the plain functions for the unsupported ops.')
+        self.environment_group.add_argument('-hw',  dest='hogwild_workers', default=0, type=int, help='Train with that many Hogwild worker processes updating shared parameters on CPU (sgd, sparse_sgd with -mom 0, adagrad; models with sparse gradients only), 0 disables it.')
+        self.environment_group.add_argument('-ep',  dest='entity_partitions', default=0, type=int, help='Train bucket by bucket with the entity tables split into that many partitions on disk (sgd/adagrad), 0 disables it.')
+        self.environment_group.add_argument('-mw',  dest='multi_worker', default=False, type=lambda x: (str(x).lower() == 'true'), help='Train data-parallel across the workers of the TF_CONFIG cluster (MultiWorkerMirroredStrategy).')
+        self.environment_group.add_argument('-rb',  dest='reorder_batches', default=False, type=lambda x: (str(x).lower() == 'true'), help='Hand out the generated batches in the order they were fed (deterministic with -rs).')
+        self.environment_group.add_argument('-pht', dest='phase_timing', default=False, type=lambda x: (str(x).lower() == 'true'), help='Append the time of the phases of every epoch (generator wait, conversion, train step, evaluation, checkpoint, export) to a JSON-lines file in the result folder.')
+        self.environment_group.add_argument('-pfn', dest='profile_steps', default=0, type=int, help='Capture a tf.profiler trace of that many training steps in the result folder, 0 disables it.')
+        self.environment_group.add_argument('-pfs', dest='profile_start_step', default=10, type=int, help='Number of training steps run before the tf.profiler trace starts.')
+        self.environment_group.add_argument('-mem', dest='memory_budget', default=0, type=float, help='Memory budget of the training in MB: the parameter, optimizer and activation memory is estimated before the training and checked against it, 0 disables it.')
+        self.environment_group.add_argument('-abs', dest='auto_batch_size', default=False, type=lambda x: (str(x).lower() == 'true'), help='Train with the largest batch size fitting the memory budget (-mem).')
 
         ''' basic configs '''
         self.general_group = self.parser.add_argument_group('Generic')
@@ -196,6 +214,26 @@ class KGEArgParser:
         self.general_group.add_argument('-plote', dest='plot_embedding', default=False,type=lambda x: (str(x).lower() == 'true'), help='Plot the entity only!')
         self.general_group.add_argument('-plot',  dest='plot_entity_only', default=False,type=lambda x: (str(x).lower() == 'true'), help='Plot the entity only!')
         self.general_group.add_argument('-els',   dest='early_stop_epoch', default=50, type=int, help='Interval of performing early stop check. ')
+        self.general_group.add_argument('-esm',   dest='early_stop_metric', default='loss', type=str, help='Stop the training on the training loss (loss) or on a validation metric (mr/fmr/mrr/fmrr/hits<k>/fhits<k>) and restore the weights of its best test.')
+        self.general_group.add_argument('-esp',   dest='patience', default=3, type=int, help='Number of early stop checks without improvement before the training stops (the tests every -ts epochs with a validation metric).')
+        self.general_group.add_argument('-sng',   dest='num_shared_negatives', default=0, type=int, help='Size of the pool of negative entities shared by a batch, 0 disables it (TransE, DistMult, Complex and RotatE).')
+        self.general_group.add_argument('-adv',   dest='adversarial_temperature', default=0.0, type=float, help='Temperature of the self-adversarial weighting of the negative samples, 0 disables it.')
+        self.general_group.add_argument('-ncs',   dest='neg_cache_size', default=50, type=int, help='Number of hard negatives cached per (h, r) and (r, t) pair with the cache sampling.')
+        self.general_group.add_argument('-ncc',   dest='neg_cache_candidates', default=50, type=int, help='Number of random entities scored with the cached ones when refreshing the cache. The refresh scores (ncs + ncc) heads and tails per triple, an extra forward pass every step.')
+        self.general_group.add_argument('-pb',    dest='partial_batch', default=False, type=lambda x: (str(x).lower() == 'true'), help='Train on the remaining triples of each epoch as a final partial batch.')
+        self.general_group.add_argument('-rg',    dest='relation_grouped', default=False, type=lambda x: (str(x).lower() == 'true'), help='Group the triples of a batch by relation, TransR then projects each relation with one matmul.')
+        self.general_group.add_argument('-lw',    dest='locality_window', default=0, type=int, help='Order the batches by buckets of about that many batches of nearby entities, 0 disables it.')
+        self.general_group.add_argument('-cke',   dest='checkpoint_epochs', default=0, type=int, help='Write a training checkpoint (model, optimizer, epoch, losses and seed) every _ epochs in the background, 0 disables it.')
+        self.general_group.add_argument('-ckk',   dest='checkpoint_keep', default=3, type=int, help='Number of the latest training checkpoints to keep.')
+        self.general_group.add_argument('-ckh',   dest='checkpoint_hours', default=None, type=float, help='Also keep one training checkpoint every _ hours, beyond the latest ones.')
+        self.general_group.add_argument('-ckp',   dest='checkpoint_path', default=None, type=str, help='The folder of the training checkpoints, in the intermediate folder of the model if not given.')
+        self.general_group.add_argument('-rsm',   dest='resume', default=False, type=lambda x: (str(x).lower() == 'true'), help='Resume the training from the latest checkpoint (exact with -rs and -rb).')
+        self.general_group.add_argument('-ws',    dest='warm_start', default=None, type=str, help='The folder of the exported embeddings, training checkpoints or saved model of a previous run to initialize the model from, aligned by labels.')
+        self.general_group.add_argument('-wsh',   dest='warm_start_hops', default=0, type=int, help='With -ws, train only on the triples within _ hops of the new entities, relations and triples, 0 trains on all triples.')
+        self.general_group.add_argument('-acc',   dest='accumulation_steps', default=1, type=int, help='Split every batch into _ micro-batches whose gradients are accumulated before one update, the batch size must be a multiple of it.')
+        self.general_group.add_argument('-lrs',   dest='lr_scaling', default='none', type=str, help='Scale the learning rate with the global batch size relative to -lrb: none, linear or sqrt.')
+        self.general_group.add_argument('-lrb',   dest='lr_base_batch_size', default=128, type=int, help='The batch size the learning rate is tuned for, with -lrs.')
+        self.general_group.add_argument('-wu',    dest='warmup_steps', default=0, type=int, help='Grow the learning rate linearly over the first _ training steps, 0 disables the warmup.')
 
     def get_args(self, args):
       """This function parses the necessary arguments.
@@ -233,7 +271,45 @@ class BasicConfig:
       plot_testing_result (bool): If True, it will plot all the testing result such as mean rank, hit ratio, etc.
       plot_entity_only (bool): If True, plots the t-SNE reduced embdding of the entities in a figure.
       full_test_flag (bool): It True, performs a full test after completing the training for full epochs.
+      early_stop_epoch (int): Interval of the early stop checks on the training loss.
+      early_stop_metric (str): 'loss' to stop on the training loss, or the validation metric (mr, fmr, mrr, fmrr, hits<k>, fhits<k>) to stop on, the best weights being restored.
+      patience (int): Number of early stop checks without improvement before the training stops.
+      num_shared_negatives (int): If positive, the triples of a batch are corrupted with a shared pool of that many entities instead of neg_rate sampled triples each.
+      adversarial_temperature (float): If positive, the negative samples of a positive sample are weighted by the softmax of their scores times this temperature (self-adversarial sampling).
+      momentum (float): Momentum of the sparse_sgd optimizer.
+      relation_grouped (bool): If True, the batches hold one or a few relations and the projection models transform the rows of a relation together.
+      locality_window (int): If positive, the batches are ordered by buckets of about that many batches of nearby entities to reuse the embedding rows.
+      neg_cache_size (int): Number of hard negatives cached per (h, r) and (r, t) pair with the cache sampling.
+      neg_cache_candidates (int): Number of random entities scored with the cached ones when refreshing the cache.
+      partial_batch (bool): If True, the triples left after the last full batch are trained on as a final partial batch every epoch.
+      checkpoint_epochs (int): If positive, a training checkpoint is written in the background every checkpoint_epochs epochs.
+      checkpoint_keep (int): Number of the latest training checkpoints to keep.
+      checkpoint_hours (float): If set, one training checkpoint every checkpoint_hours hours is kept as well.
+      checkpoint_path (Path Object): Path of the training checkpoints, path_tmp/model_name/checkpoints if None.
+      resume (bool): If True, the training resumes from the latest training checkpoint.
+      warm_start (Path Object): Path of the parameters of a previous run the model is initialized from, aligned by the labels of the entities and relations.
+      warm_start_hops (int): If positive, the warm-started training is restricted to the triples within warm_start_hops hops of the new entities, relations and triples.
+      accumulation_steps (int): Number of micro-batches every batch is split into, their gradients accumulated before one update.
+      lr_scaling (str): Scales the learning rate with the global batch size relative to lr_base_batch_size, 'none', 'linear' or 'sqrt'.
+      lr_base_batch_size (int): The batch size the learning rate is tuned for.
+      warmup_steps (int): If positive, the learning rate grows linearly over the first warmup_steps training steps.
       hits (List): Gives the list of integer for calculating hits.
+      async_evaluation (bool): If True, the tests evaluate snapshots of the model in a background thread while the training continues.
+      generator_backend (str): Runs the num_process_gen generator workers as processes ('process') or threads ('thread').
+      shared_memory (bool): If True, the generator passes batches to the trainer through a shared-memory ring buffer.
+      generator_stats (bool): If True, the throughput and back-pressure statistics of the generator are logged every epoch.
+      random_seed (int): Seed from which the random streams of the generator workers are derived, unseeded if None.
+      reorder_batches (bool): If True, the generator hands out the batches in the order they were fed.
+      multi_worker (bool): If True, the model is trained data-parallel across the workers of the TF_CONFIG cluster, every worker on its own shard.
+      steps_per_call (int): Number of training steps run by one call of the compiled training loop.
+      jit_compile (bool): If True, the training and scoring functions are compiled with XLA where the ops of the model allow it.
+      hogwild_workers (int): If positive, the model is trained by that many processes updating shared parameters without locks.
+      entity_partitions (int): If positive, the entity tables are split into that many partitions on disk and trained bucket by bucket.
+      phase_timing (bool): If True, the time of the phases of every epoch is appended to path_result/<model>_phase_timings.jsonl.
+      profile_steps (int): If positive, a tf.profiler trace of that many training steps is captured in path_result/<model>_profile.
+      profile_start_step (int): Number of training steps run before the tf.profiler trace starts.
+      memory_budget (float): If positive, the memory of the training (in MB) is estimated when the model is built and checked against this budget.
+      auto_batch_size (bool): If True, the batch size is set to the largest one fitting memory_budget.
       knowledge_graph (Object): It prepares and holds the instance of the knowledge graph dataset.
       kg_meta (object): Stores the statistics metadata of the knowledge graph.
     
@@ -250,7 +326,27 @@ class BasicConfig:
         self.disp_result = False
         
         self.early_stop_epoch = args.early_stop_epoch # the interval of early stop checking. 
-        self.patience = 3 # should make this configurable as well.
+        self.patience = args.patience
+        self.early_stop_metric = args.early_stop_metric
+        self.partial_batch = args.partial_batch
+        self.num_shared_negatives = args.num_shared_negatives
+        self.adversarial_temperature = args.adversarial_temperature
+        self.neg_cache_size = args.neg_cache_size
+        self.relation_grouped = args.relation_grouped
+        self.momentum = args.momentum
+        self.locality_window = args.locality_window
+        self.neg_cache_candidates = args.neg_cache_candidates
+        self.checkpoint_epochs = args.checkpoint_epochs
+        self.checkpoint_keep = args.checkpoint_keep
+        self.checkpoint_hours = args.checkpoint_hours
+        self.checkpoint_path = Path(args.checkpoint_path) if args.checkpoint_path is not None else None
+        self.resume = args.resume
+        self.warm_start = Path(args.warm_start) if args.warm_start is not None else None
+        self.warm_start_hops = args.warm_start_hops
+        self.accumulation_steps = args.accumulation_steps
+        self.lr_scaling = args.lr_scaling
+        self.lr_base_batch_size = args.lr_base_batch_size
+        self.warmup_steps = args.warmup_steps
         
         # Visualization related, 
         # p.s. the visualizer is disable for most of the KGE methods for now. 
@@ -262,7 +358,23 @@ class BasicConfig:
         
         # Working environment variables.
         self.num_process_gen = args.num_process_gen
+        self.generator_backend = args.generator_backend
         self.num_process_evl = args.num_process_evl
+        self.async_evaluation = args.async_evaluation
+        self.shared_memory = args.shared_memory
+        self.generator_stats = args.generator_stats
+        self.random_seed = args.random_seed
+        self.reorder_batches = args.reorder_batches
+        self.steps_per_call = args.steps_per_call
+        self.jit_compile = args.jit_compile
+        self.hogwild_workers = args.hogwild_workers
+        self.entity_partitions = args.entity_partitions
+        self.multi_worker = args.multi_worker
+        self.phase_timing = args.phase_timing
+        self.profile_steps = args.profile_steps
+        self.profile_start_step = args.profile_start_step
+        self.memory_budget = args.memory_budget
+        self.auto_batch_size = args.auto_batch_size
         self.log_device_placement = False
         self.gpu_fraction = args.gpu_frac
         self.gpu_allow_growth = True
@@ -338,7 +450,7 @@ class TransEConfig(BasicConfig):
       margin (float): Defines the margin used between the positive and negative triple loss.
       data (str): Defines the knowledge base dataset to be used for training the algorithm.
       optimizer (str): Defines the optimization algorithm such as adam, sgd, adagrad, etc.
-      sampling (str): Defines the sampling (bern or uniform) for corrupting the triples.
+      sampling (str): Defines the sampling (uniform, bern, degree, typed or cache) for corrupting the triples.
     
     """
     def __init__(self, args):
@@ -392,7 +504,7 @@ class HoLEConfig(BasicConfig):
       margin (float): Defines the margin used between the positive and negative triple loss.
       data (str): Defines the knowledge base dataset to be used for training the algorithm.
       optimizer (str): Defines the optimization algorithm such as adam, sgd, adagrad, etc.
-      sampling (str): Defines the sampling (bern or uniform) for corrupting the triples.
+      sampling (str): Defines the sampling (uniform, bern, degree, typed or cache) for corrupting the triples.
     
     """
     def __init__(self, args=None):
@@ -447,7 +559,7 @@ class TransRConfig(BasicConfig):
       margin (float): Defines the margin used between the positive and negative triple loss.
       data (str): Defines the knowledge base dataset to be used for training the algorithm.
       optimizer (str): Defines the optimization algorithm such as adam, sgd, adagrad, etc.
-      sampling (str): Defines the sampling (bern or uniform) for corrupting the triples.
+      sampling (str): Defines the sampling (uniform, bern, degree, typed or cache) for corrupting the triples.
     
     """
 
@@ -505,7 +617,7 @@ class TransDConfig(BasicConfig):
       margin (float): Defines the margin used between the positive and negative triple loss.
       data (str): Defines the knowledge base dataset to be used for training the algorithm.
       optimizer (str): Defines the optimization algorithm such as adam, sgd, adagrad, etc.
-      sampling (str): Defines the sampling (bern or uniform) for corrupting the triples.
+      sampling (str): Defines the sampling (uniform, bern, degree, typed or cache) for corrupting the triples.
     
     """
     def __init__(self, args=None):
@@ -561,7 +673,7 @@ class TransMConfig(BasicConfig):
       margin (float): Defines the margin used between the positive and negative triple loss.
       data (str): Defines the knowledge base dataset to be used for training the algorithm.
       optimizer (str): Defines the optimization algorithm such as adam, sgd, adagrad, etc.
-      sampling (str): Defines the sampling (bern or uniform) for corrupting the triples.
+      sampling (str): Defines the sampling (uniform, bern, degree, typed or cache) for corrupting the triples.
     
     """
 
@@ -617,7 +729,7 @@ class TransHConfig(BasicConfig):
       margin (float): Defines the margin used between the positive and negative triple loss.
       data (str): Defines the knowledge base dataset to be used for training the algorithm.
       optimizer (str): Defines the optimization algorithm such as adam, sgd, adagrad, etc.
-      sampling (str): Defines the sampling (bern or uniform) for corrupting the triples.
+      sampling (str): Defines the sampling (uniform, bern, degree, typed or cache) for corrupting the triples.
     
     """
 
@@ -674,7 +786,7 @@ class RescalConfig(BasicConfig):
       margin (float): Defines the margin used between the positive and negative triple loss.
       data (str): Defines the knowledge base dataset to be used for training the algorithm.
       optimizer (str): Defines the optimization algorithm such as adam, sgd, adagrad, etc.
-      sampling (str): Defines the sampling (bern or uniform) for corrupting the triples.
+      sampling (str): Defines the sampling (uniform, bern, degree, typed or cache) for corrupting the triples.
     
     """
     def __init__(self, args=None):
@@ -729,7 +841,7 @@ class SMEConfig(BasicConfig):
       margin (float): Defines the margin used between the positive and negative triple loss.
       data (str): Defines the knowledge base dataset to be used for training the algorithm.
       optimizer (str): Defines the optimization algorithm such as adam, sgd, adagrad, etc.
-      sampling (str): Defines the sampling (bern or uniform) for corrupting the triples.
+      sampling (str): Defines the sampling (uniform, bern, degree, typed or cache) for corrupting the triples.
       bilinear (bool): If true uses bilnear transformation for loss else uses linear.
     
     """
@@ -787,7 +899,7 @@ class NTNConfig(BasicConfig):
       margin (float): Defines the margin used between the positive and negative triple loss.
       data (str): Defines the knowledge base dataset to be used for training the algorithm.
       optimizer (str): Defines the optimization algorithm such as adam, sgd, adagrad, etc.
-      sampling (str): Defines the sampling (bern or uniform) for corrupting the triples.
+      sampling (str): Defines the sampling (uniform, bern, degree, typed or cache) for corrupting the triples.
     
     """
     def __init__(self, args=None):
@@ -844,7 +956,7 @@ class SLMConfig(BasicConfig):
       margin (float): Defines the margin used between the positive and negative triple loss.
       data (str): Defines the knowledge base dataset to be used for training the algorithm.
       optimizer (str): Defines the optimization algorithm such as adam, sgd, adagrad, etc.
-      sampling (str): Defines the sampling (bern or uniform) for corrupting the triples.
+      sampling (str): Defines the sampling (uniform, bern, degree, typed or cache) for corrupting the triples.
     
     """
 
@@ -901,7 +1013,7 @@ class RotatEConfig(BasicConfig):
       margin (float): Defines the margin used between the positive and negative triple loss.
       data (str): Defines the knowledge base dataset to be used for training the algorithm.
       optimizer (str): Defines the optimization algorithm such as adam, sgd, adagrad, etc.
-      sampling (str): Defines the sampling (bern or uniform) for corrupting the triples.
+      sampling (str): Defines the sampling (uniform, bern, degree, typed or cache) for corrupting the triples.
     
     """
     def __init__(self, args=None):
@@ -954,7 +1066,7 @@ class KG2EConfig(BasicConfig):
       margin (float): Defines the margin used between the positive and negative triple loss.
       data (str): Defines the knowledge base dataset to be used for training the algorithm.
       optimizer (str): Defines the optimization algorithm such as adam, sgd, adagrad, etc.
-      sampling (str): Defines the sampling (bern or uniform) for corrupting the triples.
+      sampling (str): Defines the sampling (uniform, bern, degree, typed or cache) for corrupting the triples.
       bilinear (bool): If True, sets the transformaton to be bilinear.
       distance_measure (str): Uses either kl_divergence or expected_likelihood as distance measure.
       cmax (float): Sets the upper clipping range for the embedding.
@@ -1019,7 +1131,7 @@ class ComplexConfig(BasicConfig):
       margin (float): Defines the margin used between the positive and negative triple loss.
       data (str): Defines the knowledge base dataset to be used for training the algorithm.
       optimizer (str): Defines the optimization algorithm such as adam, sgd, adagrad, etc.
-      sampling (str): Defines the sampling (bern or uniform) for corrupting the triples.
+      sampling (str): Defines the sampling (uniform, bern, degree, typed or cache) for corrupting the triples.
     
     """
     def __init__(self, args=None):
@@ -1078,7 +1190,7 @@ class DistMultConfig(BasicConfig):
       margin (float): Defines the margin used between the positive and negative triple loss.
       data (str): Defines the knowledge base dataset to be used for training the algorithm.
       optimizer (str): Defines the optimization algorithm such as adam, sgd, adagrad, etc.
-      sampling (str): Defines the sampling (bern or uniform) for corrupting the triples.
+      sampling (str): Defines the sampling (uniform, bern, degree, typed or cache) for corrupting the triples.
     
     """
 
@@ -1138,7 +1250,7 @@ class ProjE_pointwiseConfig(BasicConfig):
       margin (float): Defines the margin used between the positive and negative triple loss.
       data (str): Defines the knowledge base dataset to be used for training the algorithm.
       optimizer (str): Defines the optimization algorithm such as adam, sgd, adagrad, etc.
-      sampling (str): Defines the sampling (bern or uniform) for corrupting the triples.
+      sampling (str): Defines the sampling (uniform, bern, degree, typed or cache) for corrupting the triples.
     
     """
 
@@ -1203,7 +1315,7 @@ class ConvKBConfig(BasicConfig):
       margin (float): Defines the margin used between the positive and negative triple loss.
       data (str): Defines the knowledge base dataset to be used for training the algorithm.
       optimizer (str): Defines the optimization algorithm such as adam, sgd, adagrad, etc.
-      sampling (str): Defines the sampling (bern or uniform) for corrupting the triples.
+      sampling (str): Defines the sampling (uniform, bern, degree, typed or cache) for corrupting the triples.
     
     """
     def __init__(self, args=None):
@@ -1266,7 +1378,7 @@ class ConvEConfig(BasicConfig):
       margin (float): Defines the margin used between the positive and negative triple loss.
       data (str): Defines the knowledge base dataset to be used for training the algorithm.
       optimizer (str): Defines the optimization algorithm such as adam, sgd, adagrad, etc.
-      sampling (str): Defines the sampling (bern or uniform) for corrupting the triples.
+      sampling (str): Defines the sampling (uniform, bern, degree, typed or cache) for corrupting the triples.
     
     """
     def __init__(self, args=None):
@@ -1333,7 +1445,7 @@ class TuckERConfig(BasicConfig):
       margin (float): Defines the margin used between the positive and negative triple loss.
       data (str): Defines the knowledge base dataset to be used for training the algorithm.
       optimizer (str): Defines the optimization algorithm such as adam, sgd, adagrad, etc.
-      sampling (str): Defines the sampling (bern or uniform) for corrupting the triples.
+      sampling (str): Defines the sampling (uniform, bern, degree, typed or cache) for corrupting the triples.
     
     """
     def __init__(self, args=None):
@@ -1426,7 +1538,7 @@ class TransGConfig(BasicConfig):
       margin (float): Defines the margin used between the positive and negative triple loss.
       data (str): Defines the knowledge base dataset to be used for training the algorithm.
       optimizer (str): Defines the optimization algorithm such as adam, sgd, adagrad, etc.
-      sampling (str): Defines the sampling (bern or uniform) for corrupting the triples.
+      sampling (str): Defines the sampling (uniform, bern, degree, typed or cache) for corrupting the triples.
       training_threshold (float): Defines the threshold to be used to update the clusters for TransG.
       ncluster (int): Defines the initial cluster for the relation.
       CRP_factor (float): Chinese Restaurant Process Factor.
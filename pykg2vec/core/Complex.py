@@ -90,14 +90,43 @@ class Complex(ModelMeta):
     def dissimilarity(self, h_real, h_img, r_real, r_img, t_real, t_img):
         return tf.reduce_sum(h_real * t_real * r_real + h_img * t_img * r_real + h_real * t_img * r_img - h_img * t_real * r_img, axis=-1, keepdims = False)
 
+    def plausibility(self, h, r, t):
+        """Function to score triples, the higher the more plausible."""
+        return self.dissimilarity(*self.embed(h, r, t))
+
     def get_loss(self, h, r, t, y):
         """Defines the loss function for the algorithm."""
         h_e_real, h_e_img, r_e_real, r_e_img, t_e_real, t_e_img = self.embed(h, r, t)
 
         score = self.dissimilarity(h_e_real, h_e_img, r_e_real, r_e_img, t_e_real, t_e_img)
+        score_pos = tf.boolean_mask(score, y > 0)
+        score_neg = tf.boolean_mask(score, y < 0)
 
         regul_term = tf.nn.l2_loss(h_e_real) + tf.nn.l2_loss(h_e_img) + tf.nn.l2_loss(r_e_real) + tf.nn.l2_loss(r_e_img) + tf.nn.l2_loss(t_e_real) + tf.nn.l2_loss(t_e_img)
-        loss = tf.reduce_sum(tf.nn.softplus(-score*y)) + self.config.lmbda*regul_term
+        loss = self.pointwise_logistic_loss(score_pos, score_neg) + self.config.lmbda*regul_term
+
+        return loss
+
+    def get_loss_shared_negatives(self, pos_h, pos_r, pos_t, neg_pool):
+        """Defines the loss function when a batch shares a pool of negative entities.
+
+           The score is linear in the real and imaginary parts of the corrupted entity, so the
+           [b, 2n] negative scores come from two [b, 2k] x [2k, n] matmuls.
+        """
+        h_e_real, h_e_img, r_e_real, r_e_img, t_e_real, t_e_img = self.embed(pos_h, pos_r, pos_t)
+        pool_e_real = tf.nn.embedding_lookup(self.ent_embeddings_real, neg_pool)
+        pool_e_img  = tf.nn.embedding_lookup(self.ent_embeddings_img,  neg_pool)
+
+        score_pos = self.dissimilarity(h_e_real, h_e_img, r_e_real, r_e_img, t_e_real, t_e_img)
+
+        pool_e = tf.concat([pool_e_real, pool_e_img], axis=-1)
+        tail_coef = tf.concat([h_e_real*r_e_real - h_e_img*r_e_img, h_e_img*r_e_real + h_e_real*r_e_img], axis=-1)
+        head_coef = tf.concat([t_e_real*r_e_real + t_e_img*r_e_img, t_e_img*r_e_real - t_e_real*r_e_img], axis=-1)
+        score_neg = tf.concat([tf.matmul(tail_coef, pool_e, transpose_b=True),
+                               tf.matmul(head_coef, pool_e, transpose_b=True)], axis=1)
+
+        regul_term = tf.nn.l2_loss(h_e_real) + tf.nn.l2_loss(h_e_img) + tf.nn.l2_loss(r_e_real) + tf.nn.l2_loss(r_e_img) + tf.nn.l2_loss(t_e_real) + tf.nn.l2_loss(t_e_img) + tf.nn.l2_loss(pool_e)
+        loss = self.pointwise_logistic_loss(score_pos, score_neg) + self.config.lmbda*regul_term
 
         return loss
 
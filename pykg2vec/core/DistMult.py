@@ -99,6 +99,10 @@ class DistMult(ModelMeta):
         return tf.reduce_sum(h*r*t, axis=axis, keepdims=False)
 
     
+    def plausibility(self, h, r, t):
+        """Function to score triples, the higher the more plausible."""
+        return self.dissimilarity(*self.embed(h, r, t))
+
     def get_loss(self, pos_h, pos_r, pos_t, neg_h, neg_r, neg_t):
         """Defines the loss function for the algorithm."""
         pos_h_e, pos_r_e, pos_t_e = self.embed(pos_h, pos_r, pos_t)
@@ -107,12 +111,34 @@ class DistMult(ModelMeta):
         score_pos = self.dissimilarity(pos_h_e, pos_r_e, pos_t_e)
         score_neg = self.dissimilarity(neg_h_e, neg_r_e, neg_t_e)
 
-        regul_term = tf.nn.l2_loss(self.rel_embeddings)
+        loss = self.pairwise_margin_loss(-score_pos, -score_neg, margin=1) + self.batch_reg()
+
+        return loss
+
+    def get_loss_shared_negatives(self, pos_h, pos_r, pos_t, neg_pool):
+        """Defines the loss function when a batch shares a pool of negative entities.
 
-        loss = tf.reduce_sum(tf.maximum(score_neg - score_pos + 1, 0)) + self.config.lmbda*regul_term
+           The head and the tail of every positive triple are replaced by every entity
+           of the pool, the [b, 2n] negative scores come from two [b, k] x [k, n] matmuls.
+        """
+        h_e = tf.nn.l2_normalize(tf.nn.embedding_lookup(self.ent_embeddings, pos_h), axis=-1)
+        r_e = tf.nn.embedding_lookup(self.rel_embeddings, pos_r)
+        t_e = tf.nn.l2_normalize(tf.nn.embedding_lookup(self.ent_embeddings, pos_t), axis=-1)
+        pool_e = tf.nn.l2_normalize(tf.nn.embedding_lookup(self.ent_embeddings, neg_pool), axis=-1)
+
+        score_pos = self.dissimilarity(h_e, r_e, t_e)
+        score_neg_tail = tf.matmul(h_e*r_e, pool_e, transpose_b=True)
+        score_neg_head = tf.matmul(r_e*t_e, pool_e, transpose_b=True)
+        score_neg = tf.concat([score_neg_tail, score_neg_head], axis=1)
+
+        loss = self.pairwise_margin_loss(-score_pos, -score_neg, margin=1) + self.batch_reg()
 
         return loss
 
+    def get_reg(self):
+        """Performs regularization of the relation embeddings."""
+        return self.config.lmbda*tf.nn.l2_loss(self.rel_embeddings)
+
     def predict(self, h, r, t, topk=-1):
         """Function that performs prediction for TransE. 
            shape of h can be either [num_tot_entity] or [1]. 
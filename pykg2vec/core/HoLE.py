@@ -104,7 +104,7 @@ class HoLE(ModelMeta):
         score_pos = self.dissimilarity(pos_h_e, pos_r_e, pos_t_e)
         score_neg = self.dissimilarity(neg_h_e, neg_r_e, neg_t_e)
 
-        loss = tf.reduce_sum(tf.maximum(score_pos + self.config.margin - score_neg, 0))
+        loss = self.pairwise_margin_loss(score_pos, score_neg)
 
         return loss
 
@@ -103,7 +103,7 @@ class KG2E(ModelMeta):
             score_neg = self.cal_score_kl_divergence(neg_h_mu, neg_h_sigma, neg_r_mu, neg_r_sigma, neg_t_mu,
                                                      neg_t_sigma)
 
-        loss = tf.reduce_sum(tf.maximum(score_pos + self.config.margin - score_neg, 0))
+        loss = self.pairwise_margin_loss(score_pos, score_neg)
 
         return loss
 
@@ -15,6 +15,10 @@ class ModelMeta(tf.keras.Model):
 
     __metaclass__ = ABCMeta
 
+    # get_loss adds the regularization which does not depend on the batch (get_reg), unless the
+    # trainer adds it once per step itself, when it accumulates the gradients of micro-batches.
+    include_reg = True
+
     def __init__(self):
         """Initialize and create the model to be trained and inferred"""
         super(ModelMeta, self).__init__()
@@ -49,7 +53,68 @@ class ModelMeta(tf.keras.Model):
         """Function to get the projected embedding value"""
         pass
 
-    def pairwise_margin_loss(self, score_positive, score_negative):
+    def group_by_relation(self, r):
+        ''' groups the rows of a batch by relation.
+
+            Returns the [u] distinct relations of r, the [b, 2] (group, position in the group) 
+            index of every row and the size m of the largest group, so that the rows can be 
+            scattered into a [u, m, ...] block and every relation applied to its rows at once.
+        '''
+        relations, group = tf.unique(r)
+        counts = tf.math.bincount(group, minlength=tf.size(relations))
+
+        order = tf.argsort(group, stable=True)
+        start = tf.cumsum(counts, exclusive=True)
+        sorted_position = tf.range(tf.size(r)) - tf.gather(start, tf.gather(group, order))
+        position = tf.scatter_nd(tf.expand_dims(order, 1), sorted_position, tf.shape(r))
+
+        return relations, tf.stack([group, position], axis=1), tf.reduce_max(counts)
+
+    def relation_lookup(self, params, r):
+        ''' looks up the relation parameters of a batch.
+
+            With config.relation_grouped, the batches hold few relations: the distinct rows are 
+            looked up once and broadcast to the batch, the gradient then only touches u rows.
+        '''
+        if not self.config.relation_grouped:
+            return tf.nn.embedding_lookup(params, r)
+
+        relations, group = tf.unique(r)
+        return tf.gather(tf.nn.embedding_lookup(params, relations), group)
+
+    def plausibility(self, h, r, t):
+        """Function to score triples, the higher the more plausible (used to rank negative candidates)."""
+        raise NotImplementedError("%s does not expose triple scores" % self.__class__.__name__)
+
+    def adversarial_weights(self, hardness):
+        ''' self-adversarial weights of the negative samples (Sun et al., RotatE, 2019).
+
+            hardness is a [b, n] tensor where a larger value means a harder negative sample. 
+            Within each group of n negative samples of a positive sample, the weights are
+
+                n * softmax(adversarial_temperature * hardness)
+
+            so that they sum up to n like uniform weights and the loss keeps its scale. 
+            The weights are treated as constants (no gradient flows through them).
+            Uniform weights (1) are returned if adversarial_temperature is not positive.
+        '''
+        if self.config.adversarial_temperature <= 0:
+            return 1.0
+
+        num_negative = tf.cast(tf.shape(hardness)[1], hardness.dtype)
+        weights = tf.nn.softmax(self.config.adversarial_temperature * hardness, axis=1) * num_negative
+
+        return tf.stop_gradient(weights)
+
+    def get_reg(self):
+        """Function to get the regularization of the parameters which does not depend on the batch, 0 if none."""
+        return 0.0
+
+    def batch_reg(self):
+        """Function to get the regularization get_loss adds to the loss of a batch (see include_reg)."""
+        return self.get_reg() if self.include_reg else 0.0
+
+    def pairwise_margin_loss(self, score_positive, score_negative, margin=None):
         ''' pairwise margin loss function 
             pairwise margin based ranking loss is defined as 
 
@@ -57,11 +122,19 @@ class ModelMeta(tf.keras.Model):
                 for all negative samples: 
                     loss += [margin + f(positive samples) - f(negative samples))]+
             
-            In this method, the dimensions of score_positive and score_negative are assume to be equal. 
-                => [b], where [b] is the number of batch.
+            In this method, f is a distance (the lower the more plausible) and the dimension of 
+            score_negative should be a multiple of score_positive. 
+                => [b] or k*[b], where [b] is the number of batch and the k negative samples of 
+                   a positive sample are next to each other.
+            The negative samples are weighted by adversarial_weights.
         '''
+        margin = self.config.margin if margin is None else margin
+
+        score_positive = tf.reshape(score_positive, [-1, 1])
+        score_negative = tf.reshape(score_negative, [tf.shape(score_positive)[0], -1])
 
-        loss = tf.maximum(score_positive + self.config.margin - score_negative, 0)
+        loss = tf.maximum(score_positive + margin - score_negative, 0)
+        loss = self.adversarial_weights(-score_negative) * loss
 
         return tf.reduce_sum(loss)
 
@@ -73,13 +146,19 @@ class ModelMeta(tf.keras.Model):
                 if positive sample: loss -= f(positive samples) 
                 if negative sample: loss += f(negative samples)                  
             
-            In this method, the dimensions of score_negative should a multiple of score_positive. 
-                => [b] or k*[b], where [b] is the number of batch.
+            In this method, f is a score (the higher the more plausible) and the dimension of 
+            score_negative should a multiple of score_positive. 
+                => [b] or k*[b], where [b] is the number of batch and the k negative samples of 
+                   a positive sample are next to each other.
+            The negative samples are weighted by adversarial_weights.
         '''
-        loss = tf.concat([-1*score_positve, score_negative], axis=0)
-        loss = tf.nn.softplus(loss)
+        score_positve = tf.reshape(score_positve, [-1])
+        score_negative = tf.reshape(score_negative, [tf.shape(score_positve)[0], -1])
 
-        return tf.reduce_sum(loss)
+        loss_positive = tf.nn.softplus(-1*score_positve)
+        loss_negative = self.adversarial_weights(score_negative) * tf.nn.softplus(score_negative)
+
+        return tf.reduce_sum(loss_positive) + tf.reduce_sum(loss_negative)
 
 
 class TrainerMeta:
@@ -144,10 +144,14 @@ class NTN(ModelMeta):
         energy_pos = self.match(pos_h_e, pos_r_e, pos_t_e)
         energy_neg = self.match(neg_h_e, neg_r_e, neg_t_e)
 
-        loss = tf.reduce_sum(tf.maximum(energy_neg + 1 - energy_pos, 0))
+        # match is a similarity, the negated energies are distances.
+        loss = self.pairwise_margin_loss(-energy_pos, -energy_neg, margin=1)
 
-        regul = tf.sqrt(sum([tf.reduce_sum(tf.square(var)) for var in self.parameter_list]))
-        return loss + self.config.lmbda*regul
+        return loss + self.batch_reg()
+
+    def get_reg(self):
+        """Performs regularization of all the parameters."""
+        return self.config.lmbda*tf.sqrt(sum([tf.reduce_sum(tf.square(var)) for var in self.parameter_list]))
 
     def predict(self, h, r, t, topk=-1):
         """Function that performs prediction for TransE. 
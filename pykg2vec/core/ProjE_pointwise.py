@@ -77,12 +77,16 @@ class ProjE_pointwise(ModelMeta):
         hrt_loss = self.forward(h, r, tf.cast(tf.sparse.to_dense(tf.sparse.reorder(hr_t)), dtype=tf.float32))
         trh_loss = self.backward(t, r, tf.cast(tf.sparse.to_dense(tf.sparse.reorder(tr_h)), dtype=tf.float32))
 
-        regularizer_loss = tf.reduce_sum(tf.abs(self.De1) + tf.abs(self.Dr1)) + tf.reduce_sum(tf.abs(self.De2) + tf.abs(self.Dr2)) + tf.reduce_sum(tf.abs(self.ent_embeddings)) + tf.reduce_sum(tf.abs(self.rel_embeddings))
-        
-        loss = hrt_loss + trh_loss + regularizer_loss*self.config.lmbda
+        loss = hrt_loss + trh_loss + self.batch_reg()
         
         return loss
 
+    def get_reg(self):
+        """Performs regularization of all the parameters."""
+        regularizer_loss = tf.reduce_sum(tf.abs(self.De1) + tf.abs(self.Dr1)) + tf.reduce_sum(tf.abs(self.De2) + tf.abs(self.Dr2)) + tf.reduce_sum(tf.abs(self.ent_embeddings)) + tf.reduce_sum(tf.abs(self.rel_embeddings))
+
+        return regularizer_loss*self.config.lmbda
+
     def forward(self, h, r, hr_t):
         emb_hr_h = tf.nn.embedding_lookup(self.ent_embeddings, h)  # [m, k]
         emb_hr_r = tf.nn.embedding_lookup(self.rel_embeddings, r)  # [m, k]
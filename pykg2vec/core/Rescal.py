@@ -114,7 +114,8 @@ class Rescal(ModelMeta):
         pos_score = self.match(pos_h_e, pos_r_e, pos_t_e)
         neg_score = self.match(neg_h_e, neg_r_e, neg_t_e)
 
-        loss = tf.reduce_sum(tf.maximum(neg_score + self.config.margin - pos_score, 0))
+        # match is a similarity, the negated scores are distances.
+        loss = self.pairwise_margin_loss(-pos_score, -neg_score)
         return loss
 
     def predict(self, h, r, t, topk=-1):
@@ -104,6 +104,11 @@ class RotatE(ModelMeta):
         score_i = hr * ri + hi * rr - ti
         return tf.reduce_sum(tf.sqrt(score_r ** 2 + score_i ** 2), -1)
 
+    def plausibility(self, h, r, t):
+        """Function to score triples, the higher the more plausible."""
+        (h_e_r, h_e_i), (r_e_r, r_e_i), (t_e_r, t_e_i) = self.embed(h, r, t)
+        return -self.dissimilarity(h_e_r, h_e_i, r_e_r, r_e_i, t_e_r, t_e_i)
+
     def get_loss(self, pos_h, pos_r, pos_t, neg_h, neg_r, neg_t):
         """Defines the layers of the algorithm."""
         (pos_h_e_r, pos_h_e_i), (pos_r_e_r, pos_r_e_i), (pos_t_e_r, pos_t_e_i) = self.embed(pos_h, pos_r, pos_t)
@@ -113,7 +118,31 @@ class RotatE(ModelMeta):
         pos_score = self.dissimilarity(pos_h_e_r, pos_h_e_i, pos_r_e_r, pos_r_e_i, pos_t_e_r, pos_t_e_i)
         neg_score = self.dissimilarity(neg_h_e_r, neg_h_e_i, neg_r_e_r, neg_r_e_i, neg_t_e_r, neg_t_e_i)
 
-        loss = tf.reduce_sum(tf.maximum(pos_score + self.config.margin - neg_score, 0))
+        loss = self.pairwise_margin_loss(pos_score, neg_score)
+
+        return loss
+
+    def get_loss_shared_negatives(self, pos_h, pos_r, pos_t, neg_pool):
+        """Defines the loss function when a batch shares a pool of negative entities.
+
+           The head and the tail of every positive triple are replaced by every entity
+           of the pool, the distances are broadcasted to [b, n, k] and reduced to [b, 2n].
+        """
+        (h_e_r, h_e_i), (r_e_r, r_e_i), (t_e_r, t_e_i) = self.embed(pos_h, pos_r, pos_t)
+        pool_e_r = tf.expand_dims(tf.nn.embedding_lookup(self.ent_embeddings, neg_pool), 0)
+        pool_e_i = tf.expand_dims(tf.nn.embedding_lookup(self.ent_embeddings_imag, neg_pool), 0)
+
+        pos_score = self.dissimilarity(h_e_r, h_e_i, r_e_r, r_e_i, t_e_r, t_e_i)
+
+        h_e_r, h_e_i = tf.expand_dims(h_e_r, 1), tf.expand_dims(h_e_i, 1)
+        r_e_r, r_e_i = tf.expand_dims(r_e_r, 1), tf.expand_dims(r_e_i, 1)
+        t_e_r, t_e_i = tf.expand_dims(t_e_r, 1), tf.expand_dims(t_e_i, 1)
+
+        neg_score_tail = self.dissimilarity(h_e_r, h_e_i, r_e_r, r_e_i, pool_e_r, pool_e_i)
+        neg_score_head = self.dissimilarity(pool_e_r, pool_e_i, r_e_r, r_e_i, t_e_r, t_e_i)
+        neg_score = tf.concat([neg_score_tail, neg_score_head], axis=1)
+
+        loss = self.pairwise_margin_loss(pos_score, neg_score)
 
         return loss
 
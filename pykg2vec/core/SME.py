@@ -185,7 +185,8 @@ class SME(ModelMeta):
         energy_pos = self.match(pos_h_e, pos_r_e, pos_t_e)
         energy_neg = self.match(neg_h_e, neg_r_e, neg_t_e)
 
-        loss = tf.reduce_sum(tf.maximum(energy_neg + self.config.margin - energy_pos, 0))
+        # match is a similarity, the negated energies are distances.
+        loss = self.pairwise_margin_loss(-energy_pos, -energy_neg)
 
         return loss
 
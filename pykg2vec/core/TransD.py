@@ -86,11 +86,11 @@ class TransD(ModelMeta):
                 Tensors: Returns head, relation and tail embedding Tensors.
         """
         emb_h = tf.nn.embedding_lookup(self.ent_embeddings, h)
-        emb_r = tf.nn.embedding_lookup(self.rel_embeddings, r)
+        emb_r = self.relation_lookup(self.rel_embeddings, r)
         emb_t = tf.nn.embedding_lookup(self.ent_embeddings, t)
 
         h_m = tf.nn.embedding_lookup(self.ent_mappings, h)
-        r_m = tf.nn.embedding_lookup(self.rel_mappings, r)
+        r_m = self.relation_lookup(self.rel_mappings, r)
         t_m = tf.nn.embedding_lookup(self.ent_mappings, t)
 
         emb_h = self.projection(emb_h, h_m, r_m)
@@ -112,6 +112,10 @@ class TransE(ModelMeta):
         
         return tf.reduce_sum(dissimilarity, axis=axis)
 
+    def plausibility(self, h, r, t):
+        """Function to score triples, the higher the more plausible."""
+        return -self.dissimilarity(*self.embed(h, r, t))
+
     def get_loss(self, pos_h, pos_r, pos_t, neg_h, neg_r, neg_t):
         """Defines the loss function for the algorithm."""
         pos_h_e, pos_r_e, pos_t_e = self.embed(pos_h, pos_r, pos_t)
@@ -124,6 +128,47 @@ class TransE(ModelMeta):
 
         return loss
 
+    def pool_distance(self, anchor, pool):
+        """Function to calculate the distance between every anchor and every entity of a pool.
+
+        Args:
+            anchor (Tensor): shape [b, k] the translated embeddings of a batch.
+            pool (Tensor): shape [n, k] the embeddings of the pooled entities.
+
+        Returns:
+            Tensor: shape [b, n] the aggregated distance measure.
+        """
+        if self.config.L1_flag:
+            return tf.reduce_sum(tf.math.abs(tf.expand_dims(anchor, 1) - tf.expand_dims(pool, 0)), axis=-1)
+
+        # ||a - e||^2 = ||a||^2 - 2a.e + ||e||^2, a single [b, k] x [k, n] matmul.
+        return tf.reduce_sum(tf.math.square(anchor), axis=-1, keepdims=True) \
+               - 2 * tf.matmul(anchor, pool, transpose_b=True) \
+               + tf.reduce_sum(tf.math.square(pool), axis=-1)
+
+    def get_loss_shared_negatives(self, pos_h, pos_r, pos_t, neg_pool):
+        """Defines the loss function when a batch shares a pool of negative entities.
+
+           The head and the tail of every positive triple are replaced by every entity
+           of the pool, which gives [b, 2n] negative scores out of n embedding lookups.
+        """
+        pos_h_e, pos_r_e, pos_t_e = self.embed(pos_h, pos_r, pos_t)
+        pos_score = self.dissimilarity(pos_h_e, pos_r_e, pos_t_e)
+
+        norm_h = tf.nn.l2_normalize(pos_h_e, axis=-1)
+        norm_r = tf.nn.l2_normalize(pos_r_e, axis=-1)
+        norm_t = tf.nn.l2_normalize(pos_t_e, axis=-1)
+        norm_pool = tf.nn.l2_normalize(tf.nn.embedding_lookup(self.ent_embeddings, neg_pool), axis=-1)
+
+        # corrupted tails: (h + r) - e, corrupted heads: e - (t - r).
+        neg_score_tail = self.pool_distance(norm_h + norm_r, norm_pool)
+        neg_score_head = self.pool_distance(norm_t - norm_r, norm_pool)
+        neg_score = tf.concat([neg_score_tail, neg_score_head], axis=1)
+
+        loss = self.pairwise_margin_loss(pos_score, neg_score)
+
+        return loss
+
     def predict(self, h, r, t, topk=-1):
         """Function that performs prediction for TransE. 
            shape of h can be either [num_tot_entity] or [1]. 
@@ -91,10 +91,10 @@ class TransH(ModelMeta):
                 Tensors: Returns head, relation and tail embedding Tensors.
         """
         emb_h =    tf.nn.embedding_lookup(self.ent_embeddings, h)
-        emb_r =    tf.nn.embedding_lookup(self.rel_embeddings, r)
+        emb_r =    self.relation_lookup(self.rel_embeddings, r)
         emb_t =    tf.nn.embedding_lookup(self.ent_embeddings, t)
         
-        proj_vec = tf.nn.embedding_lookup(self.w, r)
+        proj_vec = self.relation_lookup(self.w, r)
 
         emb_h = self.projection(emb_h, proj_vec)
         emb_t = self.projection(emb_t, proj_vec)
@@ -134,7 +134,7 @@ class TransH(ModelMeta):
         neg_h_e, neg_r_e, neg_t_e = self.embed(neg_h, neg_r, neg_t)
         neg_score = self.dissimilarity(neg_h_e, neg_r_e, neg_t_e)
 
-        loss = self.pairwise_margin_loss(pos_score, neg_score) + self.get_reg()
+        loss = self.pairwise_margin_loss(pos_score, neg_score) + self.batch_reg()
 
         return loss
       
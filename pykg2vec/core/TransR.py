@@ -83,6 +83,9 @@ class TransR(ModelMeta):
             Returns:
                 Tensors: Returns head, relation and tail embedding Tensors.
         """
+        if self.config.relation_grouped:
+            return self.embed_grouped(h, r, t)
+
         h_e = tf.nn.embedding_lookup(self.ent_embeddings, h)
         r_e = tf.nn.embedding_lookup(self.rel_embeddings, r)
         t_e = tf.nn.embedding_lookup(self.ent_embeddings, t)
@@ -107,6 +110,35 @@ class TransR(ModelMeta):
         # [b, d]
         return h_e, r_e, t_e
 
+    def embed_grouped(self, h, r, t):
+        """Function to get the embedding value of a batch grouped by relation.
+
+           Instead of gathering a [k, d] matrix per triple, the rows of every relation are
+           scattered into a [u, m, k] block and projected with one matmul per relation,
+           u being the number of relations of the batch and m the rows of the largest one.
+
+           Args:
+               h (Tensor): Head entities ids.
+               r (Tensor): Relation ids of the triple.
+               t (Tensor): Tail entity ids of the triple.
+
+            Returns:
+                Tensors: Returns head, relation and tail embedding Tensors.
+        """
+        h_e = tf.nn.l2_normalize(tf.nn.embedding_lookup(self.ent_embeddings, h), axis=-1)
+        r_e = tf.nn.l2_normalize(self.relation_lookup(self.rel_embeddings, r), axis=-1)
+        t_e = tf.nn.l2_normalize(tf.nn.embedding_lookup(self.ent_embeddings, t), axis=-1)
+
+        relations, index, max_rows = self.group_by_relation(r)
+        matrix = tf.nn.embedding_lookup(self.rel_matrix, relations)
+        # [u, k, d]
+
+        block_shape = tf.stack([tf.size(relations), max_rows, tf.shape(h_e)[-1]])
+        h_e = tf.gather_nd(tf.matmul(tf.scatter_nd(index, h_e, block_shape), matrix), index)
+        t_e = tf.gather_nd(tf.matmul(tf.scatter_nd(index, t_e, block_shape), matrix), index)
+        # [b, d] <= [u, m, d] = [u, m, k] * [u, k, d]
+        return h_e, r_e, t_e
+
     def dissimilarity(self, h, r, t, axis=-1):
         """Function to calculate distance measure in embedding space.
         
@@ -3,10 +3,15 @@
 """
 This module is for testing unit functions of generator
 """
+import queue
+import collections
+import threading
 import pytest
+import numpy as np
 import tensorflow as tf
 
 from pykg2vec.config.config import (
+    ComplexConfig,
     TransDConfig,
     TransEConfig,
     TransGConfig,
@@ -14,7 +19,7 @@ from pykg2vec.config.config import (
     TransMConfig,
     TransRConfig,
 )
-from pykg2vec.utils.generator import Generator
+from pykg2vec.utils.generator import AliasTable, Generator, NegativeSampler, number_of_batches, raw_data_generator, read_training_triples
 from pykg2vec.config.config import ProjE_pointwiseConfig, KGEArgParser
 from pykg2vec.utils.kgcontroller import KnowledgeGraph
 
@@ -79,4 +84,326 @@ def test_generator_trans(Config):
 
     generator.stop()
 
-    ## pass if no exception raised amid the process.
\ No newline at end of file
+    ## pass if no exception raised amid the process.
+
+def test_generator_epoch_reshuffle():
+    """Function to test that each epoch of the feeder is a full, reshuffled pass over the training triples."""
+    knowledge_graph = KnowledgeGraph(dataset="freebase15k")
+    knowledge_graph.prepare_data()
+
+    dummy_config = TransEConfig(KGEArgParser().get_args(['-pb', 'true']))
+    dummy_config.batch_size = 1000
+    num_triples = dummy_config.kg_meta.tot_train_triples
+    num_batch = number_of_batches(num_triples, dummy_config.batch_size, partial_batch=True)
+
+    raw_queue = queue.Queue(2 * num_batch)
+    feeder = threading.Thread(target=raw_data_generator, args=(raw_queue, None, dummy_config), daemon=True)
+    feeder.start()
+
+    epochs = []
+    for epoch in range(2):
+        batches = [raw_queue.get()[1] for _ in range(num_batch)]
+        assert sum(len(batch) for batch in batches) == num_triples
+        epochs.append(np.concatenate(batches))
+
+    assert len(np.unique(epochs[0], axis=0)) == num_triples
+    assert not np.array_equal(epochs[0], epochs[1])
+
+
+def test_generator_relation_grouped():
+    """Function to test that the relation-grouped feeder keeps full epochs with few relations per batch."""
+    knowledge_graph = KnowledgeGraph(dataset="freebase15k")
+    knowledge_graph.prepare_data()
+
+    dummy_config = TransEConfig(KGEArgParser().get_args(['-pb', 'true', '-rg', 'true']))
+    dummy_config.batch_size = 1000
+    num_triples = dummy_config.kg_meta.tot_train_triples
+    num_batch = number_of_batches(num_triples, dummy_config.batch_size, partial_batch=True)
+
+    raw_queue = queue.Queue(num_batch)
+    feeder = threading.Thread(target=raw_data_generator, args=(raw_queue, None, dummy_config), daemon=True)
+    feeder.start()
+
+    batches = [raw_queue.get()[1] for _ in range(num_batch)]
+    assert len(np.unique(np.concatenate(batches), axis=0)) == num_triples
+
+    num_relations = [len(np.unique(batch[:, 1])) for batch in batches]
+    assert np.mean(num_relations) < 0.1 * dummy_config.batch_size
+    # the rows of a relation are contiguous.
+    assert all(np.sum(batch[1:, 1] != batch[:-1, 1]) + 1 == n for batch, n in zip(batches, num_relations))
+
+
+def test_generator_locality_order():
+    """Function to test that the locality-aware order keeps full epochs and reuses more entities across batches."""
+    knowledge_graph = KnowledgeGraph(dataset="freebase15k")
+    knowledge_graph.prepare_data()
+
+    num_entities = {}
+    for locality_window in ['0', '4']:
+        dummy_config = TransEConfig(KGEArgParser().get_args(['-pb', 'true', '-lw', locality_window]))
+        dummy_config.batch_size = 100
+        num_triples = dummy_config.kg_meta.tot_train_triples
+        num_batch = number_of_batches(num_triples, dummy_config.batch_size, partial_batch=True)
+
+        raw_queue = queue.Queue(num_batch)
+        feeder = threading.Thread(target=raw_data_generator, args=(raw_queue, None, dummy_config), daemon=True)
+        feeder.start()
+
+        batches = [raw_queue.get()[1] for _ in range(num_batch)]
+        assert len(np.unique(np.concatenate(batches), axis=0)) == num_triples
+
+        # distinct entities touched by windows of 4 consecutive batches.
+        windows = [np.concatenate(batches[i:i + 4]) for i in range(0, num_batch - 3, 4)]
+        num_entities[locality_window] = np.mean([len(np.unique(window[:, [0, 2]])) for window in windows])
+
+    assert num_entities['4'] < num_entities['0']
+
+
+def test_alias_table():
+    """Function to test that the alias tables encode the exact distribution of every segment."""
+    weights = np.r_[np.random.random(20), 0, 0, 50.0, np.random.random(7)]
+    offsets = [0, 8, 8, 30]
+    table = AliasTable(weights, values=np.arange(30) + 100, offsets=offsets)
+
+    for start, stop in zip(offsets[:-1], offsets[1:]):
+        if start == stop:
+            continue
+        size = stop - start
+        prob = table.prob[start:stop]
+        dist = np.bincount(np.arange(size), prob, minlength=size) + np.bincount(table.alias[start:stop] - start, 1 - prob, minlength=size)
+        np.testing.assert_allclose(dist / size, weights[start:stop] / weights[start:stop].sum(), atol=1e-12)
+
+    samples = table.sample(np.full(1000, 2))
+    assert np.all((samples >= 108) & (samples < 130))
+    assert not np.any(np.isin(samples, [120, 121]))
+
+
+def test_typed_negative_sampler():
+    """Function to test that the typed sampler draws the corruptions from the domain and range of the relation."""
+    knowledge_graph = KnowledgeGraph(dataset="freebase15k")
+    knowledge_graph.prepare_data()
+
+    dummy_config = TransEConfig(KGEArgParser().get_args(['-s', 'typed']))
+    data = read_training_triples(dummy_config)
+    sampler = NegativeSampler(dummy_config, data)
+
+    relations = data[:1000, 1]
+    heads = sampler.draw_entities(data[:1000], True, 0, np.random.default_rng())
+    tails = sampler.draw_entities(data[:1000], False, 0, np.random.default_rng())
+    assert np.all(np.isin(heads * sampler.tot_relation + relations, data[:, 0].astype(np.int64) * sampler.tot_relation + data[:, 1]))
+    assert np.all(np.isin(tails * sampler.tot_relation + relations, data[:, 2].astype(np.int64) * sampler.tot_relation + data[:, 1]))
+
+
+@pytest.mark.parametrize('Config, training_strategy, num_fields', [
+    (TransEConfig, 'pairwise_based', 6),
+    (ComplexConfig, 'pointwise_based', 4),
+])
+def test_generator_shared_memory(Config, training_strategy, num_fields):
+    """Function to test the generator passing batches through the shared-memory ring buffer."""
+    knowledge_graph = KnowledgeGraph(dataset="freebase15k")
+    knowledge_graph.prepare_data()
+
+    dummy_config = Config(KGEArgParser().get_args(['-shm', 'true']))
+    generator = Generator(dummy_config, training_strategy=training_strategy)
+    assert generator.shared_buffer is not None
+
+    for i in range(2 * generator.shared_buffer.num_slots):
+        data = list(next(generator))
+        assert len(data) == num_fields
+        assert all(isinstance(field, tf.Tensor) for field in data)
+        assert len(data[0]) == len(data[1])
+        assert len(data[0]) == len(data[2])
+
+    generator.stop()
+
+
+@pytest.mark.parametrize('sampling', ['uniform', 'bern', 'degree', 'typed', 'cache'])
+def test_negative_sampler(sampling):
+    """Function to test that the vectorized sampler only corrupts one side of each triple into a non-training triple."""
+    knowledge_graph = KnowledgeGraph(dataset="freebase15k")
+    knowledge_graph.prepare_data()
+
+    dummy_config = TransEConfig(KGEArgParser().get_args(['-s', sampling]))
+    data = read_training_triples(dummy_config)
+    sampler = NegativeSampler(dummy_config, data)
+
+    pos_triples = data[:500]
+    neg_triples = sampler.corrupt(pos_triples, 3)
+    assert neg_triples.shape == (1500, 3)
+
+    expected = np.repeat(pos_triples, 3, axis=0)
+    assert np.all(neg_triples[:, 1] == expected[:, 1])
+    assert np.all((neg_triples[:, 0] == expected[:, 0]) | (neg_triples[:, 2] == expected[:, 2]))
+    assert not np.any(sampler.is_positive(neg_triples[:, 0], neg_triples[:, 1], neg_triples[:, 2]))
+    assert np.all(sampler.is_positive(pos_triples[:, 0], pos_triples[:, 1], pos_triples[:, 2]))
+
+
+@pytest.mark.parametrize('Config, training_strategy, num_fields', [
+    (TransEConfig, 'pairwise_based', 6),
+    (ComplexConfig, 'pointwise_based', 4),
+    (ProjE_pointwiseConfig, 'projection_based', 5),
+])
+def test_generator_thread_backend(Config, training_strategy, num_fields):
+    """Function to test the generator running its workers as threads."""
+    knowledge_graph = KnowledgeGraph(dataset="freebase15k")
+    knowledge_graph.prepare_data()
+
+    dummy_config = Config(KGEArgParser().get_args(['-gbk', 'thread']))
+    generator = Generator(dummy_config, training_strategy=training_strategy)
+
+    for i in range(10):
+        data = list(next(generator))
+        assert len(data) == num_fields
+        assert len(data[0]) == len(data[1])
+        assert len(data[0]) == len(data[2])
+
+    generator.stop()
+    assert not any(worker.is_alive() for worker in generator.process_list)
+
+
+def test_generator_shared_negatives():
+    """Function to test the generator emitting a negative entity pool shared by the batch."""
+    knowledge_graph = KnowledgeGraph(dataset="freebase15k")
+    knowledge_graph.prepare_data()
+
+    dummy_config = TransEConfig(KGEArgParser().get_args(['-sng', '32']))
+    generator = Generator(dummy_config, training_strategy='shared_negative_based')
+
+    for i in range(10):
+        data = list(next(generator))
+        assert len(data) == 4
+        assert len(data[0]) == len(data[1])
+        assert len(data[0]) == len(data[2])
+        assert len(data[3]) == 32
+
+    generator.stop()
+
+
+@pytest.mark.parametrize('backend', ['process', 'thread'])
+def test_generator_stats(backend):
+    """Function to test the throughput and back-pressure statistics of the generator."""
+    knowledge_graph = KnowledgeGraph(dataset="freebase15k")
+    knowledge_graph.prepare_data()
+
+    dummy_config = TransEConfig(KGEArgParser().get_args(['-gbk', backend, '-npg', '2']))
+    generator = Generator(dummy_config, training_strategy='pairwise_based')
+
+    for i in range(20):
+        next(generator)
+
+    summary = generator.stats.summary()
+    assert sorted(summary['workers']) == ['feeder', 'processor-0', 'processor-1']
+    assert summary['workers']['feeder']['batches'] >= 20
+    assert sum(summary['workers']['processor-%d' % i]['batches'] for i in range(2)) >= 20
+    assert summary['workers']['feeder']['batches_per_sec'] > 0
+    assert summary['consumer_wait'] > 0
+    assert len(generator.stats.occupancy) == 20
+    assert 0 <= summary['processed_queue_mean'] <= summary['processed_queue_max'] <= generator.processed_queue_size
+
+    generator.stats.reset()
+    assert generator.stats.summary()['workers']['feeder']['batches'] == 0
+
+    generator.stop()
+
+
+@pytest.mark.parametrize('backend, shared_memory', [('process', 'false'), ('process', 'true'), ('thread', 'false')])
+def test_generator_deterministic(backend, shared_memory):
+    """Function to test that a seeded generator with reordering yields the same batches every run."""
+    knowledge_graph = KnowledgeGraph(dataset="freebase15k")
+    knowledge_graph.prepare_data()
+
+    streams = []
+    for run in range(2):
+        dummy_config = TransEConfig(KGEArgParser().get_args(['-gbk', backend, '-shm', shared_memory, '-npg', '3', '-rs', '7', '-rb', 'true']))
+        generator = Generator(dummy_config, training_strategy='pairwise_based')
+        streams.append([[np.array(field) for field in next(generator)] for _ in range(15)])
+        generator.stop()
+
+    for batch, other in zip(*streams):
+        for field, other_field in zip(batch, other):
+            np.testing.assert_array_equal(field, other_field)
+
+    assert not np.array_equal(streams[0][0][3], streams[0][1][3])
+
+
+@pytest.mark.parametrize('backend', ['process', 'thread'])
+def test_generator_shard(backend):
+    """Function to test that the shards of the data-parallel workers are disjoint and of equal size."""
+    knowledge_graph = KnowledgeGraph(dataset="freebase15k")
+    knowledge_graph.prepare_data()
+
+    dummy_config = TransEConfig(KGEArgParser().get_args(['-gbk', backend]))
+    dummy_config.batch_size = 100
+    num_triples = dummy_config.kg_meta.tot_train_triples
+
+    shards = []
+    for shard_idx in range(3):
+        generator = Generator(dummy_config, training_strategy="pairwise_based", shard=(shard_idx, 3))
+        assert generator.num_batch == number_of_batches(num_triples // 3, 100)
+        pos_triples = np.stack(list(next(generator))[:3], axis=1)
+        assert len(pos_triples) == 100
+        shards.append(generator.train_data)
+        generator.stop()
+
+    assert all(len(shard) == num_triples // 3 for shard in shards)
+    keys = [set(map(tuple, shard)) for shard in shards]
+    assert not keys[0] & keys[1] and not keys[1] & keys[2] and not keys[0] & keys[2]
+
+
+def test_generator_reorder_shared_memory():
+    """Function to test that reordering out of the ring buffer keeps the batches and releases every slot once."""
+    knowledge_graph = KnowledgeGraph(dataset="freebase15k")
+    knowledge_graph.prepare_data()
+
+    streams = []
+    for shared_memory in ['false', 'true']:
+        dummy_config = TransEConfig(KGEArgParser().get_args(['-shm', shared_memory, '-npg', '4', '-rs', '1', '-rb', 'true']))
+        dummy_config.batch_size = 16
+        generator = Generator(dummy_config, training_strategy='pairwise_based')
+
+        if generator.shared_buffer is not None:
+            received, released = [], []
+            get, release = generator.processed_queue.get, generator.shared_buffer.release
+
+            def logged_get(*args, **kwargs):
+                batch_idx, batch = get(*args, **kwargs)
+                received.append(batch[0])
+                return batch_idx, batch
+
+            def logged_release(slot_idx):
+                released.append(slot_idx)
+                release(slot_idx)
+
+            generator.processed_queue.get = logged_get
+            generator.shared_buffer.release = logged_release
+
+        streams.append([[np.array(field) for field in next(generator)] for _ in range(300)])
+
+        if generator.shared_buffer is not None:
+            # every slot received is released once, but the one of the batch the caller still holds.
+            assert len(released) == len(received) - (generator.last_slot is not None)
+            assert not collections.Counter(released) - collections.Counter(received)
+        generator.stop()
+
+    for batch, other in zip(*streams):
+        for field, other_field in zip(batch, other):
+            np.testing.assert_array_equal(field, other_field)
+
+
+def test_generator_epochs():
+    """Function to test that a capped generator feeds that many batches per epoch and counts them in their epoch."""
+    knowledge_graph = KnowledgeGraph(dataset="freebase15k")
+    knowledge_graph.prepare_data()
+
+    dummy_config = TransEConfig(KGEArgParser().get_args(['-npg', '3', '-rs', '5', '-rb', 'true']))
+    generator = Generator(dummy_config, training_strategy='pairwise_based', start_epoch=2, max_batches=4)
+    assert generator.num_batch == 4
+
+    epochs = []
+    for _ in range(12):
+        next(generator)
+        epochs.append(generator.epoch)
+    generator.stop()
+
+    assert epochs == [2] * 4 + [3] * 4 + [4] * 4
+    assert [generator.batches_left(epoch_idx) for epoch_idx in range(2, 6)] == [0, 0, 0, 4]
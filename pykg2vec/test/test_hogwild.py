@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+This module is for testing unit functions of the Hogwild training
+"""
+import pytest
+import numpy as np
+import tensorflow as tf
+
+from pykg2vec.config.config import KGEArgParser, Importer
+from pykg2vec.utils.trainer import Trainer
+from pykg2vec.utils.hogwild import SharedParameters, HogwildWorker, HogwildTrainer
+from pykg2vec.utils.kgcontroller import KnowledgeGraph
+
+
+@pytest.mark.skip(reason="This is a functional method.")
+def get_config(name, optimizer, tmpdir=None):
+    args = KGEArgParser().get_args([])
+
+    knowledge_graph = KnowledgeGraph(dataset="Freebase15k")
+    knowledge_graph.prepare_data()
+
+    config_def, model_def = Importer().import_model_config(name)
+    config = config_def(args=args)
+
+    config.optimizer = optimizer
+    config.learning_rate = 0.1
+    config.batch_size = 64
+    config.test_num = 10
+    config.disp_result = False
+    config.save_model = False
+    config.hogwild_workers = 2
+    if tmpdir is not None:
+        config.path_result = tmpdir.mkdir("result_path")
+
+    return config, model_def
+
+
+def test_hogwild_worker_step():
+    """Function to test that a worker step is the SGD step of the batch, applied to its rows only."""
+    config, model_def = get_config("transe", "sgd")
+
+    reference = model_def(config)
+    reference.def_parameters()
+    parameters = SharedParameters(reference.trainable_variables)
+    before = [np.array(table) for table in parameters.tables]
+
+    local = model_def(config)
+    local.def_parameters()
+    worker = HogwildWorker(local, parameters, "pairwise_based")
+
+    pos_triples = np.asarray([[0, 1, 2], [3, 1, 4]], dtype=np.int32)
+    neg_triples = np.asarray([[5, 1, 2], [3, 1, 6]], dtype=np.int32)
+    worker.train_step(pos_triples, neg_triples)
+
+    with tf.GradientTape() as tape:
+        loss = reference.get_loss(*pos_triples.T, *neg_triples.T)
+    gradients = tape.gradient(loss, reference.trainable_variables)
+
+    for table, init, gradient in zip(parameters.tables, before, gradients):
+        expected = init - config.learning_rate * tf.convert_to_tensor(gradient).numpy()
+        np.testing.assert_allclose(table, expected, rtol=1e-5, atol=1e-6)
+
+    entity_table = parameters.tables[0]
+    untouched = np.setdiff1d(np.arange(len(entity_table)), [0, 2, 3, 4, 5, 6])
+    np.testing.assert_array_equal(entity_table[untouched], before[0][untouched])
+
+
+@pytest.mark.parametrize('model_name,optimizer', [('transe', 'sgd'), ('complex', 'adagrad')])
+def test_hogwild_training(tmpdir, model_name, optimizer):
+    """Function to test the training with the Hogwild worker processes."""
+    config, model_def = get_config(model_name, optimizer, tmpdir)
+    config.epochs = 2
+
+    trainer = Trainer(model=model_def(config), debug=True)
+    trainer.build_model()
+    before = [variable.numpy() for variable in trainer.model.trainable_variables]
+    trainer.train_model()
+
+    assert trainer.hogwild is None
+    assert len(trainer.training_results) == 2
+    assert all(np.isfinite(loss) and loss > 0 for _, loss in trainer.training_results)
+    assert any(not np.allclose(variable.numpy(), init) for variable, init in zip(trainer.model.trainable_variables, before))
+
+
+@pytest.mark.parametrize('model_name,optimizer,momentum', [('distmult', 'sgd', 0.0), ('transe', 'sparse_sgd', 0.9)])
+def test_hogwild_unsupported(model_name, optimizer, momentum):
+    """Function to test that the dense gradients and the momentum are refused before any worker starts."""
+    config, model_def = get_config(model_name, optimizer)
+    config.momentum = momentum
+
+    model = model_def(config)
+    model.def_parameters()
+    with pytest.raises(NotImplementedError):
+        HogwildTrainer(model, "pairwise_based")
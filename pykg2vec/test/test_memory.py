@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+This module is for testing unit functions of the memory estimate
+"""
+import pytest
+import numpy as np
+
+from pykg2vec.config.config import KGEArgParser, Importer
+from pykg2vec.utils.trainer import Trainer
+from pykg2vec.utils.memory import MemoryEstimator, MB
+from pykg2vec.utils.kgcontroller import KnowledgeGraph
+
+
+@pytest.mark.skip(reason="This is a functional method.")
+def get_model(name, optimizer, extra_args=()):
+    args = KGEArgParser().get_args(list(extra_args))
+
+    knowledge_graph = KnowledgeGraph(dataset="Freebase15k")
+    knowledge_graph.prepare_data()
+
+    config_def, model_def = Importer().import_model_config(name)
+    config = config_def(args=args)
+    config.optimizer = optimizer
+    config.disp_result = False
+    config.save_model = False
+
+    return model_def(config)
+
+
+@pytest.mark.parametrize('model_name,optimizer,slots', [('transr', 'adam', 2), ('ntn', 'sgd', 0), ('transe', 'rowwise_adagrad', None)])
+def test_parameter_and_optimizer_memory(model_name, optimizer, slots):
+    """Function to test the parameter and optimizer parts of the estimate."""
+    model = get_model(model_name, optimizer)
+    model.def_parameters()
+    estimate = MemoryEstimator(model, "pairwise_based").estimate(32)
+
+    parameters = sum(np.prod(variable.shape) * 4 for variable in model.trainable_variables)
+    assert estimate["parameters"] == parameters
+    if slots is None:
+        assert estimate["optimizer"] == sum(variable.shape[0] * 4 for variable in model.trainable_variables)
+    else:
+        assert estimate["optimizer"] == slots * parameters
+    assert estimate["activations"] > 0
+    assert estimate["total"] == estimate["parameters"] + estimate["optimizer"] + estimate["activations"]
+
+
+def test_activation_memory():
+    """Function to test that the activations grow with the batch, with the 1-N scores of ConvE."""
+    model = get_model("conve", "adam")
+    model.def_parameters()
+    estimator = MemoryEstimator(model, "projection_based")
+    model.config.batch_size = 100
+
+    tot_entity = model.config.kg_meta.tot_entity
+    assert estimator.activation_bytes(128) - estimator.activation_bytes(64) >= 64 * tot_entity * 4
+    assert model.config.batch_size == 100
+
+
+def test_largest_batch_size():
+    """Function to test that the chosen batch size fits the budget and twice that size does not."""
+    model = get_model("transr", "adam")
+    model.def_parameters()
+    estimator = MemoryEstimator(model, "pairwise_based")
+
+    budget = estimator.estimate(64)["total"] + 4 * (estimator.activation_bytes(128) - estimator.activation_bytes(64))
+    batch_size = estimator.largest_batch_size(budget)
+
+    assert batch_size > 64
+    assert estimator.estimate(batch_size)["total"] <= budget
+    assert estimator.estimate(2 * batch_size)["total"] > budget
+    assert estimator.largest_batch_size(estimator.parameter_bytes()) == 0
+
+
+def test_trainer_auto_batch_size():
+    """Function to test that the trainer picks the batch size fitting the budget when the model is built."""
+    model = get_model("transe", "adam", ['-mem', '2', '-abs', 'true'])
+    trainer = Trainer(model=model)
+    trainer.build_model()
+
+    estimate = MemoryEstimator(trainer.model, trainer.training_strategy).estimate(model.config.batch_size)
+    assert 0 < model.config.batch_size <= model.config.kg_meta.tot_train_triples
+    assert estimate["total"] <= 2 * MB
+
+
+def test_accumulated_batch_size():
+    """Function to test that with gradient accumulation the estimate holds the activations of one micro-batch."""
+    model = get_model("transr", "adam", ['-acc', '4'])
+    model.def_parameters()
+    estimator = MemoryEstimator(model, "pairwise_based")
+
+    assert estimator.estimate(256)["activations"] == estimator.activation_bytes(64)
+    budget = estimator.estimate(64)["total"] + 4 * (estimator.activation_bytes(128) - estimator.activation_bytes(64))
+    batch_size = estimator.largest_batch_size(budget)
+    assert batch_size % 4 == 0 and batch_size > 4 * 64
+    assert estimator.estimate(batch_size)["total"] <= budget
@@ -4,6 +4,8 @@
 This module is for testing unit functions of model
 """
 import pytest
+import numpy as np
+import tensorflow as tf
 
 
 from pykg2vec.config.config import *
@@ -76,4 +78,119 @@ def test_SMEB_args():
 
 def test_transE_display():
     """Function to test transE display."""
-    testing_function('transe', display=True)
\ No newline at end of file
+    testing_function('transe', display=True)
+
+
+@pytest.mark.parametrize("model_name, l1_flag", [('transe', True), ('transe', False), ('distmult', True), ('complex', True), ('rotate', True)])
+def test_shared_negatives_loss(model_name, l1_flag):
+    """Function to test that scoring a shared negative pool matches scoring the materialised corrupted triples."""
+    args = KGEArgParser().get_args(['-l1', str(l1_flag)])
+
+    knowledge_graph = KnowledgeGraph(dataset=args.dataset_name)
+    knowledge_graph.prepare_data()
+
+    config_def, model_def = Importer().import_model_config(model_name)
+    config = config_def(args=args)
+    config.lmbda = 0.0
+    model = model_def(config)
+    model.def_parameters()
+    for parameter in model.parameter_list:
+        parameter.assign(tf.random.normal(parameter.shape))
+
+    batch_size, pool_size = 8, 5
+    pos = tf.random.uniform([3, batch_size], maxval=min(config.kg_meta.tot_entity, config.kg_meta.tot_relation), dtype=tf.int32)
+    pos_h, pos_r, pos_t = pos[0], pos[1], pos[2]
+    neg_pool = tf.random.uniform([pool_size], maxval=config.kg_meta.tot_entity, dtype=tf.int32)
+
+    # every positive triple against every tail, then every head, replacement from the pool.
+    rep_h = tf.repeat(pos_h, 2*pool_size)
+    rep_r = tf.repeat(pos_r, 2*pool_size)
+    rep_t = tf.repeat(pos_t, 2*pool_size)
+    pool = tf.tile(neg_pool, [batch_size])
+    is_tail = tf.tile(tf.repeat([True, False], pool_size), [batch_size])
+    neg_h = tf.where(is_tail, rep_h, tf.tile(neg_pool, [2*batch_size]))
+    neg_t = tf.where(is_tail, tf.tile(neg_pool, [2*batch_size]), rep_t)
+
+    if model_name == 'complex':
+        y = tf.concat([tf.ones([batch_size]), -tf.ones([2*batch_size*pool_size])], 0)
+        expected = model.get_loss(tf.concat([pos_h, neg_h], 0), tf.concat([pos_r, rep_r], 0), tf.concat([pos_t, neg_t], 0), y)
+    else:
+        expected = model.get_loss(rep_h, rep_r, rep_t, neg_h, rep_r, neg_t)
+
+    loss = model.get_loss_shared_negatives(pos_h, pos_r, pos_t, neg_pool)
+
+    assert np.isclose(loss.numpy(), expected.numpy(), rtol=1e-4)
+
+@pytest.mark.parametrize("model_name", ['complex', 'distmult', 'hole', 'kg2e', 'ntn', 'rescal', 'rotate', 'slm', 'sme', 'transd', 'transe', 'transh', 'transm', 'transr'])
+@pytest.mark.parametrize("adversarial_temperature", [0.0, 1.0])
+def test_multiple_negatives_loss(model_name, adversarial_temperature):
+    """Function to test the losses with several (self-adversarially weighted) negative samples per positive one."""
+    args = KGEArgParser().get_args(['-ngr', '3', '-adv', str(adversarial_temperature), '-k', '8', '-km', '8', '-kr', '8'])
+
+    knowledge_graph = KnowledgeGraph(dataset=args.dataset_name)
+    knowledge_graph.prepare_data()
+
+    config_def, model_def = Importer().import_model_config(model_name)
+    config = config_def(args=args)
+    model = model_def(config)
+    model.def_parameters()
+
+    batch_size = 8
+    pos = tf.random.uniform([3, batch_size], maxval=config.kg_meta.tot_relation, dtype=tf.int32)
+    neg = tf.random.uniform([3, 3*batch_size], maxval=config.kg_meta.tot_relation, dtype=tf.int32)
+
+    with tf.GradientTape() as tape:
+        if model_name == 'complex':
+            y = tf.concat([tf.ones([batch_size]), -tf.ones([3*batch_size])], 0)
+            loss = model.get_loss(tf.concat([pos[0], neg[0]], 0), tf.concat([pos[1], neg[1]], 0), tf.concat([pos[2], neg[2]], 0), y)
+        else:
+            loss = model.get_loss(pos[0], pos[1], pos[2], neg[0], neg[1], neg[2])
+    gradients = tape.gradient(loss, model.trainable_variables)
+
+    assert np.isfinite(loss.numpy())
+    assert any(gradient is not None for gradient in gradients)
+
+@pytest.mark.parametrize("model_name, rel_hidden_size", [('transd', 8), ('transh', 8), ('transr', 6)])
+def test_relation_grouped_loss(model_name, rel_hidden_size):
+    """Function to test that the relation-grouped projections match the per-triple ones."""
+    losses, gradients = [], []
+    for relation_grouped in [False, True]:
+        args = KGEArgParser().get_args(['-rg', str(relation_grouped), '-k', '8', '-km', '8', '-kr', str(rel_hidden_size)])
+
+        knowledge_graph = KnowledgeGraph(dataset=args.dataset_name)
+        knowledge_graph.prepare_data()
+
+        config_def, model_def = Importer().import_model_config(model_name)
+        model = model_def(config_def(args=args))
+        model.def_parameters()
+        for idx, parameter in enumerate(model.parameter_list):
+            parameter.assign(tf.random.stateless_normal(parameter.shape, seed=[idx, 0]))
+
+        pos = tf.random.stateless_uniform([3, 16], seed=[1, 2], maxval=5, dtype=tf.int32)
+        neg = tf.random.stateless_uniform([3, 16], seed=[3, 4], maxval=5, dtype=tf.int32)
+
+        with tf.GradientTape() as tape:
+            loss = model.get_loss(pos[0], pos[1], pos[2], neg[0], pos[1], neg[2])
+        losses.append(loss.numpy())
+        gradients.append([tf.convert_to_tensor(gradient).numpy() for gradient in tape.gradient(loss, model.parameter_list)])
+
+    assert np.isclose(losses[0], losses[1], rtol=1e-5)
+    for gradient, grouped_gradient in zip(*gradients):
+        np.testing.assert_allclose(gradient, grouped_gradient, rtol=1e-4, atol=1e-6)
+
+def test_adversarial_weights():
+    """Function to test that the self-adversarial weights favour the hard negatives and keep the loss scale."""
+    args = KGEArgParser().get_args(['-adv', '2.0'])
+
+    knowledge_graph = KnowledgeGraph(dataset=args.dataset_name)
+    knowledge_graph.prepare_data()
+
+    config_def, model_def = Importer().import_model_config('transe')
+    model = model_def(config_def(args=args))
+
+    hardness = tf.constant([[0.0, 1.0, 2.0], [3.0, 3.0, 3.0]])
+    weights = model.adversarial_weights(hardness).numpy()
+
+    assert np.allclose(weights.sum(axis=1), 3.0)
+    assert weights[0, 0] < weights[0, 1] < weights[0, 2]
+    assert np.allclose(weights[1], 1.0)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+This module is for testing unit functions of the multi-model training
+"""
+import pytest
+import numpy as np
+
+from pykg2vec.config.config import KGEArgParser, Importer
+from pykg2vec.utils.trainer import Trainer
+from pykg2vec.utils.multimodel import MultiModelTrainer
+from pykg2vec.utils.kgcontroller import KnowledgeGraph
+
+
+@pytest.mark.skip(reason="This is a functional method.")
+def get_model(tmpdir, name, extra_args=()):
+    args = KGEArgParser().get_args(['-rs', '3', '-rb', 'true', '-npg', '1', '-b', '512', '-tn', '5', '-sv', 'false'] + list(extra_args))
+
+    knowledge_graph = KnowledgeGraph(dataset="Freebase15k")
+    knowledge_graph.prepare_data()
+
+    config_def, model_def = Importer().import_model_config(name)
+    config = config_def(args=args)
+    config.disp_result = False
+    config.path_result = tmpdir / "result_path"
+
+    return model_def(config)
+
+
+def test_shared_batches(tmpdir):
+    """Function to test that the models trained together end as the models trained alone."""
+    tmpdir.mkdir("result_path")
+    names = ["transe", "transh"]
+    multi = MultiModelTrainer([get_model(tmpdir, name, ['-l', '2']) for name in names])
+    multi.build_model()
+
+    alone = []
+    for name, shared in zip(names, multi.trainers):
+        trainer = Trainer(model=get_model(tmpdir, name, ['-l', '2']))
+        trainer.build_model()
+        for variable, other in zip(trainer.model.trainable_variables, shared.model.trainable_variables):
+            variable.assign(other)
+        alone.append(trainer)
+
+    losses = multi.train_model()
+    for trainer in alone:
+        trainer.train_model()
+
+    for trainer, shared, loss in zip(alone, multi.trainers, losses):
+        assert [epoch for epoch, _ in shared.training_results] == [0, 1]
+        np.testing.assert_allclose([loss for _, loss in shared.training_results],
+                                   [loss for _, loss in trainer.training_results], rtol=1e-4)
+        for variable, other in zip(shared.model.trainable_variables, trainer.model.trainable_variables):
+            np.testing.assert_allclose(variable.numpy(), other.numpy(), rtol=1e-4, atol=1e-5)
+        assert int(shared.global_step.numpy()) == int(trainer.global_step.numpy())
+        assert loss == shared.training_results[-1][1]
+
+
+def test_models_stop_independently(tmpdir):
+    """Function to test that a model whose epochs are reached leaves the others training."""
+    tmpdir.mkdir("result_path")
+    multi = MultiModelTrainer([get_model(tmpdir, "transe", ['-l', '1']), get_model(tmpdir, "transh", ['-l', '3'])], debug=True)
+    multi.build_model()
+    multi.train_model()
+
+    assert [epoch for epoch, _ in multi.trainers[0].training_results] == [0]
+    assert [epoch for epoch, _ in multi.trainers[1].training_results] == [0, 1, 2]
+    # an epoch is a pass of the generator, of 10 batches at most when debugging.
+    num_batch = multi.generator.num_batch
+    assert num_batch <= 10
+    assert int(multi.trainers[0].global_step.numpy()) == num_batch
+    assert int(multi.trainers[1].global_step.numpy()) == 3 * num_batch
+
+
+def test_incompatible_models(tmpdir):
+    """Function to test that the models which cannot share batches are refused."""
+    with pytest.raises(ValueError):
+        MultiModelTrainer([get_model(tmpdir, "transe"), get_model(tmpdir, "transh", ['-b', '256'])])
+    with pytest.raises(NotImplementedError):
+        MultiModelTrainer([get_model(tmpdir, "transe"), get_model(tmpdir, "complex")])
+    with pytest.raises(NotImplementedError):
+        MultiModelTrainer([get_model(tmpdir, "transe", ['-s', 'cache']), get_model(tmpdir, "transh", ['-s', 'cache'])])
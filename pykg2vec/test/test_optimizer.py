@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+This module is for testing unit functions of the sparse optimizers
+"""
+import pytest
+import numpy as np
+import tensorflow as tf
+
+from pykg2vec.utils.optimizer import LazyAdam, RowWiseAdagrad, SparseSGD, WarmupSchedule, add_gradients, scaled_learning_rate
+
+
+def sparse_step(optimizer, table, rows):
+    """Function to apply one step of the sum of the looked up rows (with repetitions) to the table."""
+    with tf.GradientTape() as tape:
+        loss = tf.reduce_sum(tf.nn.embedding_lookup(table, rows) * tf.range(1.0, 4.0))
+    gradient = tape.gradient(loss, table)
+    assert isinstance(gradient, tf.IndexedSlices)
+    optimizer.apply_gradients([(gradient, table)])
+
+
+def test_lazy_adam():
+    """Function to test that lazy Adam matches Adam on the rows of the batch and leaves the others untouched."""
+    init = np.random.normal(size=(6, 3)).astype(np.float32)
+    table = tf.Variable(init)
+    reference = tf.Variable(init)
+    optimizer = LazyAdam(learning_rate=0.1)
+
+    sparse_step(optimizer, table, [1, 3, 1])
+    # on the first step the moments start at zero, so only the rows of the batch move for Adam as well.
+    sparse_step(tf.keras.optimizers.Adam(learning_rate=0.1), reference, [1, 3, 1])
+    np.testing.assert_allclose(table.numpy(), reference.numpy(), rtol=1e-5)
+
+    before = table.numpy()
+    sparse_step(optimizer, table, [0, 2])
+    np.testing.assert_array_equal(table.numpy()[[1, 3, 4, 5]], before[[1, 3, 4, 5]])
+    assert not np.allclose(table.numpy()[[0, 2]], before[[0, 2]])
+
+
+def test_rowwise_adagrad():
+    """Function to test the row-wise Adagrad update."""
+    init = np.random.normal(size=(5, 3)).astype(np.float32)
+    table = tf.Variable(init)
+    optimizer = RowWiseAdagrad(learning_rate=0.5, initial_accumulator_value=0.1, epsilon=0.0)
+
+    sparse_step(optimizer, table, [2, 4, 2])
+    assert optimizer._accumulators[0].shape == (5,)
+
+    gradient = np.zeros_like(init)
+    gradient[2] = 2 * np.arange(1.0, 4.0)
+    gradient[4] = np.arange(1.0, 4.0)
+    accumulator = 0.1 + np.mean(gradient ** 2, axis=1)
+    expected = init - 0.5 * gradient / np.sqrt(accumulator)[:, None]
+    expected[[0, 1, 3]] = init[[0, 1, 3]]
+
+    np.testing.assert_allclose(table.numpy(), expected, rtol=1e-5)
+
+
+def test_sparse_sgd_momentum():
+    """Function to test that the lazy momentum only moves the rows of the batch."""
+    init = np.random.normal(size=(4, 3)).astype(np.float32)
+    table = tf.Variable(init)
+    optimizer = SparseSGD(learning_rate=0.1, momentum=0.5)
+
+    sparse_step(optimizer, table, [0])
+    sparse_step(optimizer, table, [1])
+    sparse_step(optimizer, table, [0])
+
+    gradient = np.arange(1.0, 4.0)
+    expected = init.copy()
+    expected[0] -= 0.1 * gradient + 0.1 * (0.5 * gradient + gradient)
+    expected[1] -= 0.1 * gradient
+
+    np.testing.assert_allclose(table.numpy(), expected, rtol=1e-5)
+
+
+@pytest.mark.parametrize('Optimizer', [LazyAdam, RowWiseAdagrad, SparseSGD])
+def test_dense_and_tf_function(Optimizer):
+    """Function to test the optimizers with dense gradients and 3-d variables inside a tf.function."""
+    table = tf.Variable(tf.random.normal([6, 2, 3]))
+    dense = tf.Variable(tf.random.normal([3]))
+    optimizer = Optimizer(learning_rate=0.1)
+
+    @tf.function
+    def step(rows):
+        with tf.GradientTape() as tape:
+            loss = tf.reduce_sum(tf.nn.embedding_lookup(table, rows) * dense)
+        gradients = tape.gradient(loss, [table, dense])
+        optimizer.apply_gradients(zip(gradients, [table, dense]))
+
+    before = table.numpy()
+    for _ in range(3):
+        step(tf.constant([1, 4, 4]))
+
+    assert np.all(np.isfinite(table.numpy())) and np.all(np.isfinite(dense.numpy()))
+    np.testing.assert_array_equal(table.numpy()[[0, 2, 3, 5]], before[[0, 2, 3, 5]])
+    assert not np.allclose(table.numpy()[[1, 4]], before[[1, 4]])
+
+
+def test_add_gradients():
+    """Function to test that the sparse gradients are concatenated and the others summed."""
+    first = tf.IndexedSlices(tf.ones([2, 3]), tf.constant([0, 4]), tf.constant([6, 3]))
+    second = tf.IndexedSlices(2 * tf.ones([1, 3]), tf.constant([4]), tf.constant([6, 3]))
+    total = add_gradients(add_gradients(None, first), second)
+    assert isinstance(total, tf.IndexedSlices)
+    np.testing.assert_array_equal(tf.convert_to_tensor(total).numpy()[[0, 4]], [[1, 1, 1], [3, 3, 3]])
+
+    dense = add_gradients(total, tf.ones([6, 3]))
+    np.testing.assert_array_equal(dense.numpy()[[0, 1, 4]], [[2, 2, 2], [1, 1, 1], [4, 4, 4]])
+    assert add_gradients(dense, None) is dense
+
+
+@pytest.mark.parametrize('scaling,learning_rate', [('none', 0.01), ('linear', 0.08), ('sqrt', 0.01 * np.sqrt(8))])
+def test_scaled_learning_rate(scaling, learning_rate):
+    """Function to test the learning rate scaled to the global batch size."""
+    class Config:
+        pass
+    config = Config()
+    config.learning_rate, config.batch_size, config.lr_base_batch_size, config.lr_scaling = 0.01, 512, 128, scaling
+    np.testing.assert_allclose(scaled_learning_rate(config, num_workers=2), learning_rate)
+
+    schedule = WarmupSchedule(0.08, 4)
+    np.testing.assert_allclose([float(schedule(step)) for step in range(6)], [0.02, 0.04, 0.06, 0.08, 0.08, 0.08], rtol=1e-6)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+This module is for testing unit functions of the partitioned training
+"""
+import pytest
+import numpy as np
+
+from pathlib import Path
+from pykg2vec.config.config import KGEArgParser, Importer
+from pykg2vec.utils.trainer import Trainer
+from pykg2vec.utils.partition import PartitionedTrainer
+from pykg2vec.utils.generator import read_training_triples
+from pykg2vec.utils.kgcontroller import KnowledgeGraph
+
+
+@pytest.mark.skip(reason="This is a functional method.")
+def get_config(name, optimizer):
+    args = KGEArgParser().get_args(['-ep', '3', '-opt', optimizer, '-mom', '0'])
+
+    knowledge_graph = KnowledgeGraph(dataset="Freebase15k")
+    knowledge_graph.prepare_data()
+
+    config_def, model_def = Importer().import_model_config(name)
+    config = config_def(args=args)
+
+    config.learning_rate = 0.1
+    config.batch_size = 64
+    config.epochs = 2
+
+    return config, model_def
+
+
+def test_partition_buckets(tmpdir):
+    """Function to test that the buckets cover the training triples and that a bucket swaps in its two partitions."""
+    config, model_def = get_config("transe", "sgd")
+    partitioned = PartitionedTrainer(model_def(config), "pairwise_based", Path(str(tmpdir)))
+
+    # every partition gets its own initial values.
+    first, second = [np.load(str(partitioned.files(0, partition)[0])) for partition in range(2)]
+    assert not np.allclose(first[:len(second)], second[:len(first)])
+
+    data = read_training_triples(config)
+    assert sum(len(triples) for _, _, triples in partitioned.buckets) == len(data)
+    for head_partition, tail_partition, triples in partitioned.buckets:
+        assert np.all(partitioned.partition_of(triples[:, 0]) == head_partition)
+        assert np.all(partitioned.partition_of(triples[:, 2]) == tail_partition)
+
+    head_partition, tail_partition, _ = partitioned.buckets[1]
+    partitioned.train_bucket(1, 0, num_batch=1)
+    assert head_partition in partitioned.slots and tail_partition in partitioned.slots
+
+
+@pytest.mark.parametrize('model_name,optimizer', [('transe', 'sgd'), ('complex', 'adagrad')])
+def test_partitioned_training(tmpdir, model_name, optimizer):
+    """Function to test the partitioned training, its checkpoint and the resumption from it."""
+    config, model_def = get_config(model_name, optimizer)
+    path = Path(str(tmpdir))
+
+    partitioned = PartitionedTrainer(model_def(config), "pointwise_based" if model_name == "complex" else "pairwise_based", path)
+    initial = model_def(config)
+    partitioned.assemble(initial)
+
+    loss = partitioned.train_epoch(0, num_batch=2)
+    assert np.isfinite(loss) and loss > 0
+    assert partitioned.epoch == 1 and partitioned.bucket_idx == 0
+
+    trained = model_def(config)
+    partitioned.assemble(trained)
+    assert not np.allclose(trained.trainable_variables[0].numpy(), initial.trainable_variables[0].numpy())
+
+    # a new trainer on the same directory resumes after the first epoch with the same parameters.
+    resumed = PartitionedTrainer(model_def(config), partitioned.training_strategy, path)
+    assert resumed.epoch == 1 and resumed.bucket_idx == 0
+    restored = model_def(config)
+    resumed.assemble(restored)
+    for variable, other in zip(restored.trainable_variables, trained.trainable_variables):
+        np.testing.assert_allclose(variable.numpy(), other.numpy())
+
+
+def test_trainer_partitioned(tmpdir):
+    """Function to test the partitioned training through the trainer."""
+    config, model_def = get_config("transe", "sgd")
+    config.path_tmp = Path(str(tmpdir))
+
+    trainer = Trainer(model=model_def(config), debug=True)
+    trainer.build_model()
+    trainer.train_model()
+
+    assert len(trainer.training_results) == 2
+    assert (config.path_tmp / "TransE" / "partitions" / "checkpoint.json").exists()
+    assert trainer.partitioned.epoch == 2
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+This module is for testing unit functions of the training instrumentation
+"""
+import os
+import json
+import time
+
+from pykg2vec.config.config import KGEArgParser, Importer
+from pykg2vec.utils.trainer import Trainer
+from pykg2vec.utils.profiling import PhaseTimer, ProfilerWindow
+from pykg2vec.utils.kgcontroller import KnowledgeGraph
+
+
+def test_phase_timer(tmpdir):
+    """Function to test that the phases are summed per record and the wall time is accounted for."""
+    path = tmpdir / "timings.jsonl"
+    timer = PhaseTimer(path)
+    for _ in range(2):
+        with timer.phase("train_step"):
+            time.sleep(0.02)
+    timer.write(0)
+    with timer.phase("export"):
+        time.sleep(0.01)
+    timer.write(0, stage="end")
+
+    with open(str(path)) as file:
+        records = [json.loads(line) for line in file]
+    assert [record["stage"] for record in records] == ["epoch", "end"]
+    assert records[0]["train_step"] >= 0.04 and records[0]["export"] == 0.0
+    assert records[1]["export"] >= 0.01 and records[1]["train_step"] == 0.0
+    for record in records:
+        phases = sum(record[name] for name in PhaseTimer.PHASES) + record["other"]
+        assert abs(phases - record["wall"]) < 1e-3
+
+    disabled = PhaseTimer()
+    with disabled.phase("train_step"):
+        pass
+    disabled.write(0)
+    assert disabled.times["train_step"] == 0.0
+
+
+def test_profiler_window(tmpdir):
+    """Function to test that the trace spans the steps of the window only."""
+    profiler = ProfilerWindow(tmpdir / "profile", 2, 3)
+    active = []
+    for _ in range(7):
+        profiler.step(1)
+        active.append(profiler.active)
+    profiler.stop()
+
+    assert active == [False, False, True, True, True, False, False]
+    assert os.path.isdir(str(tmpdir / "profile" / "plugins" / "profile"))
+
+
+def test_trainer_instrumentation(tmpdir):
+    """Function to test the timing records and the trace of a training."""
+    knowledge_graph = KnowledgeGraph(dataset="Freebase15k")
+    knowledge_graph.prepare_data()
+    config_def, model_def = Importer().import_model_config("transe")
+    args = KGEArgParser().get_args(['-pht', 'true', '-pfs', '2', '-pfn', '3', '-l', '2', '-tn', '5', '-sv', 'false'])
+    config = config_def(args=args)
+    config.disp_result = False
+    config.path_result = tmpdir.mkdir("result_path")
+
+    trainer = Trainer(model=model_def(config), debug=True)
+    trainer.build_model()
+    trainer.train_model()
+
+    with open(str(config.path_result / "TransE_phase_timings.jsonl")) as file:
+        records = [json.loads(line) for line in file]
+    assert [(record["stage"], record["epoch"]) for record in records] == [("epoch", 0), ("epoch", 1), ("end", 1)]
+    assert all(record["generator_wait"] > 0 and record["conversion"] > 0 and record["train_step"] > 0 for record in records[:2])
+    assert records[0]["evaluation"] > 0 and records[2]["export"] > 0
+    assert os.path.isdir(str(config.path_result / "TransE_profile" / "plugins" / "profile"))
@@ -4,11 +4,17 @@
 This module is for testing unit functions of training
 """
 import os
+import sys
+import json
+import socket
+import subprocess
 import pytest
+import numpy as np
 import tensorflow as tf
 
 from pykg2vec.config.config import KGEArgParser, Importer
 from pykg2vec.utils.trainer import Trainer
+from pykg2vec.utils.generator import read_training_triples
 from pykg2vec.utils.kgcontroller import KnowledgeGraph
 
 @pytest.mark.skip(reason="This is a functional method.")
@@ -62,4 +68,332 @@ def test_early_stopping(tmpdir):
     with open(os.path.join(result_path_dir, training_result)) as file:
         actual_epochs = len(file.readlines()) - 1
 
-    assert actual_epochs < configured_epochs
\ No newline at end of file
+    assert actual_epochs < configured_epochs
+
+
+def test_metric_early_stopping(tmpdir):
+    """Function to test that the training stops once the validation metric stops improving."""
+    model = get_model(tmpdir.mkdir("result_path"), 5, 1)
+    model.config.optimizer = 'sgd'
+    model.config.learning_rate = 0.0
+    model.config.early_stop_metric = 'fmrr'
+
+    trainer = Trainer(model=model, debug=True)
+    trainer.build_model()
+    trainer.train_model()
+
+    # the weights never change, the second test is no improvement on the first one.
+    assert len(trainer.training_results) == 2
+    assert trainer.best_epoch == 0 and trainer.checks_without_improvement == 1
+
+
+def test_best_weights_restored():
+    """Function to test that the weights of the best test are kept and restored."""
+    model = get_model(None, 5, 1)
+    model.config.early_stop_metric = 'mr'
+    model.config.patience = 2
+
+    trainer = Trainer(model=model, debug=True)
+    trainer.build_model()
+    variable = trainer.model.trainable_variables[0]
+
+    scores = [(0, 50.0), (1, 40.0), (2, 45.0), (3, 41.0)]
+    stops = []
+    for epoch, mr in scores:
+        variable.assign(tf.fill(variable.shape, float(epoch)))
+        stops.append(trainer.early_stop_on_metric({'epoch': epoch, 'mr': mr}))
+
+    assert stops == [False, False, False, True]
+    trainer.restore_best_weights()
+    assert trainer.best_epoch == 1
+    np.testing.assert_array_equal(variable.numpy(), 1.0)
+
+def test_async_evaluation(tmpdir):
+    """Function to test that the tests of the snapshots report and restore what the synchronous tests do."""
+    knowledge_graph = KnowledgeGraph(dataset="Freebase15k")
+    knowledge_graph.prepare_data()
+    config_def, model_def = Importer().import_model_config("transe")
+
+    results = []
+    for async_evaluation in ['false', 'true']:
+        args = KGEArgParser().get_args(['-aev', async_evaluation, '-esm', 'fmrr', '-esp', '10', '-opt', 'sgd', '-lr', '0.1',
+                                        '-rs', '1', '-rb', 'true', '-npg', '1', '-l', '4', '-ts', '1', '-tn', '20', '-sv', 'false'])
+        config = config_def(args=args)
+        config.disp_result = False
+        config.path_result = tmpdir.mkdir("result_" + async_evaluation)
+
+        trainer = Trainer(model=model_def(config), debug=True)
+        trainer.build_model()
+        if results:
+            for variable, value in zip(trainer.model.variables, results[0]["initial"]):
+                variable.assign(value)
+        initial = [variable.numpy() for variable in trainer.model.variables]
+        trainer.train_model()
+
+        testing = [f for f in os.listdir(str(config.path_result)) if "Testing" in f and f.endswith(".csv")][0]
+        with open(os.path.join(str(config.path_result), testing)) as file:
+            lines = file.readlines()
+        results.append({"initial": initial, "testing": lines, "best_epoch": trainer.best_epoch,
+                        "weights": [variable.numpy() for variable in trainer.model.variables]})
+
+    assert len(results[1]["testing"]) == 5
+    assert results[0]["testing"] == results[1]["testing"]
+    assert results[0]["best_epoch"] == results[1]["best_epoch"]
+    for variable, other in zip(results[0]["weights"], results[1]["weights"]):
+        np.testing.assert_allclose(variable, other, rtol=1e-5)
+
+@pytest.mark.parametrize('model_name', ['transe', 'complex'])
+def test_negative_cache_sampling(tmpdir, model_name):
+    """Function to test that the refreshed negative cache holds distinct non-positive candidates."""
+    args = KGEArgParser().get_args(['-s', 'cache', '-gbk', 'thread', '-ncs', '5', '-ncc', '20'])
+
+    knowledge_graph = KnowledgeGraph(dataset="Freebase15k")
+    knowledge_graph.prepare_data()
+
+    config_def, model_def = Importer().import_model_config(model_name)
+    config = config_def(args=args)
+    config.epochs = 1
+    config.test_step = 1
+    config.test_num = 10
+    config.disp_result = False
+    config.save_model = False
+    config.path_result = tmpdir.mkdir("result_path")
+
+    trainer = Trainer(model=model_def(config), debug=True)
+    trainer.build_model()
+    trainer.train_model()
+
+    sampler = trainer.generator.sampler
+    data = read_training_triples(config)[:100]
+    h, r, t = data[:, 0], data[:, 1], data[:, 2]
+    trainer.update_negative_cache(h, r, t)
+
+    tails = sampler.cache.tail_cache[sampler.cache.rows(h, r, t, False)]
+    heads = sampler.cache.head_cache[sampler.cache.rows(h, r, t, True)]
+    assert tails.shape == (100, 5) and heads.shape == (100, 5)
+    assert not np.any(sampler.is_positive(np.repeat(h, 5), np.repeat(r, 5), tails.reshape(-1)))
+    assert not np.any(sampler.is_positive(heads.reshape(-1), np.repeat(r, 5), np.repeat(t, 5)))
+    assert all(len(np.unique(row)) == 5 for row in np.concatenate([tails, heads]))
+
+
+@pytest.mark.parametrize('model_name', ['transe', 'complex'])
+def test_fused_steps(model_name):
+    """Function to test that the fused training loop makes the same updates as the training step by step."""
+    knowledge_graph = KnowledgeGraph(dataset="Freebase15k")
+    knowledge_graph.prepare_data()
+    config_def, model_def = Importer().import_model_config(model_name)
+
+    results = []
+    for steps_per_call in ['1', '4']:
+        args = KGEArgParser().get_args(['-spc', steps_per_call, '-opt', 'sgd', '-rs', '1', '-rb', 'true', '-b', '32'])
+        trainer = Trainer(model=model_def(config_def(args=args)), debug=True)
+        trainer.build_model()
+        if results:
+            for variable, value in zip(trainer.model.trainable_variables, results[0][1]):
+                variable.assign(value)
+        initial = [variable.numpy() for variable in trainer.model.trainable_variables]
+
+        # 10 debug batches, two calls of 4 steps and one of 2.
+        trainer.create_workers()
+        loss = trainer.train_model_epoch(0, tuning=True)
+        trainer.stop_workers()
+        results.append((float(loss), initial, [variable.numpy() for variable in trainer.model.trainable_variables]))
+
+    np.testing.assert_allclose(results[0][0], results[1][0], rtol=1e-4)
+    for variable, other in zip(results[0][2], results[1][2]):
+        np.testing.assert_allclose(variable, other, rtol=1e-4, atol=1e-5)
+
+
+def test_checkpoint_resume(tmpdir):
+    """Function to test that a run resumed from its checkpoint ends as the uninterrupted run."""
+    knowledge_graph = KnowledgeGraph(dataset="Freebase15k")
+    knowledge_graph.prepare_data()
+    config_def, model_def = Importer().import_model_config("transe")
+
+    def run(epochs, checkpoint_path, resume, initial=None):
+        args = KGEArgParser().get_args(['-opt', 'adam', '-rs', '3', '-rb', 'true', '-npg', '1', '-b', '512', '-tn', '5',
+                                        '-sv', 'false', '-cke', '1', '-ckk', '2', '-ckp', str(checkpoint_path),
+                                        '-rsm', str(resume)])
+        config = config_def(args=args)
+        config.epochs = epochs
+        config.disp_result = False
+        config.path_result = tmpdir / "result_path"
+        trainer = Trainer(model=model_def(config))
+        trainer.build_model()
+        if initial is not None:
+            for variable, value in zip(trainer.model.trainable_variables, initial):
+                variable.assign(value)
+        initial = [variable.numpy() for variable in trainer.model.trainable_variables]
+        trainer.train_model()
+        return trainer, initial
+
+    tmpdir.mkdir("result_path")
+    uninterrupted, initial = run(3, tmpdir / "full", False)
+    run(2, tmpdir / "preempted", False, initial)
+    resumed, _ = run(3, tmpdir / "preempted", True)
+
+    assert [epoch for epoch, _ in resumed.training_results] == [0, 1, 2]
+    np.testing.assert_allclose([loss for _, loss in resumed.training_results],
+                               [loss for _, loss in uninterrupted.training_results], rtol=1e-4)
+    for variable, other in zip(resumed.model.trainable_variables, uninterrupted.model.trainable_variables):
+        np.testing.assert_allclose(variable.numpy(), other.numpy(), rtol=1e-4, atol=1e-5)
+    assert resumed.optimizer.iterations.numpy() == uninterrupted.optimizer.iterations.numpy()
+    assert int(resumed.global_step.numpy()) == 3 * resumed.generator.num_batch
+    assert len(uninterrupted.checkpoint.manager.checkpoints) == 2
+
+
+MULTI_WORKER_SCRIPT = """
+import sys
+import numpy as np
+from pathlib import Path
+from pykg2vec.config.config import KGEArgParser, Importer
+from pykg2vec.utils.trainer import Trainer
+
+args = KGEArgParser().get_args(['-mw', 'true', '-l', '2', '-b', '64', '-tn', '10', '-sv', 'false'])
+config_def, model_def = Importer().import_model_config('transe')
+config = config_def(args=args)
+config.path_result = Path(sys.argv[1])
+config.disp_result = False
+
+trainer = Trainer(model=model_def(config), debug=True)
+trainer.build_model()
+trainer.train_model()
+np.save(sys.argv[2], trainer.model.ent_embeddings.numpy())
+"""
+
+
+def test_multi_worker_training(tmpdir):
+    """Function to test the data-parallel training with two local workers."""
+    knowledge_graph = KnowledgeGraph(dataset="Freebase15k")
+    knowledge_graph.prepare_data()
+
+    ports = []
+    for _ in range(2):
+        with socket.socket() as sock:
+            sock.bind(("localhost", 0))
+            ports.append(sock.getsockname()[1])
+    cluster = {"worker": ["localhost:%d" % port for port in ports]}
+
+    workers = []
+    for index in range(2):
+        env = dict(os.environ, TF_CONFIG=json.dumps({"cluster": cluster, "task": {"type": "worker", "index": index}}))
+        paths = [str(tmpdir.mkdir("result_%d" % index)), str(tmpdir.join("embeddings_%d.npy" % index))]
+        workers.append(subprocess.Popen([sys.executable, "-c", MULTI_WORKER_SCRIPT] + paths, env=env,
+                                        stdout=subprocess.PIPE, stderr=subprocess.STDOUT))
+
+    try:
+        outputs = [worker.communicate(timeout=300)[0] for worker in workers]
+    finally:
+        for worker in workers:
+            worker.kill()
+    for worker, output in zip(workers, outputs):
+        assert worker.returncode == 0, output.decode()[-3000:]
+
+    # the workers apply the same all-reduced updates, the chief alone writes the results.
+    embeddings = [np.load(str(tmpdir.join("embeddings_%d.npy" % index))) for index in range(2)]
+    np.testing.assert_allclose(embeddings[0], embeddings[1], rtol=1e-5)
+    assert os.listdir(str(tmpdir.join("result_0"))) and not os.listdir(str(tmpdir.join("result_1")))
+
+
+def test_shared_negatives_unsupported():
+    """Function to test that shared negatives are refused for the models without a loss for them."""
+    knowledge_graph = KnowledgeGraph(dataset="Freebase15k")
+    knowledge_graph.prepare_data()
+    config_def, model_def = Importer().import_model_config("transh")
+
+    config = config_def(args=KGEArgParser().get_args(['-sng', '32']))
+    with pytest.raises(NotImplementedError, match="TransH"):
+        Trainer(model=model_def(config))
+
+
+@pytest.mark.parametrize('model_name,extra_args', [('transe', []), ('transe', ['-sng', '32']), ('complex', []),
+                                                   ('convkb', []), ('proje_pointwise', ['-hdt', '0.0', '-lmda', '0.01']),
+                                                   ('distmult', ['-lmda', '0.1']), ('ntn', ['-lmda', '0.1'])])
+def test_gradient_accumulation(model_name, extra_args):
+    """Function to test that a step accumulated over micro-batches matches the step on the whole batch."""
+    knowledge_graph = KnowledgeGraph(dataset="Freebase15k")
+    knowledge_graph.prepare_data()
+    config_def, model_def = Importer().import_model_config(model_name)
+
+    trainers = []
+    for accumulation_steps in [1, 4]:
+        args = KGEArgParser().get_args(['-opt', 'sgd', '-b', '128', '-npg', '1', '-acc', str(accumulation_steps)] + extra_args)
+        config = config_def(args=args)
+        trainer = Trainer(model=model_def(config))
+        trainer.build_model()
+        trainers.append(trainer)
+
+    trainers[0].create_workers()
+    batch = [field if isinstance(field, tf.SparseTensor) else np.array(field) for field in next(trainers[0].generator)]
+    trainers[0].stop_workers()
+
+    # the lazily built layers (ConvKB) get their variables on the first call.
+    losses = []
+    for trainer in trainers:
+        step_name, tensors = trainer.convert_batch(batch)
+        trainer.model.get_loss_shared_negatives(*tensors) if step_name == "train_step_shared_negatives" else trainer.model.get_loss(*tensors)
+    for variable, other in zip(trainers[1].model.trainable_variables, trainers[0].model.trainable_variables):
+        variable.assign(other)
+    for trainer in trainers:
+        losses.append(trainer.train_batch(batch).numpy())
+
+    np.testing.assert_allclose(losses[1], losses[0], rtol=1e-4)
+    for variable, other in zip(trainers[1].model.trainable_variables, trainers[0].model.trainable_variables):
+        np.testing.assert_allclose(variable.numpy(), other.numpy(), rtol=1e-4, atol=1e-6)
+
+
+@pytest.mark.parametrize('extra_args', [[], ['-sng', '32']])
+def test_accumulated_regularization(extra_args):
+    """Function to test that the regularization of DistMult, which does not depend on the batch, is added once per step."""
+    knowledge_graph = KnowledgeGraph(dataset="Freebase15k")
+    knowledge_graph.prepare_data()
+    config_def, model_def = Importer().import_model_config("distmult")
+
+    trainers = []
+    for accumulation_steps in [1, 4]:
+        args = KGEArgParser().get_args(['-b', '128', '-npg', '1', '-lmda', '0.1', '-acc', str(accumulation_steps)] + extra_args)
+        trainer = Trainer(model=model_def(config_def(args=args)))
+        trainer.build_model()
+        trainers.append(trainer)
+    for variable, other in zip(trainers[1].model.trainable_variables, trainers[0].model.trainable_variables):
+        variable.assign(other)
+
+    trainers[0].create_workers()
+    batch = [np.array(field) for field in next(trainers[0].generator)]
+    trainers[0].stop_workers()
+
+    results = []
+    for trainer in trainers:
+        step_name, tensors = trainer.convert_batch(batch)
+        loss_function = trainer.model.get_loss_shared_negatives if step_name == "train_step_shared_negatives" else trainer.model.get_loss
+        results.append(trainer.compute_gradients(step_name, loss_function, tensors))
+
+    (loss, gradients), (accumulated_loss, accumulated_gradients) = results
+    assert float(trainers[0].model.get_reg()) > 0
+    np.testing.assert_allclose(accumulated_loss.numpy(), loss.numpy(), rtol=1e-5)
+    for gradient, accumulated in zip(gradients, accumulated_gradients):
+        np.testing.assert_allclose(tf.convert_to_tensor(accumulated).numpy(), tf.convert_to_tensor(gradient).numpy(), rtol=1e-4, atol=1e-6)
+    assert trainers[1].model.include_reg
+
+
+def test_learning_rate_scaling():
+    """Function to test the learning rate of the optimizer, scaled to the batch size and warmed up."""
+    knowledge_graph = KnowledgeGraph(dataset="Freebase15k")
+    knowledge_graph.prepare_data()
+    config_def, model_def = Importer().import_model_config("transe")
+
+    args = KGEArgParser().get_args(['-b', '512', '-lr', '0.01', '-lrs', 'sqrt', '-lrb', '128', '-wu', '4'])
+    trainer = Trainer(model=model_def(config_def(args=args)))
+    trainer.build_model()
+
+    schedule = trainer.learning_rate()
+    np.testing.assert_allclose([float(schedule(step)) for step in range(6)], [0.005, 0.01, 0.015, 0.02, 0.02, 0.02], rtol=1e-6)
+
+    # the optimizer follows the schedule of its iterations.
+    trainer.create_workers()
+    try:
+        for _ in range(2):
+            trainer.train_batch(list(next(trainer.generator)))
+    finally:
+        trainer.stop_workers()
+    np.testing.assert_allclose(float(trainer.optimizer.learning_rate), 0.01, rtol=1e-6)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+This module is for testing unit functions of the warm start
+"""
+import pytest
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from pykg2vec.config.config import KGEArgParser, Importer
+from pykg2vec.utils.trainer import Trainer
+from pykg2vec.utils.warmstart import WarmStart, save_labels
+from pykg2vec.utils.generator import read_training_triples
+from pykg2vec.utils.kgcontroller import KnowledgeGraph
+
+
+@pytest.mark.skip(reason="This is a functional method.")
+def get_trainer(tmpdir, extra_args=()):
+    args = KGEArgParser().get_args(['-l', '1', '-tn', '5', '-sv', 'false'] + list(extra_args))
+
+    knowledge_graph = KnowledgeGraph(dataset="Freebase15k")
+    knowledge_graph.prepare_data()
+
+    config_def, model_def = Importer().import_model_config("transe")
+    config = config_def(args=args)
+    config.disp_result = False
+    config.path_tmp = Path(str(tmpdir)) / "intermediate"
+    config.path_embeddings = Path(str(tmpdir)) / "embeddings"
+
+    trainer = Trainer(model=model_def(config), debug=True)
+    trainer.build_model()
+    return trainer
+
+
+def test_warm_start_from_embeddings(tmpdir):
+    """Function to test that the rows are aligned by label and the new entities and relations stay fresh."""
+    trainer = get_trainer(tmpdir)
+    config = trainer.config
+    tot_entity, tot_relation = config.kg_meta.tot_entity, config.kg_meta.tot_relation
+    idx2entity = config.knowledge_graph.read_cache_data('idx2entity')
+    idx2relation = config.knowledge_graph.read_cache_data('idx2relation')
+
+    # a previous version of the graph without the last entities and relations, in another order.
+    rng = np.random.RandomState(0)
+    old_entities = rng.permutation(tot_entity - 20)
+    old_relations = rng.permutation(tot_relation - 2)
+    previous = Path(str(tmpdir)) / "previous"
+    previous.mkdir()
+    pd.Series({old: idx2entity[new] for old, new in enumerate(old_entities)}).to_pickle(previous / "ent_labels.pickle")
+    pd.Series({old: idx2relation[new] for old, new in enumerate(old_relations)}).to_pickle(previous / "rel_labels.pickle")
+    ent_embeddings = rng.normal(size=(len(old_entities), config.hidden_size)).astype(np.float32)
+    rel_embeddings = rng.normal(size=(len(old_relations), config.hidden_size)).astype(np.float32)
+    pd.DataFrame(ent_embeddings).to_pickle(previous / "ent_embedding.pickle")
+    pd.DataFrame(rel_embeddings).to_pickle(previous / "rel_embedding.pickle")
+
+    fresh_entities = trainer.model.ent_embeddings.numpy()
+    report = WarmStart(config, previous).initialize(trainer.model)
+
+    assert sorted(report["warm"]) == ["ent_embeddings", "rel_embeddings"]
+    np.testing.assert_array_equal(trainer.model.ent_embeddings.numpy()[old_entities], ent_embeddings)
+    np.testing.assert_array_equal(trainer.model.rel_embeddings.numpy()[old_relations], rel_embeddings)
+    np.testing.assert_array_equal(trainer.model.ent_embeddings.numpy()[tot_entity - 20:], fresh_entities[tot_entity - 20:])
+
+
+@pytest.mark.parametrize('source', ['checkpoint', 'saved_model', 'embeddings'])
+def test_warm_start_same_graph(tmpdir, source):
+    """Function to test that a warm start on the same graph restores every parameter."""
+    trainer = get_trainer(tmpdir, ['-cke', '1', '-sv', 'true'])
+    trainer.train_model()
+    paths = {"checkpoint": trainer.checkpoint.path,
+             "saved_model": trainer.config.path_tmp / "TransE",
+             "embeddings": trainer.config.path_embeddings / "TransE"}
+    trained = [variable.numpy() for variable in trainer.model.variables]
+
+    warm = get_trainer(tmpdir, ['-ws', str(paths[source])])
+    assert sorted(warm.warm_start.initialize(warm.model)["warm"]) == ["ent_embeddings", "rel_embeddings"]
+    for variable, value in zip(warm.model.variables, trained):
+        np.testing.assert_array_equal(variable.numpy(), value)
+
+
+def test_touched_triples(tmpdir):
+    """Function to test the selection of the triples within some hops of the new entities and triples."""
+    trainer = get_trainer(tmpdir)
+    config = trainer.config
+    data = read_training_triples(config)
+    new_entity = data[0, 0]
+
+    # the previous graph had all the entities but one, and the triples without it but the last 10.
+    previous = Path(str(tmpdir)) / "previous"
+    save_labels(previous, config)
+    labels = pd.read_pickle(previous / "ent_labels.pickle")
+    pd.Series({old: label for old, label in enumerate(labels.drop(new_entity))}).to_pickle(previous / "ent_labels.pickle")
+    old_data = data[:-10][(data[:-10, 0] != new_entity) & (data[:-10, 2] != new_entity)]
+    old_data[:, [0, 2]] -= old_data[:, [0, 2]] > new_entity
+    np.save(str(previous / "train_triples.npy"), old_data)
+
+    warm_start = WarmStart(config, previous)
+    np.testing.assert_array_equal(np.sort(warm_start.triple_keys(warm_start.old_triples)),
+                                  np.sort(warm_start.triple_keys(data[:-10][(data[:-10, 0] != new_entity) & (data[:-10, 2] != new_entity)])))
+
+    new_triples = np.zeros(len(data), dtype=bool)
+    new_triples[-10:] = True
+    one_hop = new_triples | (data[:, 0] == new_entity) | (data[:, 2] == new_entity)
+    np.testing.assert_array_equal(warm_start.touched_triples(data, 1), data[one_hop])
+
+    touched = np.zeros(config.kg_meta.tot_entity, dtype=bool)
+    touched[data[one_hop][:, [0, 2]].reshape(-1)] = True
+    two_hops = warm_start.touched_triples(data, 2)
+    np.testing.assert_array_equal(two_hops, data[touched[data[:, 0]] | touched[data[:, 2]]])
+    assert len(two_hops) > one_hop.sum()
+
+
+def test_trainer_touched_triples(tmpdir):
+    """Function to test that the warm-started training feeds the touched triples only."""
+    trainer = get_trainer(tmpdir)
+    trainer.save_model()
+    previous = trainer.config.path_tmp / "TransE"
+    data = read_training_triples(trainer.config)
+    np.save(str(previous / "train_triples.npy"), data[:-50])
+
+    warm = get_trainer(tmpdir, ['-ws', str(previous), '-wsh', '1', '-b', '16'])
+    touched = warm.touched_triples()
+    assert 50 <= len(touched) < len(data)
+
+    warm.create_workers()
+    try:
+        assert warm.generator.num_batch == len(touched) // 16
+    finally:
+        warm.stop_workers()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+This module is for testing unit functions of the XLA compilation
+"""
+import pytest
+import numpy as np
+import tensorflow as tf
+
+from pykg2vec.config.config import KGEArgParser, Importer
+from pykg2vec.utils.trainer import Trainer
+from pykg2vec.utils.evaluator import Evaluator
+from pykg2vec.utils.kgcontroller import KnowledgeGraph
+from pykg2vec.utils.xla import CompiledFunction
+
+
+def test_compiled_function():
+    """Function to test that a compiled function is traced once for any batch size."""
+    function = CompiledFunction(lambda x: tf.reduce_sum(tf.abs(tf.nn.l2_normalize(x, axis=-1) + 1.0), axis=-1),
+                                [tf.TensorSpec([None, 4], tf.float32)], "dissimilarity")
+    for batch_size in [1, 3, 8]:
+        x = np.random.randn(batch_size, 4).astype(np.float32)
+        expected = np.sum(np.abs(x / np.linalg.norm(x, axis=-1, keepdims=True) + 1.0), axis=-1)
+        np.testing.assert_allclose(function(x).numpy(), expected, rtol=1e-5)
+
+    assert not function.fallback
+    assert function.compiled.experimental_get_tracing_count() == 1
+
+
+def test_compiled_function_fallback():
+    """Function to test that a function with an op XLA cannot compile runs without it."""
+    function = CompiledFunction(lambda x: tf.strings.to_number(tf.strings.as_string(x)),
+                                [tf.TensorSpec([None], tf.float32)], "as_string")
+    np.testing.assert_allclose(function(np.asarray([1.5, 2.0], dtype=np.float32)).numpy(), [1.5, 2.0])
+    assert function.fallback
+
+
+def test_compiled_function_errors():
+    """Function to test that the errors after the first call are raised and leave the function compiled."""
+    function = CompiledFunction(lambda x: tf.reduce_sum(tf.reshape(x, [2, -1]), axis=1),
+                                [tf.TensorSpec([None], tf.float32)], "pairs")
+    np.testing.assert_allclose(function(np.arange(4, dtype=np.float32)).numpy(), [1.0, 5.0])
+
+    # the error mentions the conversion to XLA of the shape, but comes from the data.
+    with pytest.raises(tf.errors.InvalidArgumentError):
+        function(np.arange(3, dtype=np.float32))
+    assert function.traced and not function.fallback
+    np.testing.assert_allclose(function(np.arange(6, dtype=np.float32)).numpy(), [3.0, 12.0])
+
+
+@pytest.mark.parametrize('model_name,steps_per_call', [('transe', '1'), ('complex', '4')])
+def test_trainer_xla(model_name, steps_per_call):
+    """Function to test the training and the scoring functions compiled with XLA."""
+    knowledge_graph = KnowledgeGraph(dataset="Freebase15k")
+    knowledge_graph.prepare_data()
+
+    config_def, model_def = Importer().import_model_config(model_name)
+    config = config_def(args=KGEArgParser().get_args(['-xla', 'true', '-spc', steps_per_call, '-b', '32']))
+
+    trainer = Trainer(model=model_def(config), debug=True)
+    trainer.build_model()
+    trainer.create_workers()
+    loss = trainer.train_model_epoch(0, tuning=True)
+    trainer.stop_workers()
+
+    assert np.isfinite(loss.numpy())
+    assert trainer.compiled_steps and not any(function.fallback for function in trainer.compiled_steps.values())
+
+    evaluator = Evaluator(model=trainer.model, multiprocess=False)
+    rank = evaluator.test_tail_rank(tf.constant(1), tf.constant(2), config.kg_meta.tot_entity)
+    assert sorted(rank.numpy().tolist()) == list(range(config.kg_meta.tot_entity))
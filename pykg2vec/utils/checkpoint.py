@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+This module is for the periodic checkpoints of a training run.
+
+A checkpoint holds everything the run needs to continue: the parameters of the model,
+the slots of the optimizer (and its iteration count), the global step, the last finished
+epoch, the loss history and the seed of the random streams. The generator derives the
+stream of every epoch and every batch from the seed and their indices, so a run resumed
+from epoch e with the same config (-rs, -rb) is fed the batches of the uninterrupted run.
+
+The checkpoints are written asynchronously: the variables are copied to the host when
+the checkpoint is taken and a background thread writes the copies while the training
+continues. tf.train.CheckpointManager keeps the latest checkpoint_keep ones, and one
+every checkpoint_hours hours if set. The labels of the entities and relations are written
+next to the checkpoints, a later run can warm-start from them (-ws).
+"""
+import numpy as np
+import tensorflow as tf
+
+from pykg2vec.utils.warmstart import save_labels
+
+
+class TrainingCheckpoint:
+    """Class writing and restoring the checkpoints of a training run.
+
+        Args:
+            model (object): Model of the trainer, its parameters defined.
+            optimizer (object): Optimizer of the trainer.
+            global_step (tf.Variable): Number of training steps run.
+            path (object): Directory of the checkpoints, config.checkpoint_path or config.path_tmp/<model>/checkpoints if None.
+
+        Examples:
+            >>> checkpoint = TrainingCheckpoint(model, optimizer, global_step)
+            >>> start_epoch, training_results = checkpoint.restore()
+            >>> for epoch_idx in range(start_epoch, config.epochs):
+            >>>     training_results.append([epoch_idx, train_epoch(epoch_idx)])
+            >>>     checkpoint.save(epoch_idx, training_results)
+            >>> checkpoint.sync()
+    """
+    def __init__(self, model, optimizer, global_step, path=None):
+        self.config = model.config
+        self.optimizer = optimizer
+        self.variables = model.trainable_variables
+
+        if path is None:
+            path = self.config.checkpoint_path
+        if path is None:
+            path = self.config.path_tmp / model.model_name / 'checkpoints'
+        self.path = path
+        save_labels(self.path, self.config)
+
+        # the state of the run besides the parameters, -1 for no epoch finished and no seed.
+        self.epoch = tf.Variable(-1, dtype=tf.int64, trainable=False, name="epoch")
+        self.random_seed = tf.Variable(-1, dtype=tf.int64, trainable=False, name="random_seed")
+        self.training_results = tf.Variable(np.zeros((0, 2), dtype=np.float64), shape=tf.TensorShape([None, 2]),
+                                            trainable=False, name="training_results")
+
+        self.checkpoint = tf.train.Checkpoint(model=model, optimizer=optimizer, global_step=global_step, epoch=self.epoch,
+                                              random_seed=self.random_seed, training_results=self.training_results)
+        self.manager = tf.train.CheckpointManager(self.checkpoint, str(self.path), max_to_keep=self.config.checkpoint_keep,
+                                                  keep_checkpoint_every_n_hours=self.config.checkpoint_hours)
+        self.options = tf.train.CheckpointOptions(experimental_enable_async_checkpoint=True)
+
+    def save(self, epoch_idx, training_results):
+        """Function to take the checkpoint of the run after the epoch, written in the background.
+
+            Args:
+                epoch_idx (int): The epoch just finished.
+                training_results (list): The [epoch, loss] pairs of the epochs so far.
+
+            Returns:
+                str: Path prefix of the checkpoint.
+        """
+        self.epoch.assign(epoch_idx)
+        self.random_seed.assign(-1 if self.config.random_seed is None else self.config.random_seed)
+        self.training_results.assign(np.asarray(training_results, dtype=np.float64).reshape(-1, 2))
+        return self.manager.save(checkpoint_number=epoch_idx, options=self.options)
+
+    def restore(self):
+        """Function to restore the run from the latest checkpoint, if any.
+
+            The slots of the optimizer are created before they are restored, and the seed
+            of the random streams is taken over from the checkpoint.
+
+            Returns:
+                tuple: The epoch to resume from and the [epoch, loss] pairs of the previous epochs.
+        """
+        latest = self.manager.latest_checkpoint
+        if latest is None:
+            print("No checkpoint in %s, the training starts from scratch." % self.path)
+            return 0, []
+
+        self.optimizer.build(self.variables)
+        self.checkpoint.restore(latest).assert_existing_objects_matched()
+
+        random_seed = int(self.random_seed.numpy())
+        random_seed = None if random_seed < 0 else random_seed
+        if random_seed != self.config.random_seed:
+            print("The run is resumed with the random seed %s of the checkpoint." % random_seed)
+            self.config.random_seed = random_seed
+
+        training_results = [[int(epoch), loss] for epoch, loss in self.training_results.numpy()]
+        print("Resumed from %s after epoch %d." % (latest, self.epoch.numpy()))
+        return int(self.epoch.numpy()) + 1, training_results
+
+    def sync(self):
+        """Function to wait until the checkpoints taken are written."""
+        self.checkpoint.sync()
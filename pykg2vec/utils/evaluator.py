@@ -10,10 +10,14 @@ from __future__ import print_function
 import os
 import numpy as np
 import pandas as pd
+import queue
+import threading
 import timeit
+import types
 from multiprocessing import Process, Queue
 import tensorflow as tf
 from pykg2vec.core.KGMeta import EvaluationMeta
+from pykg2vec.utils.xla import CompiledFunction
 
 
 class MetricCalculator:
@@ -134,6 +138,16 @@ class MetricCalculator:
     def get_curr_score(self):
         return self.mr[self.epoch]
 
+    def get_metrics(self):
+        """Function to get the metrics of the settled epoch, e.g. {'epoch': 9, 'mr': 52.1, 'fmrr': 0.31, 'fhits10': 0.52, ...}."""
+        metrics = {'epoch': self.epoch,
+                   'mr': float(self.mr[self.epoch]), 'fmr': float(self.fmr[self.epoch]),
+                   'mrr': float(self.mrr[self.epoch]), 'fmrr': float(self.fmrr[self.epoch])}
+        for hit in self.config.hits:
+            metrics['hits%d' % hit] = float(self.hit[(self.epoch, hit)])
+            metrics['fhits%d' % hit] = float(self.fhit[(self.epoch, hit)])
+        return metrics
+
     def reset(self):
         # temporarily used buffers and indexes.
         self.rank_head = []
@@ -223,6 +237,9 @@ def evaluation_process(result_queue, output_queue, config, model_name, tuning):
             model_name (str): Name of the model
             tuning (bool): Check if tuning or performing full test.
 
+        With a validation metric to stop the training on (config.early_stop_metric), the
+        metrics of every test are sent back to the trainer through the output_queue.
+
     """
 
     calculator = MetricCalculator(config)
@@ -237,6 +254,9 @@ def evaluation_process(result_queue, output_queue, config, model_name, tuning):
             calculator.settle()
             calculator.display_summary()
 
+            if config.early_stop_metric != "loss" and not tuning:
+                output_queue.put(calculator.get_metrics())
+
             if calculator.epoch >= config.epochs - 1:
                 calculator.save_test_summary(model_name)
 
@@ -246,6 +266,8 @@ def evaluation_process(result_queue, output_queue, config, model_name, tuning):
 
                 break
         elif result == Evaluator.TEST_BATCH_EARLY_STOP:
+            if calculator.mr:
+                calculator.save_test_summary(model_name)
             break
         else:
             calculator.append_result(result)
@@ -276,6 +298,7 @@ class Evaluator(EvaluationMeta):
         self.model = model
         self.debug = debug
         self.tuning = tuning
+        self.show_progress = True
         self.result_path = self.model.config.path_result
 
         if data_type == 'test':
@@ -312,12 +335,43 @@ class Evaluator(EvaluationMeta):
                                                  self.model.config, self.model.model_name, self.tuning))
             self.rank_calculator.start()
 
+        if self.model.config.jit_compile:
+            self.compile_functions()
+
+    def compile_functions(self):
+        """Function to compile the scoring functions with XLA (config.jit_compile)."""
+        batch = tf.TensorSpec([None], tf.int32)
+        test_step_batch = types.MethodType(Evaluator.test_step_batch.python_function, self)
+        self.test_step_batch = CompiledFunction(test_step_batch, [batch] * 3, "test_step_batch", fallback=self.test_step_batch)
+        for name in ["test_tail_rank_multiclass", "test_head_rank_multiclass", "test_tail_rank", "test_head_rank", "test_rel_rank"]:
+            setattr(self, name, self.rank_function(name))
+
+    def rank_function(self, name):
+        """Function to get a rank function compiled once per topk, which XLA needs to know when compiling."""
+        function = getattr(Evaluator, name).python_function
+        plain = getattr(self, name)
+        scalar = tf.TensorSpec([], tf.int32)
+        compiled = {}
+
+        def rank(a, b, topk=-1):
+            topk = int(topk)
+            if topk not in compiled:
+                compiled[topk] = CompiledFunction(lambda a, b: function(self, a, b, topk=topk), [scalar, scalar],
+                                                  "%s(topk=%d)" % (name, topk), fallback=lambda a, b: plain(a, b, topk))
+            return compiled[topk](a, b)
+
+        return rank
+
     def stop(self):
         """Function that stops the evaluation process"""
         if self.multiprocess:
             self.rank_calculator.join()
             self.rank_calculator.terminate()
 
+    def early_stop(self):
+        """Function to tell the evaluation process that the training stopped early."""
+        self.result_queue.put(self.TEST_BATCH_EARLY_STOP)
+
     @tf.function
     def test_step_batch(self, h_batch, r_batch, t_batch):
         hrank, trank = self.model.test_batch(h_batch, r_batch, t_batch)
@@ -364,9 +418,10 @@ class Evaluator(EvaluationMeta):
         return self.model.predict(h_batch, rel_array, t_batch, topk=topk)
 
     def test(self, epoch=None):
-        print("Testing [%d/%d] Triples" % (self.n_test, len(self.eval_data)))
+        if self.show_progress:
+            print("Testing [%d/%d] Triples" % (self.n_test, len(self.eval_data)))
 
-        progress_bar = tf.keras.utils.Progbar(self.n_test)
+        progress_bar = tf.keras.utils.Progbar(self.n_test, verbose=1 if self.show_progress else 0)
 
         self.result_queue.put(self.TEST_BATCH_START)
         for i in range(self.n_test):
@@ -400,3 +455,104 @@ class Evaluator(EvaluationMeta):
         with open(str(self.result_path / (self.model.model_name + '_Training_results_' + str(l) + '.csv')),
                   'w') as fh:
             df.to_csv(fh)
+
+
+class AsyncEvaluator(Evaluator):
+    """Class to evaluate snapshots of the model in a background thread while the training continues.
+
+        test(epoch) copies the variables of the model to the host and returns, a thread loads
+        the copy into a second instance of the model and evaluates it as Evaluator.test does,
+        the results being those of the snapshot's epoch. At most one snapshot waits while
+        another one is evaluated (a double buffer): if the evaluation falls behind, test blocks
+        until the pending snapshot is taken.
+
+        Args:
+            model (object): Model object being trained.
+            debug (bool): Flag to check if its debugging
+            data_type (str): evaluating 'test' or 'valid'
+            keep_snapshots (bool): Keep the snapshots after their evaluation, see pop_snapshot.
+
+        Examples:
+            >>> from pykg2vec.utils.evaluator import AsyncEvaluator
+            >>> evaluator = AsyncEvaluator(model=model)
+            >>> evaluator.test(epoch)  # returns at once.
+            >>> evaluator.stop()  # waits for the evaluation of the snapshots.
+    """
+    def __init__(self, model=None, debug=False, data_type='valid', keep_snapshots=False):
+        self.source_model = model
+        eval_model = type(model)(model.config)
+        eval_model.def_parameters()
+        super().__init__(model=eval_model, debug=debug, data_type=data_type)
+        self.show_progress = False
+
+        self.keep_snapshots = keep_snapshots
+        self.snapshots = {}
+        self.snapshot_queue = queue.Queue(1)
+        self.error = None
+        self.thread = threading.Thread(target=self.evaluate_snapshots, daemon=True)
+        self.thread.start()
+
+    def test(self, epoch=None):
+        """Function to take a snapshot of the model and queue it for evaluation."""
+        self.check_error()
+        snapshot = [variable.numpy() for variable in self.source_model.variables]
+        if self.keep_snapshots:
+            self.snapshots[epoch] = snapshot
+        self.snapshot_queue.put((epoch, snapshot))
+
+    def evaluate_snapshots(self):
+        """Function run by the thread, evaluating the queued snapshots in order until None."""
+        while True:
+            item = self.snapshot_queue.get()
+            try:
+                if item is None:
+                    return
+                epoch, snapshot = item
+                if self.error is None:
+                    self.load_snapshot(snapshot)
+                    Evaluator.test(self, epoch)
+            except Exception as error:
+                self.error = error
+            finally:
+                self.snapshot_queue.task_done()
+
+    def load_snapshot(self, snapshot):
+        """Function to load a snapshot into the evaluated model."""
+        if len(self.model.variables) != len(snapshot):
+            # the layers creating their variables on the first call (e.g. ConvE) are built by a scoring call.
+            zero = tf.constant(0, dtype=tf.int32)
+            if self.model.model_name.lower() in ["tucker", "tucker_v2", "conve", "proje_pointwise"]:
+                self.test_tail_rank_multiclass(zero, zero, 1)
+            else:
+                self.test_tail_rank(zero, zero, 1)
+        for variable, value in zip(self.model.variables, snapshot):
+            variable.assign(value)
+
+    def pop_snapshot(self, epoch):
+        """Function to get (and forget) the snapshot of an epoch, kept if keep_snapshots is set."""
+        return self.snapshots.pop(epoch)
+
+    def wait(self):
+        """Function to wait until the queued snapshots are evaluated."""
+        self.snapshot_queue.join()
+        self.check_error()
+
+    def check_error(self):
+        """Function to raise the error of the evaluation thread in the caller."""
+        if self.error is not None:
+            raise RuntimeError("The asynchronous evaluation failed.") from self.error
+
+    def early_stop(self):
+        """Function to tell the evaluation process that the training stopped early, after the queued snapshots."""
+        self.wait()
+        super().early_stop()
+
+    def stop(self):
+        """Function that waits for the queued snapshots and stops the evaluation thread and process."""
+        self.snapshot_queue.join()
+        self.snapshot_queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            self.rank_calculator.terminate()
+            self.check_error()
+        super().stop()
@@ -7,167 +7,775 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import collections
+import ctypes
+import queue
+import threading
+import time
 import numpy as np
 from multiprocessing import Process, Queue
+from multiprocessing.sharedctypes import RawArray
 import tensorflow as tf
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import reverse_cuthill_mckee
 
-def raw_data_generator(raw_queue, processed_queue, config):
+
+class SharedBatchBuffer:
+    """Ring buffer of preallocated batch slots living in shared memory.
+
+        Every slot holds one processed batch as a set of fixed-width arrays, one per field
+        (e.g. ph, pr, pt, nh, nr, nt). A worker acquires a free slot, fills it in place and
+        only sends the slot index through the processed queue. The consumer wraps the slot
+        as tensors without copying and hands the slot back once it is done with it.
+
+        Args:
+            num_slots (int): Number of slots in the ring buffer.
+            field_sizes (list): Maximum number of elements of each field.
+            dtypes (list): Numpy dtype of each field.
+
+        Examples:
+            >>> buffer = SharedBatchBuffer(4, [128, 128], [np.int32, np.float32])
+            >>> slot_idx = buffer.acquire()
+            >>> lengths = buffer.write(slot_idx, [[1, 2], [1.0, -1.0]])
+            >>> h, y = buffer.read(slot_idx, lengths)
+            >>> buffer.release(slot_idx)
+    """
+    # tensorflow only aliases buffers that are properly aligned.
+    ALIGNMENT = 64
+
+    def __init__(self, num_slots, field_sizes, dtypes):
+        self.num_slots = num_slots
+        self.field_sizes = field_sizes
+        self.dtypes = [np.dtype(dtype) for dtype in dtypes]
+
+        self.field_offsets = []
+        slot_bytes = 0
+        for size, dtype in zip(self.field_sizes, self.dtypes):
+            self.field_offsets.append(slot_bytes)
+            slot_bytes += -(-size * dtype.itemsize // self.ALIGNMENT) * self.ALIGNMENT
+        self.slot_bytes = slot_bytes
+
+        self.raw = RawArray(ctypes.c_char, self.num_slots * self.slot_bytes + self.ALIGNMENT)
+
+        self.free_queue = Queue(self.num_slots)
+        for slot_idx in range(self.num_slots):
+            self.free_queue.put(slot_idx)
+
+    def acquire(self):
+        """Function to get the index of a free slot, blocks until one is available."""
+        return self.free_queue.get()
+
+    def release(self, slot_idx):
+        """Function to hand a consumed slot back to the workers."""
+        self.free_queue.put(slot_idx)
+
+    def slot(self, slot_idx):
+        """Function to get the numpy views of all the fields of a slot."""
+        base = (-ctypes.addressof(self.raw)) % self.ALIGNMENT + slot_idx * self.slot_bytes
+        return [np.frombuffer(self.raw, dtype=dtype, count=size, offset=base + offset)
+                for size, dtype, offset in zip(self.field_sizes, self.dtypes, self.field_offsets)]
+
+    def write(self, slot_idx, fields):
+        """Function to fill a slot in place, returns the length of each field."""
+        lengths = []
+        for view, data in zip(self.slot(slot_idx), fields):
+            view[:len(data)] = data
+            lengths.append(len(data))
+        return lengths
+
+    def read(self, slot_idx, lengths):
+        """Function to wrap the fields of a slot as tensors.
+
+            The tensors share the memory of the slot, so they are only valid
+            until the slot is released.
+        """
+        return [to_tensor_no_copy(view[:length]) for view, length in zip(self.slot(slot_idx), lengths)]
+
+
+def to_tensor_no_copy(array):
+    """Function to wrap a numpy array as a tensor, sharing memory through dlpack if available."""
+    if hasattr(array, '__dlpack__'):
+        return tf.experimental.dlpack.from_dlpack(array.__dlpack__())
+    return tf.convert_to_tensor(array)
+
+
+def make_rng(config, *keys):
+    """Function to create a random generator for one stream of the run.
+
+        With config.random_seed set, the stream is derived from the run seed and the keys, so that
+        it does not depend on which worker uses it; otherwise it is seeded from fresh OS entropy.
+
+        Args:
+            config (object): Model configuration object.
+            keys (int): Identifiers of the stream, e.g. (BATCH_STREAM, batch_idx).
+
+        Returns:
+            numpy.random.Generator: The random generator.
+    """
+    if config.random_seed is None:
+        return np.random.default_rng()
+    return np.random.default_rng((config.random_seed,) + keys)
+
+# identifiers of the random streams derived from the run seed.
+FEEDER_STREAM = 0
+BATCH_STREAM = 1
+CACHE_STREAM = 2
+HOGWILD_STREAM = 3
+PARTITION_STREAM = 4
+
+def get_raw(raw_queue, stats=None):
+    """Function to get a raw batch, timed if the worker statistics are given."""
+    if stats is None:
+        return raw_queue.get()
+    return stats.get(raw_queue)
+
+def put_processed(processed_queue, batch_idx, batch, shared_buffer=None, stats=None):
+    """Function to put a processed batch in the processed queue.
+
+        Args:
+            processed_queue (Queue) : Multiprocessing Queue to put the processed data.
+            batch_idx (int): Index of the batch in the stream of the feeder, put along with the batch.
+            batch (list): List of the fields of the processed batch.
+            shared_buffer (SharedBatchBuffer): If given, the batch is written to a shared-memory
+                slot and only the slot index is put in the queue.
+            stats (WorkerStats): If given, the batch and the time spent blocked are counted.
+    """
+    if shared_buffer is not None:
+        start = time.perf_counter()
+        slot_idx = shared_buffer.acquire()
+        if stats is not None:
+            stats.add("put_wait", time.perf_counter() - start)
+        lengths = shared_buffer.write(slot_idx, batch)
+        batch = (slot_idx, lengths)
+
+    if stats is None:
+        processed_queue.put((batch_idx, batch))
+    else:
+        stats.put(processed_queue, (batch_idx, batch))
+
+
+def number_of_batches(num_triples, batch_size, partial_batch=False):
+    """Function to compute the number of batches in one pass over the training triples.
+
+        Args:
+            num_triples (int): Total number of training triples.
+            batch_size (int): Size of each batch.
+            partial_batch (bool): If True, the remaining triples form a final (smaller) batch.
+
+        Returns:
+            int: Number of batches per epoch.
+    """
+    if partial_batch:
+        return (num_triples + batch_size - 1) // batch_size
+    return max(num_triples // batch_size, 1)
+
+
+def read_training_triples(config):
+    """Function to read the cached training triples as an [n, 3] int32 array of (h, r, t) ids."""
+    data = config.knowledge_graph.read_cache_data('triplets_train')
+    return np.asarray([[t.h, t.r, t.t] for t in data], dtype=np.int32)
+
+
+def segment_cumsum(values, segments):
+    """Function to compute the cumulative sums of values restarting at every new segment id."""
+    cumsum = np.cumsum(values)
+    starts = np.flatnonzero(np.r_[True, segments[1:] != segments[:-1]])
+    base = (cumsum - values)[starts]
+    return cumsum - np.repeat(base, np.diff(np.r_[starts, len(values)]))
+
+
+class AliasTable:
+    """Alias tables (Walker/Vose) drawing from discrete distributions in O(1) per sample.
+
+        Several distributions can be stored in one table as consecutive segments, segment s
+        covering the entries offsets[s]:offsets[s+1]; this is how the per-relation tables are kept.
+        The table is built with vectorized rounds instead of the usual sequential loop: in every
+        round the deficits of all the under-full entries and the surpluses of all the over-full
+        entries of a segment are laid on a line, and each under-full entry takes its alias from
+        the over-full entry whose surplus covers the start of its deficit.
+
+        Args:
+            weights (array): Non-negative weight of every entry.
+            values (array): Value returned for every entry, defaults to the entry index.
+            offsets (array): Start of every segment followed by the number of entries, defaults to a single segment.
+
+        Examples:
+            >>> table = AliasTable(np.bincount(train_data[:, 0]))
+            >>> heads = table.sample(size=1000)
+    """
+    def __init__(self, weights, values=None, offsets=None):
+        weights = np.asarray(weights, dtype=np.float64)
+        self.values = np.arange(len(weights)) if values is None else np.asarray(values)
+        self.offsets = np.asarray([0, len(weights)] if offsets is None else offsets, dtype=np.int64)
+        self.sizes = np.diff(self.offsets)
+
+        segments = np.repeat(np.arange(len(self.sizes)), self.sizes)
+        totals = np.bincount(segments, weights, minlength=len(self.sizes))
+        # scale every segment to a mean of one, segments without weight fall back to uniform.
+        scale = np.divide(self.sizes, totals, out=np.zeros(len(totals)), where=totals > 0)
+        prob = np.where(totals[segments] > 0, weights * scale[segments], 1.0)
+
+        self.prob, self.alias = self.build(prob, segments)
+
+    @staticmethod
+    def build(prob, segments):
+        """Function to build the acceptance probabilities and aliases of mean-one scaled weights."""
+        prob = prob.copy()
+        alias = np.arange(len(prob))
+        small = np.flatnonzero(prob < 1)
+        large = np.flatnonzero(prob >= 1)
+
+        while len(small) > 0 and len(large) > 0:
+            deficit = 1 - prob[small]
+            deficit_start = segment_cumsum(deficit, segments[small]) - deficit
+            surplus_end = segment_cumsum(prob[large] - 1, segments[large])
+
+            # merge both lines per segment, a small entry is served by the next large entry.
+            is_large = np.r_[np.zeros(len(small), dtype=bool), np.ones(len(large), dtype=bool)]
+            entries = np.r_[small, large]
+            order = np.lexsort((~is_large, np.r_[deficit_start, surplus_end], segments[entries]))
+            position = np.where(is_large[order], np.arange(len(order)), len(order))
+            next_large = np.minimum.accumulate(position[::-1])[::-1][~is_large[order]]
+
+            served = next_large < len(order)
+            donor = np.full(len(small), -1)
+            donor[served] = entries[order[next_large[served]]]
+            served[served] = segments[donor[served]] == segments[small[served]]
+
+            alias[small[served]] = donor[served]
+            np.subtract.at(prob, donor[served], deficit[served])
+
+            # small entries left without a donor only come from rounding errors.
+            prob[small[~served]] = 1
+            touched = np.zeros(len(prob), dtype=bool)
+            touched[donor[served]] = True
+            small = large[touched[large] & (prob[large] < 1)]
+            large = large[prob[large] >= 1]
+
+        prob[small] = 1
+        prob[large] = 1
+        return np.clip(prob, 0, 1), alias
+
+    def sample(self, segments=None, size=None, rng=None):
+        """Function to draw one value from the given segment of every row.
+
+            Args:
+                segments (array): Segment to draw from for every sample, all from segment 0 if not given.
+                size (int): Number of samples to draw if segments is not given.
+                rng (numpy.random.Generator): Random generator to draw with, a fresh one if not given.
+
+            Returns:
+                array: The drawn values.
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        if segments is None:
+            segments = np.zeros(size, dtype=np.int64)
+        idx = self.offsets[segments] + (rng.random(len(segments)) * self.sizes[segments]).astype(np.int64)
+        idx = np.where(rng.random(len(segments)) < self.prob[idx], idx, self.alias[idx])
+        return self.values[idx]
+
+
+def shared_array(shape, dtype):
+    """Function to allocate a numpy array in shared memory, visible to the forked worker processes."""
+    dtype = np.dtype(dtype)
+    raw = RawArray(ctypes.c_char, int(np.prod(shape)) * dtype.itemsize)
+    return np.frombuffer(raw, dtype=dtype).reshape(shape)
+
+
+class NegativeCache:
+    """Cache of hard negative candidates for every (h, r) and (r, t) pair of the training set (NSCaching).
+
+        The pairs are encoded as sorted int64 keys and every cache row is found with a
+        searchsorted call on them, the candidates themselves are kept in fixed-width
+        int32 arrays in shared memory. The generator draws the replacement tails of (h, r)
+        and heads of (r, t) from these rows while the trainer refreshes the rows of every
+        batch: the cached candidates and a few random entities are scored by the model
+        and the best scoring non-positive ones are kept (Zhang et al., NSCaching, 2019).
+
+        Args:
+            config (object): Model configuration object.
+            data (array): [n, 3] array of training triple ids.
+
+        Examples:
+            >>> cache = NegativeCache(config, data)
+            >>> rows, candidates = cache.candidates(h, r, t, head=False)
+            >>> cache.update(rows, candidates, scores, head=False)
+    """
+    def __init__(self, config, data):
+        self.tot_entity = config.kg_meta.tot_entity
+        self.tot_relation = config.kg_meta.tot_relation
+        self.cache_size = config.neg_cache_size
+        self.num_candidates = config.neg_cache_candidates
+
+        self.hr_keys = np.unique(self.encode(data[:, 0], data[:, 1]))
+        self.rt_keys = np.unique(self.encode(data[:, 2], data[:, 1]))
+
+        # the caches start out as uniform samples.
+        rng = make_rng(config, CACHE_STREAM)
+        self.tail_cache = shared_array((len(self.hr_keys), self.cache_size), np.int32)
+        self.head_cache = shared_array((len(self.rt_keys), self.cache_size), np.int32)
+        self.tail_cache[:] = rng.integers(self.tot_entity, size=self.tail_cache.shape)
+        self.head_cache[:] = rng.integers(self.tot_entity, size=self.head_cache.shape)
+
+    def encode(self, e, r):
+        """Function to encode (entity, relation) pairs as int64 keys."""
+        return np.asarray(e, dtype=np.int64) * self.tot_relation + r
+
+    def rows(self, h, r, t, head):
+        """Function to find the cache rows of (r, t) pairs if head is set, else of (h, r) pairs."""
+        if head:
+            return np.searchsorted(self.rt_keys, self.encode(t, r))
+        return np.searchsorted(self.hr_keys, self.encode(h, r))
+
+    def sample(self, h, r, t, head, rng):
+        """Function to draw one cached head (if head is set) or tail per training triple."""
+        cache = self.head_cache if head else self.tail_cache
+        rows = self.rows(h, r, t, head)
+        return cache[rows, rng.integers(self.cache_size, size=len(rows))]
+
+    def candidates(self, h, r, t, head, rng=None):
+        """Function to gather the cached and fresh random candidates of a batch of training triples.
+
+            Returns:
+                tuple: The [b] cache rows and the [b, cache_size + num_candidates] candidate entities.
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        cache = self.head_cache if head else self.tail_cache
+        rows = self.rows(h, r, t, head)
+        fresh = rng.integers(self.tot_entity, size=(len(rows), self.num_candidates), dtype=np.int32)
+        return rows, np.concatenate([cache[rows], fresh], axis=1)
+
+    def update(self, rows, candidates, scores, head):
+        """Function to keep the cache_size best scoring distinct candidates in the given cache rows."""
+        cache = self.head_cache if head else self.tail_cache
+        # the repeated candidates of a row only keep one score, or the row could fill up with copies.
+        order = np.argsort(candidates, axis=1, kind="stable")
+        ordered = np.take_along_axis(candidates, order, axis=1)
+        repeated = np.zeros(candidates.shape, dtype=bool)
+        repeated[:, 1:] = ordered[:, 1:] == ordered[:, :-1]
+        scores = np.array(scores, dtype=np.float64)
+        np.put_along_axis(scores, order, np.where(repeated, -np.inf, np.take_along_axis(scores, order, axis=1)), axis=1)
+
+        best = np.argpartition(-scores, self.cache_size - 1, axis=1)[:, :self.cache_size]
+        cache[rows] = np.take_along_axis(candidates, best, axis=1)
+
+
+class WorkerStats:
+    """Counters of one generator worker, a row of the shared GeneratorStats array.
+
+        Args:
+            counters (array): Shared float64 array holding the fields of GeneratorStats.FIELDS.
+    """
+    def __init__(self, counters):
+        self.counters = counters
+
+    def add(self, field, value):
+        """Function to add value to one of the counters."""
+        self.counters[GeneratorStats.FIELDS.index(field)] += value
+
+    def get(self, source_queue):
+        """Function to get an item from a queue, counting the time spent blocked."""
+        start = time.perf_counter()
+        item = source_queue.get()
+        self.add("get_wait", time.perf_counter() - start)
+        return item
+
+    def put(self, target_queue, item):
+        """Function to put a batch in a queue, counting the batch and the time spent blocked."""
+        start = time.perf_counter()
+        target_queue.put(item)
+        self.add("put_wait", time.perf_counter() - start)
+        self.add("batches", 1)
+
+
+class GeneratorStats:
+    """Throughput and back-pressure statistics of the generator workers.
+
+        Every worker owns a row of counters in shared memory, so that the numbers of the worker
+        processes are visible from the main process. The counters are: the number of batches
+        put out, the seconds spent blocked getting raw batches (starved workers) and putting
+        the processed batches (back-pressure from a full queue or a full ring buffer) and the
+        number of corrupted triples drawn again because they hit a training triple. The main
+        process adds the time the consumer waits in Generator.__next__ and samples the
+        occupancy of both queues on every call.
+
+        Args:
+            worker_names (list): Name of every worker, in the order they are created.
+
+        Examples:
+            >>> stats = generator.stats.summary()
+            >>> stats['consumer_wait'], stats['workers']['processor-0']['batches_per_sec']
+    """
+    FIELDS = ["batches", "get_wait", "put_wait", "rejections"]
+
+    def __init__(self, worker_names):
+        self.worker_names = worker_names
+        self.counters = shared_array((len(worker_names), len(self.FIELDS)), np.float64)
+        self.reset()
+
+    def worker(self, worker_idx):
+        """Function to get the counters of a worker."""
+        return WorkerStats(self.counters[worker_idx])
+
+    def reset(self):
+        """Function to reset all the statistics, e.g. at the beginning of an epoch."""
+        self.counters[:] = 0
+        self.start_time = time.perf_counter()
+        self.consumer_wait = 0.0
+        # (elapsed seconds, raw queue size, processed queue size) per call of Generator.__next__.
+        self.occupancy = []
+
+    def record_next(self, wait, raw_queue, processed_queue):
+        """Function to record the wait and the queue occupancy of a call of Generator.__next__."""
+        self.consumer_wait += wait
+        try:
+            self.occupancy.append((time.perf_counter() - self.start_time, raw_queue.qsize(), processed_queue.qsize()))
+        except NotImplementedError:
+            # multiprocessing queues do not implement qsize on macOS.
+            pass
+
+    def summary(self):
+        """Function to summarize the statistics since the last reset.
+
+            Returns:
+                dict: The elapsed seconds, the consumer wait, the mean and max occupancy of both
+                queues and, per worker, the counters and the batches per second.
+        """
+        elapsed = time.perf_counter() - self.start_time
+        workers = {}
+        for name, counters in zip(self.worker_names, self.counters):
+            workers[name] = dict(zip(self.FIELDS, counters.tolist()))
+            workers[name]["batches_per_sec"] = counters[0] / elapsed if elapsed > 0 else 0.0
+
+        occupancy = np.asarray(self.occupancy, dtype=np.float64).reshape(-1, 3)
+        summary = {"elapsed": elapsed, "consumer_wait": self.consumer_wait, "workers": workers}
+        for column, name in [(1, "raw_queue"), (2, "processed_queue")]:
+            summary[name + "_mean"] = occupancy[:, column].mean() if len(occupancy) else 0.0
+            summary[name + "_max"] = occupancy[:, column].max() if len(occupancy) else 0.0
+
+        return summary
+
+    def log(self):
+        """Function to print a short report of the statistics."""
+        summary = self.summary()
+        print("Generator: waited %.2fs of %.2fs for batches, queue occupancy raw %.1f (max %d), processed %.1f (max %d)" % \
+            (summary["consumer_wait"], summary["elapsed"], summary["raw_queue_mean"], summary["raw_queue_max"],
+             summary["processed_queue_mean"], summary["processed_queue_max"]))
+        for name, worker in summary["workers"].items():
+            print("  %s: %.1f batches/s, blocked %.2fs on get and %.2fs on put, %d rejections" % \
+                (name, worker["batches_per_sec"], worker["get_wait"], worker["put_wait"], worker["rejections"]))
+
+
+class NegativeSampler:
+    """Vectorized sampler that corrupts either the head or the tail of positive triples.
+
+        The training triples are encoded as sorted int64 keys, so that the corruptions of a
+        whole batch are checked against the training set with one searchsorted call and
+        only the ones hitting a positive triple are drawn again. All the heavy kernels are
+        numpy calls, which release the GIL and make the sampler usable from threads.
+
+        The replacement entities are drawn according to config.sampling: uniformly ('uniform'
+        and 'bern'), proportionally to the entity degrees in the training set ('degree'), or from
+        the heads/tails observed with the relation of the triple ('typed', i.e. its domain or
+        range). The last two draw from alias tables built once from the training array. With
+        'cache', the entities come from the hard-negative cache (see NegativeCache) that the
+        trainer refreshes with the model scores. Since these draws may keep hitting positives
+        (e.g. for tiny domains), rows still rejected after max_attempts draws fall back to
+        uniform sampling.
+
+        Args:
+            config (object): Model configuration object.
+            data (array): [n, 3] array of training triple ids, read from the cache if not given.
+
+        Examples:
+            >>> sampler = NegativeSampler(config)
+            >>> neg_triples = sampler.corrupt(pos_triples, neg_rate=2)
+    """
+    def __init__(self, config, data=None):
+        if data is None:
+            data = read_training_triples(config)
+
+        self.tot_entity = config.kg_meta.tot_entity
+        self.tot_relation = config.kg_meta.tot_relation
+        self.positive_keys = np.unique(self.encode(data[:, 0], data[:, 1], data[:, 2]))
+
+        # probability of corrupting the head for each relation.
+        if config.sampling == "bern":
+            relation_property = config.knowledge_graph.read_cache_data('relationproperty')
+            self.head_prob = np.asarray([relation_property[r] for r in range(self.tot_relation)], dtype=np.float64)
+        else:
+            self.head_prob = np.full(self.tot_relation, 0.5)
+
+        self.sampling = config.sampling
+        self.max_attempts = 10
+        if self.sampling == "degree":
+            degree = np.bincount(data[:, 0], minlength=self.tot_entity) + np.bincount(data[:, 2], minlength=self.tot_entity)
+            self.degree_table = AliasTable(degree)
+        elif self.sampling == "typed":
+            self.domain_table = self.relation_table(data[:, 1], data[:, 0])
+            self.range_table = self.relation_table(data[:, 1], data[:, 2])
+        elif self.sampling == "cache":
+            self.cache = NegativeCache(config, data)
+
+    def relation_table(self, relations, entities):
+        """Function to build the alias table of the entities seen with every relation, weighted by frequency."""
+        keys, counts = np.unique(np.asarray(relations, dtype=np.int64) * self.tot_entity + entities, return_counts=True)
+        offsets = np.r_[0, np.cumsum(np.bincount(keys // self.tot_entity, minlength=self.tot_relation))]
+        return AliasTable(counts, values=keys % self.tot_entity, offsets=offsets)
+
+    def draw_entities(self, triples, head, attempt, rng):
+        """Function to draw the replacement entities of the corrupted triples.
+
+            Args:
+                triples (array): [n, 3] array of the triples to corrupt, the side
+                    kept from the positive triple is used by the typed and cache samplings.
+                head (bool): True if the heads are replaced, False for the tails.
+                attempt (int): Number of draws already rejected for these triples.
+                rng (numpy.random.Generator): Random generator to draw with.
+
+            Returns:
+                array: The drawn entity ids.
+        """
+        relations = triples[:, 1]
+        if attempt >= self.max_attempts or self.sampling not in ("degree", "typed", "cache"):
+            return rng.integers(self.tot_entity, size=len(relations))
+        if self.sampling == "degree":
+            return self.degree_table.sample(size=len(relations), rng=rng)
+        if self.sampling == "cache":
+            return self.cache.sample(triples[:, 0], relations, triples[:, 2], head, rng)
+
+        table = self.domain_table if head else self.range_table
+        entities = rng.integers(self.tot_entity, size=len(relations))
+        # relations without training triples have an empty domain and range.
+        seen = table.sizes[relations] > 0
+        entities[seen] = table.sample(relations[seen], rng=rng)
+        return entities
+
+    def encode(self, h, r, t):
+        """Function to encode triples as unique int64 keys."""
+        return (np.asarray(h, dtype=np.int64) * self.tot_relation + r) * self.tot_entity + t
+
+    def is_positive(self, h, r, t):
+        """Function to check which of the given triples are training triples."""
+        keys = self.encode(h, r, t)
+        idx = np.searchsorted(self.positive_keys, keys)
+        idx[idx == len(self.positive_keys)] = 0
+        return self.positive_keys[idx] == keys
+
+    def corrupt(self, pos_triples, neg_rate, stats=None, rng=None):
+        """Function to generate neg_rate corrupted triples for every positive triple.
+
+            Args:
+                pos_triples (array): [b, 3] array of positive triple ids.
+                neg_rate (int): Number of negative triples per positive one.
+                stats (WorkerStats): If given, the triples drawn again are counted as rejections.
+                rng (numpy.random.Generator): Random generator to draw with, a fresh one if not given.
+
+            Returns:
+                array: [b*neg_rate, 3] array of negative triple ids, the negatives
+                of a positive triple are stored next to each other.
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        neg_triples = np.repeat(pos_triples, neg_rate, axis=0)
+        replace_head = rng.random(len(neg_triples)) <= self.head_prob[neg_triples[:, 1]]
+
+        resample = np.arange(len(neg_triples))
+        attempt = 0
+        while len(resample) > 0:
+            heads = resample[replace_head[resample]]
+            tails = resample[~replace_head[resample]]
+            neg_triples[heads, 0] = self.draw_entities(neg_triples[heads], True, attempt, rng)
+            neg_triples[tails, 2] = self.draw_entities(neg_triples[tails], False, attempt, rng)
+
+            rows = neg_triples[resample]
+            resample = resample[self.is_positive(rows[:, 0], rows[:, 1], rows[:, 2])]
+            attempt += 1
+            if stats is not None:
+                stats.add("rejections", len(resample))
+
+        return neg_triples
+
+
+def locality_buckets(data, tot_entity, num_buckets):
+    """Function to split the training triples into buckets of triples with nearby entities.
+
+        The entities are ordered with the reverse Cuthill-McKee ordering of the (undirected)
+        entity graph, which gives connected entities close ranks. Every triple is ranked by the
+        mean rank of its head and tail and the triples are cut into num_buckets equal parts
+        along that rank, so that a bucket touches a narrow range of the entity table.
+
+        Args:
+            data (array): [n, 3] array of training triple ids.
+            tot_entity (int): Total number of entities.
+            num_buckets (int): Number of buckets.
+
+        Returns:
+            array: The bucket of every triple.
+    """
+    graph = csr_matrix((np.ones(2 * len(data), dtype=np.float32),
+                        (np.r_[data[:, 0], data[:, 2]], np.r_[data[:, 2], data[:, 0]])),
+                       shape=(tot_entity, tot_entity))
+    entity_rank = np.empty(tot_entity, dtype=np.int64)
+    entity_rank[reverse_cuthill_mckee(graph, symmetric_mode=True)] = np.arange(tot_entity)
+
+    triple_rank = entity_rank[data[:, 0]] + entity_rank[data[:, 2]]
+    position = np.empty(len(data), dtype=np.int64)
+    position[np.argsort(triple_rank, kind='stable')] = np.arange(len(data))
+
+    return position * num_buckets // len(data)
+
+
+def raw_data_generator(raw_queue, processed_queue, config, data=None, start_epoch=0, max_batches=None, stats=None):
     """Function to feed  triples to raw queue for multiprocessing.
-           
+
+        The training triples are reshuffled at the beginning of every epoch.
+        If config.partial_batch is set, the triples left over by the last full
+        batch are emitted as a final partial batch, so that every triple is seen
+        exactly once per epoch.
+
+        If config.relation_grouped is set, the shuffled triples are sorted by relation (in an
+        order of the relations redrawn every epoch) before being cut into batches, and the
+        batches are fed in a random order. Every batch then holds one or a few relations, its
+        rows sorted by relation, so that the projection models can transform the rows of a
+        relation with a single matmul.
+
+        Otherwise, if config.locality_window is positive, the triples are split in buckets of
+        about that many batches of nearby entities (see locality_buckets). Every epoch visits
+        the buckets in a new random order and shuffles the triples within each bucket, so that
+        consecutive batches reuse rows of the embedding tables while staying random.
+
         Args:
             raw_queue (Queue) : Multiprocessing Queue to put the raw data to be processed.
             processed_queue (Queue) : Multiprocessing Queue to put the processed data.
-            data (list) : List of integer ids denoting positive triples.
-            batch_size (int) : Size of each batch.
-            number_of_batch (int) : Total number of batch.
+            config (object): Model configuration object.
+            data (array): [n, 3] array of training triple ids, read from the cache if not given.
+            start_epoch (int): Epoch to start feeding from, to resume a training run.
+            max_batches (int): Number of batches fed per epoch at most (e.g. to debug), all of them if None.
+            stats (WorkerStats): Statistics of the worker, if any.
+
+        Every epoch is shuffled with its own stream and the batch_idx keep counting across
+        the epochs, so that the batches of a resumed run are those of the uninterrupted run.
 
     """
-    data = config.knowledge_graph.read_cache_data('triplets_train')
+    if data is None:
+        data = read_training_triples(config)
 
-    number_of_batch = len(data) // config.batch_size
-    batch_idx = 0
+    number_of_batch = number_of_batches(len(data), config.batch_size, config.partial_batch)
+    batches_per_epoch = number_of_batch if max_batches is None else min(number_of_batch, max_batches)
+    batch_idx = start_epoch * batches_per_epoch
+    epoch_idx = start_epoch
+
+    if config.locality_window > 0:
+        num_buckets = max(len(data) // (config.batch_size * config.locality_window), 1)
+        buckets = locality_buckets(data, config.kg_meta.tot_entity, num_buckets)
 
-    random_ids = np.random.permutation(len(data))
-    
     while True:
-        pos_start = config.batch_size * batch_idx
-        pos_end   = config.batch_size * (batch_idx+1)
-        
-        raw_data = np.asarray([[data[x].h, data[x].r, data[x].t] for x in random_ids[pos_start:pos_end]])
-        
-        raw_queue.put((batch_idx, raw_data))
+        rng = make_rng(config, FEEDER_STREAM, epoch_idx)
+        random_ids = rng.permutation(len(data))
+        batch_order = np.arange(number_of_batch)
 
-        batch_idx += 1
-        if batch_idx >= number_of_batch:
-            batch_idx = 0
+        if config.relation_grouped:
+            relation_order = rng.permutation(config.kg_meta.tot_relation)
+            random_ids = random_ids[np.argsort(relation_order[data[random_ids, 1]], kind='stable')]
+            batch_order = rng.permutation(number_of_batch)
+        elif config.locality_window > 0:
+            bucket_order = rng.permutation(num_buckets)
+            random_ids = random_ids[np.argsort(bucket_order[buckets[random_ids]], kind='stable')]
 
+        for i in batch_order[:batches_per_epoch]:
+            pos_start = config.batch_size * i
+            pos_end   = config.batch_size * (i+1)
 
-def process_function_pairwise(raw_queue, processed_queue, config):
+            raw_batch = (batch_idx, data[random_ids[pos_start:pos_end]])
+            if stats is None:
+                raw_queue.put(raw_batch)
+            else:
+                stats.put(raw_queue, raw_batch)
+
+            batch_idx += 1
+
+        epoch_idx += 1
+
+
+def process_function_pairwise(raw_queue, processed_queue, config, shared_buffer=None, sampler=None, stats=None):
     """Function that puts the processed data in the queue.
            
         Args:
             raw_queue (Queue) : Multiprocessing Queue to put the raw data to be processed.
             processed_queue (Queue) : Multiprocessing Queue to put the processed data.
-            te (int): Total number of entities
-            bs (int): Total size of each batch.
-            positive_triplets (list) : List of positive triples.
-            lh (int): Id of the last processed head.
-            lr (int): Id of the last processed relation.
-            lt (int): Id of the last processed tail.
+            config (object): Model configuration object.
+            shared_buffer (SharedBatchBuffer): Shared-memory buffer to write the processed data to, if any.
+            sampler (NegativeSampler): Sampler used to corrupt the triples, created if not given.
+            stats (WorkerStats): Statistics of the worker, if any.
     """ 
-    data = config.knowledge_graph.read_cache_data('triplets_train')
-    relation_property = config.knowledge_graph.read_cache_data('relationproperty')
-    positive_triplets = {(t.h, t.r, t.t): 1 for t in data}
-    neg_rate = config.neg_rate
-    
-    del data # save memory space
-    
+    if sampler is None:
+        sampler = NegativeSampler(config)
+
     while True:
 
-        idx, pos_triples = raw_queue.get()
+        idx, pos_triples = get_raw(raw_queue, stats)
 
-        ph = pos_triples[:, 0]
-        pr = pos_triples[:, 1]
-        pt = pos_triples[:, 2]
-        
-        nh = []
-        nr = []
-        nt = []
-
-        for t in pos_triples:
-            
-            prob = relation_property[t[1]] if config.sampling == "bern" else 0.5
-            
-            for i in range(neg_rate):
-                
-                if np.random.random() > prob:
-                    idx_replace_tail = np.random.randint(config.kg_meta.tot_entity)
-
-                    while (t[0], t[1], idx_replace_tail) in positive_triplets:
-                        idx_replace_tail = np.random.randint(config.kg_meta.tot_entity)
-
-                    nh.append(t[0])
-                    nr.append(t[1])
-                    nt.append(idx_replace_tail)
-
-                else:
-                    idx_replace_head = np.random.randint(config.kg_meta.tot_entity)
-                    
-                    while ((idx_replace_head, t[1], t[2]) in positive_triplets):
-                        idx_replace_head = np.random.randint(config.kg_meta.tot_entity)
-                    
-                    nh.append(idx_replace_head)
-                    nr.append(t[1])
-                    nt.append(t[2])
-
-        processed_queue.put([ph, pr, pt, nh, nr, nt])
-
-def process_function_pointwise(raw_queue, processed_queue, config):
+        neg_triples = sampler.corrupt(pos_triples, config.neg_rate, stats, make_rng(config, BATCH_STREAM, idx))
+
+        put_processed(processed_queue, idx, [pos_triples[:, 0], pos_triples[:, 1], pos_triples[:, 2],
+                                        neg_triples[:, 0], neg_triples[:, 1], neg_triples[:, 2]], shared_buffer, stats)
+
+def process_function_pointwise(raw_queue, processed_queue, config, shared_buffer=None, sampler=None, stats=None):
     """Function that puts the processed data in the queue.
            
         Args:
             raw_queue (Queue) : Multiprocessing Queue to put the raw data to be processed.
             processed_queue (Queue) : Multiprocessing Queue to put the processed data.
-            te (int): Total number of entities
-            bs (int): Total size of each batch.
-            positive_triplets (list) : List of positive triples.
-            lh (int): Id of the last processed head.
-            lr (int): Id of the last processed relation.
-            lt (int): Id of the last processed tail.
+            config (object): Model configuration object.
+            shared_buffer (SharedBatchBuffer): Shared-memory buffer to write the processed data to, if any.
+            sampler (NegativeSampler): Sampler used to corrupt the triples, created if not given.
+            stats (WorkerStats): Statistics of the worker, if any.
     """ 
-    data = config.knowledge_graph.read_cache_data('triplets_train')
-    relation_property = config.knowledge_graph.read_cache_data('relationproperty')
-    positive_triplets = {(t.h, t.r, t.t): 1 for t in data}
-    neg_rate = config.neg_rate
-    
-    del data # save memory space
-    
+    if sampler is None:
+        sampler = NegativeSampler(config)
+
     while True:
 
-        idx, pos_triples = raw_queue.get()
-
-        point_h = []
-        point_r = []
-        point_t = []
-        point_y = []
-
-        for t in pos_triples:
-            # postive sample
-            point_h.append(t[0])
-            point_r.append(t[1])
-            point_t.append(t[2])
-            point_y.append(1)
-
-            prob = relation_property[t[1]] if config.sampling == "bern" else 0.5
-            
-            for i in range(neg_rate):
-                
-                if np.random.random() > prob:
-                    idx_replace_tail = np.random.randint(config.kg_meta.tot_entity)
-
-                    while (t[0], t[1], idx_replace_tail) in positive_triplets:
-                        idx_replace_tail = np.random.randint(config.kg_meta.tot_entity)
-
-                    point_h.append(t[0])
-                    point_r.append(t[1])
-                    point_t.append(idx_replace_tail)
-                    point_y.append(-1)
-
-                else:
-                    idx_replace_head = np.random.randint(config.kg_meta.tot_entity)
-                    
-                    while ((idx_replace_head, t[1], t[2]) in positive_triplets):
-                        idx_replace_head = np.random.randint(config.kg_meta.tot_entity)
-                    
-                    point_h.append(idx_replace_head)
-                    point_r.append(t[1])
-                    point_t.append(t[2])
-                    point_y.append(-1)
-
-        processed_queue.put([point_h, point_r, point_t, point_y])
-
-
-def process_function_multiclass(raw_queue, processed_queue, config):
+        idx, pos_triples = get_raw(raw_queue, stats)
+
+        neg_triples = sampler.corrupt(pos_triples, config.neg_rate, stats, make_rng(config, BATCH_STREAM, idx))
+
+        point = np.concatenate([pos_triples, neg_triples])
+        point_y = np.concatenate([np.ones(len(pos_triples), dtype=np.float32),
+                                  -np.ones(len(neg_triples), dtype=np.float32)])
+
+        put_processed(processed_queue, idx, [point[:, 0], point[:, 1], point[:, 2], point_y], shared_buffer, stats)
+
+
+def process_function_shared_negatives(raw_queue, processed_queue, config, shared_buffer=None, stats=None):
+    """Function that puts the positive triples and a pool of negative entities shared by the batch in the queue.
+
+        Instead of materialising neg_rate corrupted triples per positive one, the whole batch
+        shares config.num_shared_negatives uniformly drawn entities which the model uses to
+        corrupt the head and the tail of every positive triple (chunked negative sampling).
+        The pool is not filtered against the training triples, a few false negatives are
+        accepted in exchange for a much cheaper sampling.
+
+        Args:
+            raw_queue (Queue) : Multiprocessing Queue to put the raw data to be processed.
+            processed_queue (Queue) : Multiprocessing Queue to put the processed data.
+            config (object): Model configuration object.
+            shared_buffer (SharedBatchBuffer): Shared-memory buffer to write the processed data to, if any.
+            stats (WorkerStats): Statistics of the worker, if any.
+    """
+    while True:
+
+        idx, pos_triples = get_raw(raw_queue, stats)
+
+        neg_pool = make_rng(config, BATCH_STREAM, idx).integers(config.kg_meta.tot_entity, size=config.num_shared_negatives)
+
+        put_processed(processed_queue, idx, [pos_triples[:, 0], pos_triples[:, 1], pos_triples[:, 2], neg_pool], shared_buffer, stats)
+
+
+def process_function_multiclass(raw_queue, processed_queue, config, stats=None):
     """Function that puts the processed data in the queue.
            
         Args:
@@ -176,18 +784,18 @@ def process_function_multiclass(raw_queue, processed_queue, config):
             te (int): Total number of entities
             bs (int): Total size of each batch.
             neg_rate (int): Ratio of negative to positive samples.
+            stats (WorkerStats): Statistics of the worker, if any.
     """
     hr_t_train = config.knowledge_graph.read_cache_data('hr_t_train')
     tr_h_train = config.knowledge_graph.read_cache_data('tr_h_train')
     
     neg_rate = config.neg_rate
     
-    shape = [config.batch_size, config.kg_meta.tot_entity] 
-    shape = tf.convert_to_tensor(shape, dtype=tf.int64)
-
     while True:
-        idx, raw_data = raw_queue.get()
-        
+        batch_idx, raw_data = get_raw(raw_queue, stats)
+
+        shape = tf.convert_to_tensor([len(raw_data), config.kg_meta.tot_entity], dtype=tf.int64)
+
         h = raw_data[:, 0]
         r = raw_data[:, 1]
         t = raw_data[:, 2]
@@ -197,9 +805,9 @@ def process_function_multiclass(raw_queue, processed_queue, config):
         neg_indices_hr_t = []
         neg_indices_tr_h = []
 
-        random_ids = np.random.permutation(config.kg_meta.tot_entity)
+        random_ids = make_rng(config, BATCH_STREAM, batch_idx).permutation(config.kg_meta.tot_entity)
 
-        for i in range(config.batch_size):
+        for i in range(len(raw_data)):
             hr_t = hr_t_train[(h[i], r[i])]
             tr_h = tr_h_train[(t[i], r[i])]
 
@@ -234,7 +842,7 @@ def process_function_multiclass(raw_queue, processed_queue, config):
             hr_t = tf.sparse.add(hr_t, neg_hr_t)
             tr_h = tf.sparse.add(tr_h, neg_tr_h)
 
-        processed_queue.put([h, r, t, hr_t, tr_h])
+        put_processed(processed_queue, batch_idx, [h, r, t, hr_t, tr_h], stats=stats)
 
 # def get_label_mat(data, bs, te, neg_rate=1):
 #     """Function to label the matrix.
@@ -266,6 +874,47 @@ def process_function_multiclass(raw_queue, processed_queue, config):
 #     return mat
 
 
+class GeneratorStopped(Exception):
+    """Exception raised in the worker threads once the generator has been stopped."""
+    pass
+
+
+class ThreadQueue(queue.Queue):
+    """Queue for the thread backend whose blocking calls give up once the generator is stopped.
+
+        Args:
+            maxsize (int): Maximum number of items in the queue.
+            stop_event (threading.Event): Event set when the generator is stopped.
+    """
+    def __init__(self, maxsize, stop_event):
+        queue.Queue.__init__(self, maxsize)
+        self.stop_event = stop_event
+
+    def get(self):
+        while not self.stop_event.is_set():
+            try:
+                return queue.Queue.get(self, timeout=0.1)
+            except queue.Empty:
+                pass
+        raise GeneratorStopped()
+
+    def put(self, item):
+        while not self.stop_event.is_set():
+            try:
+                return queue.Queue.put(self, item, timeout=0.1)
+            except queue.Full:
+                pass
+        raise GeneratorStopped()
+
+
+def run_until_stopped(target, *args):
+    """Function to run a worker function in a thread until the generator is stopped."""
+    try:
+        target(*args)
+    except GeneratorStopped:
+        pass
+
+
 class Generator:
     """Generator class for the embedding algorithms
         
@@ -273,6 +922,37 @@ class Generator:
           config (object): generator configuration object.
           model_config (object): Model configuration object.
 
+        Attributes:
+          backend (str): Either 'process' (default) or 'thread', set by config.generator_backend.
+            The thread backend starts instantly and shares the training triples and the
+            negative sampler of the main process instead of copying them into every worker.
+          num_batch (int): Number of batches that make up one pass (epoch) over the training triples,
+            at most max_batches.
+          epoch (int): Epoch of the last batch handed out, -1 before the first one.
+          shared_buffer (SharedBatchBuffer): Shared-memory ring buffer used to pass the processed batches
+            if config.shared_memory is set (process backend, all but the projection-based strategy).
+          stats (GeneratorStats): Throughput and back-pressure statistics of the workers and the queues.
+
+        With start_epoch, the feeder starts from that epoch as if the previous ones had been fed,
+        to resume a training run.
+
+        With config.random_seed set, the feeder shuffles with its own seeded stream and every batch
+        is processed with a stream derived from its batch_idx, so that its content does not depend
+        on the worker that processed it. If config.reorder_batches is set as well, the batches are
+        handed out in batch_idx order and identical configs yield identical batch streams.
+
+        With shard=(shard_idx, num_shards), the generator only feeds the triples
+        data[shard_idx::num_shards], cut to the same length for all the shards so that the
+        data-parallel workers run the same number of steps. The negatives are still checked
+        against the whole training set.
+
+        With data, the generator feeds these [n, 3] triples instead of all the training triples
+        (e.g. the neighbourhood touched by an update of the graph), sharded as above if sharded.
+
+        With max_batches, the feeder only feeds that many batches per epoch (e.g. to debug), so
+        that the epochs of the generator stay those the trainer counts. The batches handed out
+        are counted per epoch, batches_left tells how many of an epoch are still to come.
+
         Yields:
             matrix : Batch size of processed triples
 
@@ -283,16 +963,59 @@ class Generator:
             >>> gen_train = Generator(model.config, training_strategy="pairwise_based")
     """
 
-    def __init__(self, config, training_strategy=None):
+    def __init__(self, config, training_strategy=None, shard=None, start_epoch=0, data=None, max_batches=None):
         self.config = config
+        self.start_epoch = start_epoch
+        self.max_batches = max_batches
         self.process_list = []
         
         self.raw_queue_size = 10
         self.processed_queue_size = 10
-        self.raw_queue = Queue(self.raw_queue_size)
-        self.processed_queue = Queue(self.processed_queue_size)
-        
+
+        self.backend = config.generator_backend
+        if self.backend == "process":
+            self.raw_queue = Queue(self.raw_queue_size)
+            self.processed_queue = Queue(self.processed_queue_size)
+            self.train_data = None
+            # alias tables and caches are built once here and inherited by the worker processes.
+            self.sampler = NegativeSampler(config) if config.sampling in ("degree", "typed", "cache") else None
+        elif self.backend == "thread":
+            self.stop_event = threading.Event()
+            self.raw_queue = ThreadQueue(self.raw_queue_size, self.stop_event)
+            self.processed_queue = ThreadQueue(self.processed_queue_size, self.stop_event)
+            # shared by all the worker threads.
+            self.train_data = read_training_triples(config)
+            self.sampler = NegativeSampler(config, self.train_data)
+        else:
+            raise NotImplementedError("No support for %s generator backend" % self.backend)
+
         self.training_strategy = training_strategy
+        num_triples = config.kg_meta.tot_train_triples
+        if data is not None:
+            self.train_data = data
+            num_triples = len(data)
+        if shard is not None:
+            shard_idx, num_shards = shard
+            data = read_training_triples(config) if self.train_data is None else self.train_data
+            num_triples = len(data) // num_shards
+            self.train_data = data[shard_idx::num_shards][:num_triples]
+        self.num_batch = number_of_batches(num_triples, config.batch_size, config.partial_batch)
+        if max_batches is not None:
+            self.num_batch = min(self.num_batch, max_batches)
+
+        worker_names = ["feeder"] + ["processor-%d" % i for i in range(config.num_process_gen)]
+        self.stats = GeneratorStats(worker_names)
+
+        self.shared_buffer = None
+        self.last_slot = None
+        # batches received ahead of their turn when reordering.
+        self.pending = {}
+        self.next_batch_idx = start_epoch * self.num_batch
+        # number of batches handed out per epoch, the epoch of a batch following from its batch_idx.
+        self.epoch = -1
+        self.handed_out = collections.Counter()
+        if config.shared_memory and self.backend == "process" and training_strategy != "projection_based":
+            self.create_shared_buffer()
 
         self.create_feeder_process()
         self.create_train_processor_process()
@@ -301,31 +1024,117 @@ class Generator:
         return self
 
     def __next__(self):
-        return self.processed_queue.get()
-        
+        # the batch handed out by the previous call has been consumed by now,
+        # the tensors returned are only valid until the next call.
+        if self.last_slot is not None:
+            self.shared_buffer.release(self.last_slot)
+            self.last_slot = None
+
+        start = time.perf_counter()
+        batch = self.next_processed()
+        self.stats.record_next(time.perf_counter() - start, self.raw_queue, self.processed_queue)
+
+        # batches copied out of the ring buffer come as lists like without it.
+        if self.shared_buffer is None or isinstance(batch, list):
+            return batch
+
+        self.last_slot, lengths = batch
+        return self.shared_buffer.read(self.last_slot, lengths)
+
+    def batches_left(self, epoch_idx):
+        """Function to get the number of batches of an epoch which are yet to be handed out.
+
+            Without config.reorder_batches, the workers may hand out the first batches of the
+            next epoch before the last ones of the current epoch, these count in their epoch.
+        """
+        return self.num_batch - self.handed_out[epoch_idx]
+
+    def hand_out(self, batch_idx, batch):
+        """Function to count a batch in its epoch before handing it out."""
+        self.epoch = batch_idx // self.num_batch
+        self.handed_out[self.epoch] += 1
+        return batch
+
+    def next_processed(self):
+        """Function to get the next processed batch, in batch_idx order if config.reorder_batches is set."""
+        if not self.config.reorder_batches:
+            return self.hand_out(*self.processed_queue.get())
+
+        while self.next_batch_idx not in self.pending:
+            batch_idx, batch = self.processed_queue.get()
+            if self.shared_buffer is not None and batch_idx != self.next_batch_idx:
+                # batches waiting for their turn must not hold a slot, or the workers may run out of them.
+                slot_idx, lengths = batch
+                batch = [field[:length].copy() for field, length in zip(self.shared_buffer.slot(slot_idx), lengths)]
+                self.shared_buffer.release(slot_idx)
+            self.pending[batch_idx] = batch
+
+        batch = self.pending.pop(self.next_batch_idx)
+        self.next_batch_idx += 1
+        return self.hand_out(self.next_batch_idx - 1, batch)
+
+    def create_shared_buffer(self):
+        """Function to create the shared-memory ring buffer for the processed batches."""
+        # enough slots to fill the processed queue while every worker and the trainer hold one.
+        num_slots = self.processed_queue_size + self.config.num_process_gen + 1
+        batch_size = self.config.batch_size
+        neg_size = self.config.batch_size * self.config.neg_rate
+
+        if self.training_strategy == "pairwise_based":
+            field_sizes = [batch_size] * 3 + [neg_size] * 3
+            dtypes = [np.int32] * 6
+        elif self.training_strategy == "shared_negative_based":
+            field_sizes = [batch_size] * 3 + [self.config.num_shared_negatives]
+            dtypes = [np.int32] * 4
+        else:
+            field_sizes = [batch_size + neg_size] * 4
+            dtypes = [np.int32] * 3 + [np.float32]
+
+        self.shared_buffer = SharedBatchBuffer(num_slots, field_sizes, dtypes)
+
     def stop(self):
         """Function to stop all the worker process."""
-        for worker_process in self.process_list:
-            worker_process.terminate()
+        if self.backend == "thread":
+            self.stop_event.set()
+            for worker_thread in self.process_list:
+                worker_thread.join()
+        else:
+            for worker_process in self.process_list:
+                worker_process.terminate()
+            # the workers forked after tf.distribute set up its preemption handler ignore SIGTERM.
+            for worker_process in self.process_list:
+                worker_process.join(timeout=1)
+                if worker_process.is_alive():
+                    worker_process.kill()
+
+    def create_worker(self, target, args):
+        """Function to start a worker process or thread, depending on the backend.
+
+            The statistics of the worker are appended to the arguments of the target.
+        """
+        args = args + (self.stats.worker(len(self.process_list)),)
+        if self.backend == "thread":
+            worker = threading.Thread(target=run_until_stopped, args=(target,) + args)
+        else:
+            worker = Process(target=target, args=args)
+        worker.daemon = True
+        self.process_list.append(worker)
+        worker.start()
 
     def create_feeder_process(self):
         """Function create the feeder process."""
-        feeder_worker = Process(target=raw_data_generator, args=(self.raw_queue, self.processed_queue, self.config))
-        feeder_worker.daemon = True
-        self.process_list.append(feeder_worker)
-        feeder_worker.start()
+        self.create_worker(raw_data_generator, (self.raw_queue, self.processed_queue, self.config, self.train_data, self.start_epoch, self.max_batches))
 
     def create_train_processor_process(self):
         """Function ro create the process for generating training samples."""
         for i in range(self.config.num_process_gen):
             if self.training_strategy == "projection_based":
-                process_worker = Process(target=process_function_multiclass, args=(self.raw_queue, self.processed_queue, self.config))
+                self.create_worker(process_function_multiclass, (self.raw_queue, self.processed_queue, self.config))
             elif self.training_strategy == "pairwise_based":
-                process_worker = Process(target=process_function_pairwise, args=(self.raw_queue, self.processed_queue, self.config))
+                self.create_worker(process_function_pairwise, (self.raw_queue, self.processed_queue, self.config, self.shared_buffer, self.sampler))
             elif self.training_strategy == "pointwise_based":
-                process_worker = Process(target=process_function_pointwise, args=(self.raw_queue, self.processed_queue, self.config))
+                self.create_worker(process_function_pointwise, (self.raw_queue, self.processed_queue, self.config, self.shared_buffer, self.sampler))
+            elif self.training_strategy == "shared_negative_based":
+                self.create_worker(process_function_shared_negatives, (self.raw_queue, self.processed_queue, self.config, self.shared_buffer))
             else:
-                raise NotImplementedError("This strategy is not supported.")
-            self.process_list.append(process_worker)
-            process_worker.daemon = True
-            process_worker.start()
\ No newline at end of file
+                raise NotImplementedError("This strategy is not supported.")
\ No newline at end of file
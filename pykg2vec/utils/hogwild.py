@@ -0,0 +1,339 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+This module is for the Hogwild training on CPU.
+
+The parameters of the model live in shared memory and several worker processes train on
+their own shard of the training triples, each one with its own negative sampler. The
+workers apply sparse SGD or row-wise Adagrad updates to the shared tables without any lock
+(Hogwild, Niu et al., 2011): a step only touches the rows of its batch, so the collisions
+between workers are rare and do not hurt the convergence. The trainer process coordinates
+the epochs and copies the shared parameters back to its model for the evaluation and the
+checkpoints.
+"""
+import ctypes
+import multiprocessing
+import traceback
+import numpy as np
+import tensorflow as tf
+
+from multiprocessing.sharedctypes import RawArray
+from pykg2vec.utils.generator import NegativeSampler, make_rng, number_of_batches, read_training_triples, HOGWILD_STREAM
+from pykg2vec.utils.optimizer import deduplicate, scaled_learning_rate
+
+
+class SharedParameters:
+    """Class holding the parameters of a model (and their Adagrad accumulators) in shared memory.
+
+        The tables are RawArrays, handed to the spawned worker processes at start-up and
+        wrapped again as numpy arrays on their side.
+
+        Args:
+            variables (list): Variables of the model, the tables are initialized with their values.
+            accumulators (bool): If True, a row-wise Adagrad accumulator is allocated per table.
+            initial_accumulator_value (float): Starting value of the accumulators.
+    """
+    def __init__(self, variables, accumulators=False, initial_accumulator_value=0.1):
+        self.buffers = []
+        for variable in variables:
+            shape, dtype = tuple(variable.shape), variable.dtype.as_numpy_dtype
+            self.buffers.append((self.allocate(shape, dtype), self.allocate(shape[:1], dtype) if accumulators else None))
+        self.wrap()
+
+        for variable, table, accumulator in zip(variables, self.tables, self.accumulators):
+            table[...] = variable.numpy()
+            if accumulator is not None:
+                accumulator[...] = initial_accumulator_value
+
+    def allocate(self, shape, dtype):
+        """Function to allocate a shared buffer, returned as (raw array, shape, dtype)."""
+        dtype = np.dtype(dtype)
+        return RawArray(ctypes.c_char, max(int(np.prod(shape)) * dtype.itemsize, 1)), tuple(shape), dtype.str
+
+    def wrap(self):
+        """Function to wrap the shared buffers as numpy arrays."""
+        def view(buffer):
+            if buffer is None:
+                return None
+            raw, shape, dtype = buffer
+            return np.frombuffer(raw, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+        self.tables = [view(table) for table, _ in self.buffers]
+        self.accumulators = [view(accumulator) for _, accumulator in self.buffers]
+
+    def __getstate__(self):
+        return {"buffers": self.buffers}
+
+    def __setstate__(self, state):
+        self.buffers = state["buffers"]
+        self.wrap()
+
+    def copy_to(self, variables):
+        """Function to assign the shared tables to the variables of a model."""
+        for variable, table in zip(variables, self.tables):
+            variable.assign(table)
+
+
+class HogwildWorker:
+    """Class computing the gradients of a local model and applying them to the shared parameters.
+
+        Before every step, the rows of the batch are read from the shared tables into the
+        variables of the local model, the gradients are computed on them and applied to the
+        rows of the shared tables in place. Neither the reads nor the updates are locked.
+
+        A table whose first dimension is the number of entities (relations) is read at the
+        entities (relations) of the batch, any other table is read whole. The gradients are
+        checked by a first step on the first triple: a model with a dense gradient (e.g.
+        DistMult, which normalizes the whole entity table) would copy and overwrite its
+        full tables every step and is not supported.
+
+        Args:
+            model (object): Local model, with its parameters defined.
+            parameters (SharedParameters): Shared parameters of the model.
+            training_strategy (str): Either 'pairwise_based' or 'pointwise_based'.
+    """
+    def __init__(self, model, parameters, training_strategy):
+        self.model = model
+        self.config = model.config
+        self.parameters = parameters
+        self.training_strategy = training_strategy
+        self.variables = model.trainable_variables
+        self.learning_rate = scaled_learning_rate(self.config)
+        self.epsilon = 1e-7
+
+        self.parameters.copy_to(self.variables)
+        probe = np.zeros((1, 3), dtype=np.int32)
+        _, gradients = self.compute_gradients(probe, probe)
+        self.used = [gradient is not None for gradient in gradients]
+
+        dense = [variable.name for variable, gradient in zip(self.variables, gradients)
+                 if gradient is not None and not isinstance(gradient, tuple)]
+        if dense:
+            raise NotImplementedError("Hogwild training needs sparse (row) gradients, %s has dense gradients for %s."
+                                      % (self.model.model_name, ", ".join(dense)))
+
+    @tf.function
+    def gradients_pairwise(self, pos_h, pos_r, pos_t, neg_h, neg_r, neg_t):
+        with tf.GradientTape() as tape:
+            loss = self.model.get_loss(pos_h, pos_r, pos_t, neg_h, neg_r, neg_t)
+        return loss, self.flatten(tape.gradient(loss, self.variables))
+
+    @tf.function
+    def gradients_pointwise(self, h, r, t, y):
+        with tf.GradientTape() as tape:
+            loss = self.model.get_loss(h, r, t, y)
+        return loss, self.flatten(tape.gradient(loss, self.variables))
+
+    def flatten(self, gradients):
+        """Function to turn the sparse gradients into (unique rows, summed values) pairs."""
+        return [deduplicate(gradient) if isinstance(gradient, tf.IndexedSlices) else gradient for gradient in gradients]
+
+    def compute_gradients(self, pos_triples, neg_triples):
+        """Function to compute the loss and the gradients of the local model on a batch."""
+        if self.training_strategy == "pointwise_based":
+            triples = np.concatenate([pos_triples, neg_triples])
+            y = np.concatenate([np.ones(len(pos_triples), dtype=np.float32), -np.ones(len(neg_triples), dtype=np.float32)])
+            return self.gradients_pointwise(triples[:, 0], triples[:, 1], triples[:, 2], y)
+        return self.gradients_pairwise(pos_triples[:, 0], pos_triples[:, 1], pos_triples[:, 2],
+                                       neg_triples[:, 0], neg_triples[:, 1], neg_triples[:, 2])
+
+    def rows(self, table, entities, relations):
+        """Function to get the rows of a table used by the batch, None for the whole table."""
+        rows = []
+        if table.shape[0] == self.config.kg_meta.tot_entity:
+            rows.append(entities)
+        if table.shape[0] == self.config.kg_meta.tot_relation:
+            rows.append(relations)
+        if not rows:
+            return None
+        return np.unique(np.concatenate(rows))
+
+    def read(self, pos_triples, neg_triples):
+        """Function to read the rows of the batch from the shared tables into the local model."""
+        triples = np.concatenate([pos_triples, neg_triples])
+        entities = np.unique(np.concatenate([triples[:, 0], triples[:, 2]]))
+        relations = np.unique(triples[:, 1])
+
+        for variable, table, used in zip(self.variables, self.parameters.tables, self.used):
+            if not used:
+                continue
+            rows = self.rows(table, entities, relations)
+            if rows is None:
+                variable.assign(table)
+            else:
+                variable.scatter_update(tf.IndexedSlices(table[rows], rows))
+
+    def apply(self, gradients):
+        """Function to apply the gradients to the shared tables, with SGD or row-wise Adagrad."""
+        for gradient, table, accumulator in zip(gradients, self.parameters.tables, self.parameters.accumulators):
+            if gradient is None:
+                continue
+            rows, values = gradient[0].numpy(), gradient[1].numpy()
+
+            if accumulator is not None:
+                axes = tuple(range(1, values.ndim))
+                accumulator[rows] += np.mean(np.square(values), axis=axes)
+                scale = self.learning_rate / (np.sqrt(accumulator[rows]) + self.epsilon)
+                values = values * scale.reshape(np.shape(scale) + (1,) * len(axes))
+            else:
+                values = values * self.learning_rate
+            table[rows] -= values
+
+    def train_step(self, pos_triples, neg_triples):
+        """Function to train on a batch, returns its loss."""
+        self.read(pos_triples, neg_triples)
+        loss, gradients = self.compute_gradients(pos_triples, neg_triples)
+        self.apply(gradients)
+        return float(loss)
+
+
+def hogwild_worker(worker_idx, num_workers, model_class, config, training_strategy, parameters, data, task_queue, result_queue):
+    """Function that trains a local model on a shard of the triples for every epoch put in the task queue.
+
+        Args:
+            worker_idx (int): Index of the worker, the worker trains on data[worker_idx::num_workers].
+            num_workers (int): Total number of workers.
+            model_class (class): Class of the model.
+            config (object): Model configuration object.
+            training_strategy (str): Either 'pairwise_based' or 'pointwise_based'.
+            parameters (SharedParameters): Shared parameters of the model.
+            data (tuple): Shared (raw array, number of triples) of the training triples.
+            task_queue (Queue): Queue of the (epoch, number of batches) to train, None to stop.
+            result_queue (Queue): Queue to put the (worker_idx, loss, error) of every epoch.
+    """
+    # the workers share the cores, every one of them runs its ops on a single thread.
+    tf.config.threading.set_intra_op_parallelism_threads(1)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    try:
+        raw, num_triples = data
+        data = np.frombuffer(raw, dtype=np.int32, count=num_triples * 3).reshape((num_triples, 3))
+        shard = np.array(data[worker_idx::num_workers])
+
+        model = model_class(config)
+        model.def_parameters()
+        worker = HogwildWorker(model, parameters, training_strategy)
+        sampler = NegativeSampler(config, data)
+    except Exception:
+        result_queue.put((worker_idx, None, traceback.format_exc()))
+        return
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        epoch_idx, num_batch = task
+        try:
+            rng = make_rng(config, HOGWILD_STREAM, worker_idx, epoch_idx)
+            order = rng.permutation(len(shard))
+            if num_batch is None:
+                num_batch = number_of_batches(len(shard), config.batch_size, config.partial_batch)
+
+            loss = 0.0
+            for batch_idx in range(num_batch):
+                pos_triples = shard[order[config.batch_size * batch_idx:config.batch_size * (batch_idx + 1)]]
+                if len(pos_triples) == 0:
+                    break
+                neg_triples = sampler.corrupt(pos_triples, config.neg_rate, rng=rng)
+                loss += worker.train_step(pos_triples, neg_triples)
+
+            result_queue.put((worker_idx, loss, None))
+        except Exception:
+            result_queue.put((worker_idx, None, traceback.format_exc()))
+
+
+class HogwildTrainer:
+    """Class coordinating the Hogwild worker processes of a model.
+
+        The workers are spawned (rather than forked, which TensorFlow does not support once
+        initialized) with the shared parameters and the shared training triples. Every epoch
+        is handed to all of them, and once they are all done the shared parameters are copied
+        to the model of the trainer, which is then evaluated and saved as usual.
+
+        Only sparse updates without per-entry state are supported: 'sgd' and 'sparse_sgd' (with
+        -mom 0) use SGD, 'adagrad' and 'rowwise_adagrad' use the row-wise Adagrad. The model must
+        have sparse gradients only, which is checked before the workers are started.
+
+        Args:
+            model (object): Model of the trainer, with its parameters defined.
+            training_strategy (str): Either 'pairwise_based' or 'pointwise_based'.
+
+        Examples:
+            >>> hogwild = HogwildTrainer(model, "pairwise_based")
+            >>> loss = hogwild.train_epoch(0)
+            >>> hogwild.stop()
+    """
+    def __init__(self, model, training_strategy):
+        self.model = model
+        self.config = model.config
+        self.num_workers = self.config.hogwild_workers
+
+        if training_strategy not in ("pairwise_based", "pointwise_based"):
+            raise NotImplementedError("Hogwild training is not supported for the %s strategy." % training_strategy)
+        if self.config.optimizer in ("sgd", "sparse_sgd"):
+            adagrad = False
+        elif self.config.optimizer in ("adagrad", "rowwise_adagrad"):
+            adagrad = True
+        else:
+            raise NotImplementedError("Hogwild training supports the sgd and adagrad optimizers, not %s." % self.config.optimizer)
+        if self.config.optimizer == "sparse_sgd" and self.config.momentum > 0:
+            raise NotImplementedError("Hogwild training has no momentum, train sparse_sgd with -mom 0.")
+        if self.config.sampling == "cache":
+            raise NotImplementedError("Hogwild training does not support the cache sampling.")
+
+        self.parameters = SharedParameters(model.trainable_variables, accumulators=adagrad)
+        # raises for the models with dense gradients.
+        HogwildWorker(model, self.parameters, training_strategy)
+
+        data = read_training_triples(self.config)
+        raw = RawArray(ctypes.c_int32, max(data.size, 1))
+        np.frombuffer(raw, dtype=np.int32, count=data.size)[:] = data.ravel()
+
+        context = multiprocessing.get_context("spawn")
+        self.result_queue = context.Queue()
+        self.task_queues = []
+        self.process_list = []
+        for worker_idx in range(self.num_workers):
+            task_queue = context.Queue()
+            worker = context.Process(target=hogwild_worker,
+                                     args=(worker_idx, self.num_workers, type(model), self.config, training_strategy,
+                                           self.parameters, (raw, len(data)), task_queue, self.result_queue))
+            worker.daemon = True
+            worker.start()
+            self.task_queues.append(task_queue)
+            self.process_list.append(worker)
+
+    def train_epoch(self, epoch_idx, num_batch=None):
+        """Function to train all the workers for one epoch.
+
+            Args:
+                epoch_idx (int): Index of the epoch.
+                num_batch (int): Number of batches per worker, one pass over its shard if None.
+
+            Returns:
+                float: Sum of the losses of the batches of all the workers.
+        """
+        for task_queue in self.task_queues:
+            task_queue.put((epoch_idx, num_batch))
+
+        loss = 0.0
+        for _ in range(self.num_workers):
+            worker_idx, worker_loss, error = self.result_queue.get()
+            if error is not None:
+                self.stop()
+                raise RuntimeError("Hogwild worker %d failed:\n%s" % (worker_idx, error))
+            loss += worker_loss
+
+        self.parameters.copy_to(self.model.trainable_variables)
+        return loss
+
+    def stop(self):
+        """Function to stop the worker processes."""
+        for task_queue in self.task_queues:
+            task_queue.put(None)
+        for worker in self.process_list:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+        self.process_list = []
+        self.task_queues = []
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+This module is for the pre-flight estimate of the memory a training run needs.
+
+The estimate has three parts:
+
+    parameters:  the variables of the model, e.g. the embedding tables, TransR.rel_matrix
+                 (R x k x d) or the tensors of NTN, counted from the defined model.
+    optimizer:   the slots of the optimizer, e.g. two moments per parameter for Adam, one
+                 accumulator per row for the row-wise Adagrad.
+    activations: the tensors of one training step (loss and gradients) for a batch size,
+                 e.g. the 1-N [B, E] scores of ConvE. The step is traced for that batch
+                 size and the outputs of its ops are summed, as if none were freed
+                 before the end of the step: an upper bound of its peak.
+
+The activations grow linearly with the batch size, which gives the largest batch size
+fitting a memory budget. With gradient accumulation (config.accumulation_steps), only the
+activations of one micro-batch are alive at a time and the batch fitting the budget is
+that many times larger.
+"""
+import numpy as np
+import tensorflow as tf
+
+
+# the number of slots per parameter of the optimizers, the row-wise Adagrad has one per row.
+OPTIMIZER_SLOTS = {"sgd": 0, "rms": 1, "adam": 2, "adagrad": 1, "adadelta": 2, "lazy_adam": 2, "rowwise_adagrad": 0, "sparse_sgd": 1}
+
+# the ops whose outputs alias their input or hold no batch data.
+ALIASING_OPS = {"ReadVariableOp", "VarHandleOp", "Const", "Identity", "IdentityN", "Reshape", "Placeholder", "NoOp",
+                "Squeeze", "ExpandDims", "StopGradient", "Shape", "ShapeN", "Size", "Rank"}
+
+MB = 1024 * 1024
+
+
+def variable_bytes(variable):
+    """Function to get the bytes of a variable or a tensor of known shape."""
+    return int(np.prod(variable.shape.as_list())) * variable.dtype.size
+
+
+class MemoryEstimator:
+    """Class estimating the parameter, optimizer and activation memory of a training run.
+
+        Args:
+            model (object): Model of the trainer, its parameters defined.
+            training_strategy (str): The training strategy of the trainer, which gives the batch fields.
+
+        Examples:
+            >>> estimator = MemoryEstimator(model, "pairwise_based")
+            >>> estimate = estimator.estimate(config.batch_size)
+            >>> batch_size = estimator.largest_batch_size(2048 * MB)
+    """
+    def __init__(self, model, training_strategy):
+        self.model = model
+        self.config = model.config
+        self.training_strategy = training_strategy
+        self.activations = {}
+
+    def batch_signature(self, batch_size):
+        """Function to get the input signature of the training step for a batch size."""
+        tot_entity = self.config.kg_meta.tot_entity
+        if self.training_strategy == "projection_based":
+            return [tf.TensorSpec([batch_size], tf.int32)] * 3 + [tf.SparseTensorSpec([batch_size, tot_entity], tf.int32)] * 2
+        if self.training_strategy == "pointwise_based":
+            num_points = batch_size * (1 + self.config.neg_rate)
+            return [tf.TensorSpec([num_points], tf.int32)] * 3 + [tf.TensorSpec([num_points], tf.float32)]
+        if self.training_strategy == "shared_negative_based":
+            return [tf.TensorSpec([batch_size], tf.int32)] * 3 + [tf.TensorSpec([self.config.num_shared_negatives], tf.int32)]
+        return [tf.TensorSpec([batch_size], tf.int32)] * 3 + [tf.TensorSpec([batch_size * self.config.neg_rate], tf.int32)] * 3
+
+    def activation_bytes(self, batch_size):
+        """Function to get the bytes of the tensors of one training step (loss and gradients) for a batch size."""
+        if batch_size in self.activations:
+            return self.activations[batch_size]
+
+        shared_negatives = self.training_strategy == "shared_negative_based"
+
+        def loss_gradients(*batch):
+            with tf.GradientTape() as tape:
+                loss = self.model.get_loss_shared_negatives(*batch) if shared_negatives else self.model.get_loss(*batch)
+            return tape.gradient(loss, self.model.trainable_variables)
+
+        # some models (ConvE) reshape with the configured batch size.
+        configured_batch_size = self.config.batch_size
+        self.config.batch_size = batch_size
+        try:
+            graph = tf.function(loss_gradients).get_concrete_function(*self.batch_signature(batch_size)).graph
+        finally:
+            self.config.batch_size = configured_batch_size
+
+        total = 0
+        for operation in graph.get_operations():
+            if operation.type in ALIASING_OPS:
+                continue
+            for output in operation.outputs:
+                # the tensors of dynamic shape (unique rows) are bounded by the batch and left out.
+                if output.dtype not in (tf.resource, tf.variant) and output.shape.is_fully_defined():
+                    total += variable_bytes(output)
+
+        self.activations[batch_size] = total
+        return total
+
+    def parameter_bytes(self):
+        """Function to get the bytes of the variables of the model."""
+        return sum(variable_bytes(variable) for variable in self.model.variables)
+
+    def optimizer_bytes(self):
+        """Function to get the bytes of the slots of the configured optimizer."""
+        trainable_bytes = sum(variable_bytes(variable) for variable in self.model.trainable_variables)
+        if self.config.optimizer == "rowwise_adagrad":
+            return sum(variable.shape[0] * variable.dtype.size for variable in self.model.trainable_variables)
+        if self.config.optimizer not in OPTIMIZER_SLOTS:
+            raise NotImplementedError("No support for %s optimizer" % self.config.optimizer)
+        return OPTIMIZER_SLOTS[self.config.optimizer] * trainable_bytes
+
+    def estimate(self, batch_size):
+        """Function to estimate the memory of a training run with a batch size, in bytes.
+
+            Returns:
+                dict: The bytes of the parameters, the optimizer slots, the activations and their total.
+        """
+        # the activations first, the layers creating their variables on the first call (e.g. ConvE) are then built.
+        activations = self.activation_bytes(max(batch_size // self.accumulation_steps(), 1))
+        parameters = self.parameter_bytes()
+        optimizer = self.optimizer_bytes()
+        return {"batch_size": batch_size, "parameters": parameters, "optimizer": optimizer,
+                "activations": activations, "total": parameters + optimizer + activations}
+
+    def accumulation_steps(self):
+        """Function to get the number of micro-batches a batch is split into."""
+        return max(self.config.accumulation_steps, 1)
+
+    def largest_batch_size(self, budget, max_batch_size=None):
+        """Function to get the largest batch size whose estimate fits the memory budget.
+
+            The activations are fitted as a + b * batch_size from two batch sizes, and the
+            batch size found is checked, and lowered, against its own estimate. It is a
+            multiple of the number of micro-batches.
+
+            Args:
+                budget (int): The memory budget in bytes.
+                max_batch_size (int): The batch size not to exceed, the number of training triples if None.
+
+            Returns:
+                int: The batch size, 0 if not even one triple fits.
+        """
+        if max_batch_size is None:
+            max_batch_size = self.config.kg_meta.tot_train_triples
+
+        steps = self.accumulation_steps()
+        # the fit is over the sizes of the micro-batches.
+        small, large = 64, 128
+        slope = (self.activation_bytes(large) - self.activation_bytes(small)) / (large - small)
+        fixed = self.estimate(small * steps)["total"] - slope * small
+
+        batch_size = max_batch_size if slope <= 0 else int(min((budget - fixed) // slope * steps, max_batch_size))
+        batch_size -= batch_size % steps
+        while batch_size > 0 and self.estimate(batch_size)["total"] > budget:
+            batch_size = int(batch_size * 0.9)
+            batch_size -= batch_size % steps
+        return max(batch_size, 0)
+
+    def summary(self, batch_size):
+        """Function to print the estimate for a batch size."""
+        estimate = self.estimate(batch_size)
+        print("------------------Memory Estimate------------------")
+        print("%25s : %d" % ("batch_size", batch_size))
+        for name in ["parameters", "optimizer", "activations", "total"]:
+            print("%25s : %.1f MB" % (name, estimate[name] / MB))
+        print("---------------------------------------------------")
+        return estimate
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+This module is for training several models on the batches of one generator.
+
+The batches, the sampled negatives included, only depend on the settings of the generator
+(MultiModelTrainer.BATCH_SETTINGS), not on the model they are fed to. A model-selection
+sweep of TransE, TransH and TransR trained one after another therefore starts the same
+generator workers and samples the same negatives three times.
+
+MultiModelTrainer starts one Generator and feeds every batch, converted to tensors once,
+to the training step of every model. Each model keeps its own Trainer: its optimizer,
+evaluator, early stopping, checkpoints and exports. A model which stops early, or whose
+config.epochs is reached, leaves the others training.
+"""
+import contextlib
+
+import tensorflow as tf
+
+from pykg2vec.utils.trainer import Trainer
+from pykg2vec.utils.generator import Generator
+
+
+class MultiModelTrainer:
+    """Class training several models on the batches of one generator.
+
+        Args:
+            models (list): Model objects, whose configs share the settings of the generator.
+            debug (bool): Flag to check if its debugging.
+
+        Examples:
+            >>> trainer = MultiModelTrainer([TransE(transe_config), TransH(transh_config), TransR(transr_config)])
+            >>> trainer.build_model()
+            >>> trainer.train_model()
+    """
+    # the settings the batches depend on, which the models must share.
+    BATCH_SETTINGS = ["data", "custom_dataset_path", "batch_size", "neg_rate", "sampling", "num_shared_negatives",
+                      "partial_batch", "relation_grouped", "locality_window", "random_seed", "reorder_batches"]
+
+    def __init__(self, models, debug=False):
+        if len(models) == 0:
+            raise ValueError("MultiModelTrainer needs at least one model.")
+        self.debug = debug
+        self.trainers = [Trainer(model=model, debug=debug) for model in models]
+        self.generator = None
+
+        first = self.trainers[0]
+        for trainer in self.trainers:
+            if trainer.training_strategy != first.training_strategy:
+                raise NotImplementedError("%s is trained with the %s strategy and %s with the %s strategy, they cannot share batches."
+                                          % (first.model.model_name, first.training_strategy, trainer.model.model_name, trainer.training_strategy))
+            for setting in self.BATCH_SETTINGS:
+                if getattr(trainer.config, setting) != getattr(first.config, setting):
+                    raise ValueError("%s has %s=%s and %s has %s=%s, the models sharing batches need the same %s."
+                                     % (first.model.model_name, setting, getattr(first.config, setting), trainer.model.model_name,
+                                        setting, getattr(trainer.config, setting), setting))
+            self.check_support(trainer.config)
+
+    @staticmethod
+    def check_support(config):
+        """Function to check that a config trains from the generator, one batch per step."""
+        if config.hogwild_workers > 0 or config.entity_partitions > 0 or config.multi_worker:
+            raise NotImplementedError("The models sharing batches are trained from the generator, without Hogwild workers, entity partitions or multiple workers.")
+        if config.sampling == "cache":
+            raise NotImplementedError("The cache sampling depends on the scores of one model, the models cannot share its batches.")
+        if config.resume or config.warm_start_hops > 0:
+            raise NotImplementedError("The models sharing batches start from the first epoch on all the training triples, without -rsm or -wsh.")
+
+    def build_model(self):
+        """Function to build the models, each with its own optimizer."""
+        for trainer in self.trainers:
+            trainer.build_model()
+
+    def train_model(self):
+        """Function to train the models.
+
+            Returns:
+                list: The last loss of every model.
+        """
+        for trainer in self.trainers:
+            trainer.start_training()
+            trainer.create_instrumentation()
+
+        # the generator feeds the epochs of the model trained the longest.
+        config = max((trainer.config for trainer in self.trainers), key=lambda config: config.epochs)
+        self.generator = Generator(config, training_strategy=self.trainers[0].training_strategy,
+                                   max_batches=10 if self.debug else None)
+
+        losses = {trainer: float("inf") for trainer in self.trainers}
+        last_epoch = {trainer: -1 for trainer in self.trainers}
+        active = list(self.trainers)
+        for cur_epoch_idx in range(config.epochs):
+            active = [trainer for trainer in active if cur_epoch_idx < trainer.config.epochs]
+            if not active:
+                break
+            print("Epoch[%d/%d] %s" % (cur_epoch_idx, config.epochs, ", ".join(trainer.model.model_name for trainer in active)))
+
+            stopped = []
+            for trainer, loss in zip(active, self.train_model_epoch(cur_epoch_idx, active)):
+                trainer.training_results.append([cur_epoch_idx, loss])
+                print("%s acc_loss: %.4f" % (trainer.model.model_name, loss))
+                losses[trainer], last_epoch[trainer] = loss, cur_epoch_idx
+                if trainer.end_epoch(cur_epoch_idx, loss):
+                    stopped.append(trainer)
+            active = [trainer for trainer in active if trainer not in stopped]
+
+        self.trainers[0].profiler.stop()
+        self.generator.stop()
+
+        return [trainer.finish_training(last_epoch[trainer], losses[trainer]) for trainer in self.trainers]
+
+    def train_model_epoch(self, epoch_idx, trainers):
+        """Function to train the models for one epoch on the same batches, until the generator has handed out all its batches.
+
+            Every batch is converted once, the time waiting for it and converting it is
+            counted in the phases of every model.
+
+            Returns:
+                list: The accumulated loss of every model.
+        """
+        progress_bar = tf.keras.utils.Progbar(self.generator.num_batch)
+        acc_losses = [0.0] * len(trainers)
+
+        while self.generator.batches_left(epoch_idx) > 0:
+            # the trace of the first trainer covers the steps of all the models.
+            self.trainers[0].profiler.step(1)
+            with self.phase(trainers, "generator_wait"):
+                batch = list(next(self.generator))
+            with self.phase(trainers, "conversion"):
+                step_name, tensors = trainers[0].convert_batch(batch)
+
+            for idx, trainer in enumerate(trainers):
+                with trainer.timer.phase("train_step"):
+                    loss = trainer.run_step(step_name, *tensors)
+                    trainer.timer.wait(loss)
+                trainer.global_step.assign_add(1)
+                acc_losses[idx] += loss
+            progress_bar.add(1)
+
+        if self.generator.config.generator_stats:
+            self.generator.stats.log()
+        self.generator.stats.reset()
+
+        return [float(acc_loss) for acc_loss in acc_losses]
+
+    @staticmethod
+    @contextlib.contextmanager
+    def phase(trainers, name):
+        """Function to time a phase shared by the models in the timer of every model."""
+        with contextlib.ExitStack() as stack:
+            for trainer in trainers:
+                stack.enter_context(trainer.timer.phase(name))
+            yield
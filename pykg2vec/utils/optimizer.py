@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+This module is for the sparse, row-wise optimizers of the embedding tables.
+
+The gradients of the embedding lookups are tf.IndexedSlices which only hold the rows
+of the batch. The stock keras optimizers still update their slots (and for Adam the
+variables) over the whole table every step. The optimizers below only read and write
+the rows present in the sparse gradients, so that the cost of a step follows the
+batch size rather than the number of entities. Dense gradients get the usual update.
+
+The learning rate of a large batch can be scaled from the one of a base batch size,
+linearly or by the square root of their ratio, and warmed up over the first steps.
+"""
+import numpy as np
+import tensorflow as tf
+
+
+def deduplicate(gradient):
+    """Function to sum the values of the repeated rows of a sparse gradient.
+
+        Args:
+            gradient (tf.IndexedSlices): Sparse gradient, a row may appear several times.
+
+        Returns:
+            Tensors: Returns the unique row indices and their summed values.
+    """
+    indices, position = tf.unique(gradient.indices)
+    values = tf.math.unsorted_segment_sum(gradient.values, position, tf.shape(indices)[0])
+    return indices, values
+
+
+def add_gradients(total, gradient):
+    """Function to sum two gradients of a variable, the sparse ones concatenated (their rows summed by the update).
+
+        Args:
+            total (Tensor or tf.IndexedSlices): Gradient summed so far, None if none.
+            gradient (Tensor or tf.IndexedSlices): Gradient to add, None if the variable is not used.
+
+        Returns:
+            Tensor or tf.IndexedSlices: The sum of the gradients.
+    """
+    if total is None:
+        return gradient
+    if gradient is None:
+        return total
+    if isinstance(total, tf.IndexedSlices) and isinstance(gradient, tf.IndexedSlices):
+        return tf.IndexedSlices(tf.concat([total.values, gradient.values], 0),
+                                tf.concat([total.indices, gradient.indices], 0), total.dense_shape)
+    return tf.convert_to_tensor(total) + tf.convert_to_tensor(gradient)
+
+
+def scaled_learning_rate(config, num_workers=1):
+    """Function to scale config.learning_rate to the global batch size (config.lr_scaling).
+
+        The learning rate is taken as tuned for a batch of config.lr_base_batch_size
+        triples, and scaled by the ratio of the global batch size (of all the workers)
+        to it ('linear') or by the square root of that ratio ('sqrt').
+
+        Args:
+            config (object): Model configuration object.
+            num_workers (int): Number of workers each training on a batch of config.batch_size triples.
+
+        Returns:
+            float: The scaled learning rate.
+    """
+    ratio = config.batch_size * num_workers / config.lr_base_batch_size
+    if config.lr_scaling == "none":
+        return config.learning_rate
+    if config.lr_scaling == "linear":
+        return config.learning_rate * ratio
+    if config.lr_scaling == "sqrt":
+        return config.learning_rate * float(np.sqrt(ratio))
+    raise NotImplementedError("No support for %s learning rate scaling (choice: none/linear/sqrt)" % config.lr_scaling)
+
+
+class WarmupSchedule(tf.keras.optimizers.schedules.LearningRateSchedule):
+    """Learning rate growing linearly to its value over the first steps (gradual warmup).
+
+        Args:
+            learning_rate (float): Learning rate after the warmup.
+            warmup_steps (int): Number of steps of the warmup.
+
+        Examples:
+            >>> optimizer = tf.keras.optimizers.SGD(learning_rate=WarmupSchedule(0.4, 500))
+    """
+    def __init__(self, learning_rate, warmup_steps):
+        self.learning_rate = learning_rate
+        self.warmup_steps = warmup_steps
+
+    def __call__(self, step):
+        progress = tf.cast(step + 1, tf.float32) / float(self.warmup_steps)
+        return self.learning_rate * tf.minimum(progress, 1.0)
+
+    def get_config(self):
+        return {"learning_rate": self.learning_rate, "warmup_steps": self.warmup_steps}
+
+
+class LazyAdam(tf.keras.optimizers.Optimizer):
+    """Adam optimizer that only updates the moments and the rows of the sparse gradients.
+
+        The moments of the rows absent from a batch are not decayed, hence lazy: a row is
+        updated as if the steps it missed did not happen, while the bias correction follows
+        the global step.
+
+        Args:
+            learning_rate (float): Learning rate.
+            beta_1 (float): Decay rate of the first moment.
+            beta_2 (float): Decay rate of the second moment.
+            epsilon (float): Small constant for numerical stability.
+
+        Examples:
+            >>> from pykg2vec.utils.optimizer import LazyAdam
+            >>> optimizer = LazyAdam(learning_rate=0.01)
+            >>> optimizer.apply_gradients(zip(gradients, model.trainable_variables))
+    """
+    def __init__(self, learning_rate=0.001, beta_1=0.9, beta_2=0.999, epsilon=1e-7, name="LazyAdam", **kwargs):
+        # the row count of the sparse updates is dynamic, which xla does not support.
+        kwargs.setdefault("jit_compile", False)
+        # the base class defaults to a weight decay of 0, which is still applied densely to every row.
+        kwargs.setdefault("weight_decay", None)
+        super().__init__(name=name, **kwargs)
+        self._learning_rate = self._build_learning_rate(learning_rate)
+        self.beta_1 = beta_1
+        self.beta_2 = beta_2
+        self.epsilon = epsilon
+
+    def build(self, var_list):
+        """Function to create the moments of the variables."""
+        super().build(var_list)
+        if hasattr(self, "_built") and self._built:
+            return
+        self._built = True
+        self._momentums = [self.add_variable_from_reference(model_variable=var, variable_name="m") for var in var_list]
+        self._velocities = [self.add_variable_from_reference(model_variable=var, variable_name="v") for var in var_list]
+
+    def update_step(self, gradient, variable):
+        """Function to update a variable given its gradient."""
+        lr = tf.cast(self.learning_rate, variable.dtype)
+        local_step = tf.cast(self.iterations + 1, variable.dtype)
+        beta_1_power = tf.pow(tf.cast(self.beta_1, variable.dtype), local_step)
+        beta_2_power = tf.pow(tf.cast(self.beta_2, variable.dtype), local_step)
+        alpha = lr * tf.sqrt(1 - beta_2_power) / (1 - beta_1_power)
+
+        var_key = self._var_key(variable)
+        m = self._momentums[self._index_dict[var_key]]
+        v = self._velocities[self._index_dict[var_key]]
+
+        if isinstance(gradient, tf.IndexedSlices):
+            indices, values = deduplicate(gradient)
+            m_rows = m.sparse_read(indices) * self.beta_1 + values * (1 - self.beta_1)
+            v_rows = v.sparse_read(indices) * self.beta_2 + tf.square(values) * (1 - self.beta_2)
+            m.scatter_update(tf.IndexedSlices(m_rows, indices))
+            v.scatter_update(tf.IndexedSlices(v_rows, indices))
+            variable.scatter_sub(tf.IndexedSlices(alpha * m_rows / (tf.sqrt(v_rows) + self.epsilon), indices))
+        else:
+            m.assign_add((gradient - m) * (1 - self.beta_1))
+            v.assign_add((tf.square(gradient) - v) * (1 - self.beta_2))
+            variable.assign_sub(alpha * m / (tf.sqrt(v) + self.epsilon))
+
+    def get_config(self):
+        config = super().get_config()
+        config.update({
+            "learning_rate": self._serialize_hyperparameter(self._learning_rate),
+            "beta_1": self.beta_1,
+            "beta_2": self.beta_2,
+            "epsilon": self.epsilon,
+        })
+        return config
+
+
+class RowWiseAdagrad(tf.keras.optimizers.Optimizer):
+    """Adagrad optimizer keeping a single accumulator per row of the variables.
+
+        Every row (e.g. the embedding of an entity) accumulates the mean of its squared
+        gradient and is scaled by one learning rate, as in PyTorch-BigGraph. The
+        accumulators take 1/k of the memory of the stock Adagrad and only the rows of
+        the sparse gradients are read and written.
+
+        Args:
+            learning_rate (float): Learning rate.
+            initial_accumulator_value (float): Starting value of the accumulators.
+            epsilon (float): Small constant for numerical stability.
+
+        Examples:
+            >>> from pykg2vec.utils.optimizer import RowWiseAdagrad
+            >>> optimizer = RowWiseAdagrad(learning_rate=0.1)
+    """
+    def __init__(self, learning_rate=0.001, initial_accumulator_value=0.1, epsilon=1e-7, name="RowWiseAdagrad", **kwargs):
+        kwargs.setdefault("jit_compile", False)
+        kwargs.setdefault("weight_decay", None)
+        super().__init__(name=name, **kwargs)
+        self._learning_rate = self._build_learning_rate(learning_rate)
+        self.initial_accumulator_value = initial_accumulator_value
+        self.epsilon = epsilon
+
+    def build(self, var_list):
+        """Function to create the row accumulators of the variables."""
+        super().build(var_list)
+        if hasattr(self, "_built") and self._built:
+            return
+        self._built = True
+        self._accumulators = []
+        for var in var_list:
+            shape = var.shape[:1]
+            self._accumulators.append(self.add_variable_from_reference(
+                model_variable=var, variable_name="accumulator", shape=shape,
+                initial_value=tf.fill(shape, tf.cast(self.initial_accumulator_value, var.dtype))))
+
+    def update_step(self, gradient, variable):
+        """Function to update a variable given its gradient."""
+        lr = tf.cast(self.learning_rate, variable.dtype)
+        accumulator = self._accumulators[self._index_dict[self._var_key(variable)]]
+        # the mean is taken over all but the first axis, the scale is broadcast back.
+        axes = list(range(1, len(variable.shape)))
+        scale_shape = [-1] + [1] * len(axes)
+
+        if isinstance(gradient, tf.IndexedSlices):
+            indices, values = deduplicate(gradient)
+            accumulator_rows = accumulator.sparse_read(indices) + tf.reduce_mean(tf.square(values), axis=axes)
+            accumulator.scatter_update(tf.IndexedSlices(accumulator_rows, indices))
+            scale = tf.reshape(lr / (tf.sqrt(accumulator_rows) + self.epsilon), scale_shape)
+            variable.scatter_sub(tf.IndexedSlices(values * scale, indices))
+        else:
+            accumulator.assign_add(tf.reduce_mean(tf.square(gradient), axis=axes))
+            scale = tf.reshape(lr / (tf.sqrt(accumulator) + self.epsilon), scale_shape)
+            variable.assign_sub(gradient * scale)
+
+    def get_config(self):
+        config = super().get_config()
+        config.update({
+            "learning_rate": self._serialize_hyperparameter(self._learning_rate),
+            "initial_accumulator_value": self.initial_accumulator_value,
+            "epsilon": self.epsilon,
+        })
+        return config
+
+
+class SparseSGD(tf.keras.optimizers.Optimizer):
+    """SGD optimizer with momentum that only updates the rows of the sparse gradients.
+
+        The velocity of a row absent from a batch is left untouched until the row comes
+        back (lazy momentum), instead of moving every row of the table at every step.
+
+        Args:
+            learning_rate (float): Learning rate.
+            momentum (float): Decay rate of the velocity, 0 gives plain sparse SGD.
+
+        Examples:
+            >>> from pykg2vec.utils.optimizer import SparseSGD
+            >>> optimizer = SparseSGD(learning_rate=0.1, momentum=0.9)
+    """
+    def __init__(self, learning_rate=0.01, momentum=0.9, name="SparseSGD", **kwargs):
+        kwargs.setdefault("jit_compile", False)
+        kwargs.setdefault("weight_decay", None)
+        super().__init__(name=name, **kwargs)
+        self._learning_rate = self._build_learning_rate(learning_rate)
+        self.momentum = momentum
+
+    def build(self, var_list):
+        """Function to create the velocities of the variables."""
+        super().build(var_list)
+        if hasattr(self, "_built") and self._built:
+            return
+        self._built = True
+        self._velocities = [self.add_variable_from_reference(model_variable=var, variable_name="velocity") for var in var_list]
+
+    def update_step(self, gradient, variable):
+        """Function to update a variable given its gradient."""
+        lr = tf.cast(self.learning_rate, variable.dtype)
+        velocity = self._velocities[self._index_dict[self._var_key(variable)]]
+
+        if isinstance(gradient, tf.IndexedSlices):
+            indices, values = deduplicate(gradient)
+            velocity_rows = velocity.sparse_read(indices) * self.momentum + values
+            velocity.scatter_update(tf.IndexedSlices(velocity_rows, indices))
+            variable.scatter_sub(tf.IndexedSlices(lr * velocity_rows, indices))
+        else:
+            velocity.assign(velocity * self.momentum + gradient)
+            variable.assign_sub(lr * velocity)
+
+    def get_config(self):
+        config = super().get_config()
+        config.update({
+            "learning_rate": self._serialize_hyperparameter(self._learning_rate),
+            "momentum": self.momentum,
+        })
+        return config
@@ -0,0 +1,310 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+This module is for the bucketed training of entity tables larger than the memory.
+
+The entities are split into contiguous partitions whose embeddings (and row-wise Adagrad
+accumulators) are stored on disk, one file per table and partition. The training triples
+are grouped into buckets by the partitions of their head and tail, and an epoch trains
+on the buckets one after the other with only the two partitions of the bucket in memory,
+the negatives being drawn from these partitions (Lerer et al., PyTorch-BigGraph, 2019).
+The relations and the other small parameters stay in memory for the whole training.
+
+The partition files are the checkpoint: after every bucket, the loaded partitions, the
+other parameters and the position in the epoch are written, and a trainer created on
+the same directory resumes from there.
+"""
+import copy
+import json
+import os
+import numpy as np
+import tensorflow as tf
+
+from pykg2vec.utils.generator import make_rng, read_training_triples, PARTITION_STREAM
+from pykg2vec.utils.optimizer import RowWiseAdagrad, SparseSGD, scaled_learning_rate
+
+
+def save_array(path, array):
+    """Function to write an array to a .npy file atomically, a crash leaves the previous file."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(str(tmp_path), "wb") as file:
+        np.save(file, array)
+    os.replace(str(tmp_path), str(path))
+
+
+class PartitionedTrainer:
+    """Class training a model bucket by bucket with its entity tables partitioned on disk.
+
+        A local model is created with room for two partitions (slots) in its entity tables,
+        the tables whose first dimension is the number of entities. The entities of a bucket
+        are mapped to the rows of the slots their partitions are loaded in, the partition
+        that is swapped out is written back first. The buckets are visited row by row, in
+        alternating directions, so that consecutive buckets share a partition.
+
+        Only the optimizers with row state are supported: 'sgd' and 'sparse_sgd' (with
+        -mom 0) use sparse SGD, 'adagrad' and 'rowwise_adagrad' use the row-wise Adagrad
+        whose accumulators are partitioned with the entity tables.
+
+        Args:
+            model (object): Model of the trainer, its parameters are not defined.
+            training_strategy (str): Either 'pairwise_based' or 'pointwise_based'.
+            path (object): Directory of the partition files, config.path_tmp/<model>/partitions if None.
+
+        Examples:
+            >>> partitioned = PartitionedTrainer(model, "pairwise_based")
+            >>> for epoch_idx in range(partitioned.epoch, config.epochs):
+            >>>     loss = partitioned.train_epoch(epoch_idx)
+            >>> partitioned.assemble(model)
+    """
+    def __init__(self, model, training_strategy, path=None):
+        self.config = model.config
+        self.model_class = type(model)
+        self.training_strategy = training_strategy
+        self.path = self.config.path_tmp / model.model_name / "partitions" if path is None else path
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        if training_strategy not in ("pairwise_based", "pointwise_based"):
+            raise NotImplementedError("Partitioned training is not supported for the %s strategy." % training_strategy)
+        if self.config.optimizer in ("sgd", "sparse_sgd"):
+            if self.config.optimizer == "sparse_sgd" and self.config.momentum > 0:
+                raise NotImplementedError("Partitioned training has no momentum, train sparse_sgd with -mom 0.")
+            self.optimizer = SparseSGD(learning_rate=scaled_learning_rate(self.config), momentum=0.0)
+        elif self.config.optimizer in ("adagrad", "rowwise_adagrad"):
+            self.optimizer = RowWiseAdagrad(learning_rate=scaled_learning_rate(self.config))
+        else:
+            raise NotImplementedError("Partitioned training supports the sgd and adagrad optimizers, not %s." % self.config.optimizer)
+
+        tot_entity = self.config.kg_meta.tot_entity
+        self.num_partitions = self.config.entity_partitions
+        if not 0 < self.num_partitions <= tot_entity:
+            raise ValueError("The number of entity partitions must be between 1 and %d." % tot_entity)
+        self.bounds = np.linspace(0, tot_entity, self.num_partitions + 1).astype(np.int64)
+        self.partition_size = int(np.max(np.diff(self.bounds)))
+
+        # the local tables are told apart from the relation ones by their size, a spare row avoids a tie.
+        num_rows = 2 * self.partition_size
+        if num_rows == self.config.kg_meta.tot_relation:
+            num_rows += 1
+        self.local_config = copy.copy(self.config)
+        self.local_config.kg_meta = copy.copy(self.config.kg_meta)
+        self.local_config.kg_meta.tot_entity = num_rows
+        self.model = self.model_class(self.local_config)
+        self.model.def_parameters()
+        self.variables = self.model.trainable_variables
+        self.optimizer.build(self.variables)
+        self.entity_tables = [idx for idx, variable in enumerate(self.variables) if variable.shape[0] == num_rows]
+
+        self.buckets = self.make_buckets(read_training_triples(self.config))
+        self.slots = [None, None]
+        self.epoch, self.bucket_idx = 0, 0
+        if (self.path / "checkpoint.json").exists():
+            self.load_checkpoint()
+        else:
+            self.initialize()
+
+    def partition_of(self, entities):
+        """Function to get the partitions of entity ids."""
+        return np.searchsorted(self.bounds, entities, side="right") - 1
+
+    def make_buckets(self, data):
+        """Function to group the training triples by (head partition, tail partition), in visiting order."""
+        keys = self.partition_of(data[:, 0]) * self.num_partitions + self.partition_of(data[:, 2])
+        order = np.argsort(keys, kind="stable")
+        keys, data = keys[order], data[order]
+
+        buckets = []
+        for head_partition in range(self.num_partitions):
+            tail_partitions = range(self.num_partitions)
+            if head_partition % 2 == 1:
+                tail_partitions = reversed(tail_partitions)
+            for tail_partition in tail_partitions:
+                key = head_partition * self.num_partitions + tail_partition
+                start, stop = np.searchsorted(keys, [key, key + 1])
+                if stop > start:
+                    buckets.append((head_partition, tail_partition, data[start:stop]))
+        return buckets
+
+    def accumulator(self, variable):
+        """Function to get the row-wise Adagrad accumulator of a variable, None with SGD."""
+        if not isinstance(self.optimizer, RowWiseAdagrad):
+            return None
+        return self.optimizer._accumulators[self.optimizer._index_dict[self.optimizer._var_key(variable)]]
+
+    def files(self, table_idx, partition):
+        """Function to get the (embedding, accumulator) files of a partition of an entity table."""
+        return (self.path / ("entity_%d_%d.npy" % (table_idx, partition)),
+                self.path / ("accumulator_%d_%d.npy" % (table_idx, partition)))
+
+    def initialize(self):
+        """Function to write the initial partitions, drawn by the initializers of fresh local models."""
+        for partition in range(self.num_partitions):
+            size = self.bounds[partition + 1] - self.bounds[partition]
+            variables = self.variables
+            if partition > 0:
+                fresh = self.model_class(self.local_config)
+                fresh.def_parameters()
+                variables = fresh.trainable_variables
+            for table_idx in self.entity_tables:
+                embedding_file, accumulator_file = self.files(table_idx, partition)
+                save_array(embedding_file, variables[table_idx].numpy()[:size])
+                accumulator = self.accumulator(self.variables[table_idx])
+                if accumulator is not None:
+                    save_array(accumulator_file, accumulator.numpy()[:size])
+        self.save_checkpoint()
+
+    def rows(self, slot, partition):
+        """Function to get the local rows of a partition loaded in a slot."""
+        start = slot * self.partition_size
+        return slice(start, start + self.bounds[partition + 1] - self.bounds[partition])
+
+    def load(self, partition, keep):
+        """Function to load a partition in a slot not holding the partition to keep, returns the slot."""
+        if partition in self.slots:
+            return self.slots.index(partition)
+        free = [slot for slot in range(2) if self.slots[slot] is None]
+        slot = free[0] if free else [slot for slot in range(2) if self.slots[slot] != keep][0]
+        if self.slots[slot] is not None:
+            self.write(slot)
+
+        rows = self.rows(slot, partition)
+        for table_idx in self.entity_tables:
+            embedding_file, accumulator_file = self.files(table_idx, partition)
+            self.variables[table_idx][rows].assign(np.load(str(embedding_file)))
+            accumulator = self.accumulator(self.variables[table_idx])
+            if accumulator is not None:
+                accumulator[rows].assign(np.load(str(accumulator_file)))
+        self.slots[slot] = partition
+        return slot
+
+    def write(self, slot):
+        """Function to write the partition loaded in a slot back to its files."""
+        partition = self.slots[slot]
+        rows = self.rows(slot, partition)
+        for table_idx in self.entity_tables:
+            embedding_file, accumulator_file = self.files(table_idx, partition)
+            save_array(embedding_file, self.variables[table_idx][rows].numpy())
+            accumulator = self.accumulator(self.variables[table_idx])
+            if accumulator is not None:
+                save_array(accumulator_file, accumulator[rows].numpy())
+
+    def save_checkpoint(self):
+        """Function to write the loaded partitions, the other parameters and the position in the epoch."""
+        for slot, partition in enumerate(self.slots):
+            if partition is not None:
+                self.write(slot)
+
+        others = {}
+        for idx, variable in enumerate(self.variables):
+            if idx in self.entity_tables:
+                continue
+            others["variable_%d" % idx] = variable.numpy()
+            accumulator = self.accumulator(variable)
+            if accumulator is not None:
+                others["accumulator_%d" % idx] = accumulator.numpy()
+        save_array(self.path / "others.npy", np.array(others, dtype=object))
+
+        # written last, it points to a complete set of files.
+        state = {"epoch": self.epoch, "bucket": self.bucket_idx, "num_partitions": self.num_partitions}
+        tmp_path = self.path / "checkpoint.json.tmp"
+        with open(str(tmp_path), "w") as file:
+            json.dump(state, file)
+        os.replace(str(tmp_path), str(self.path / "checkpoint.json"))
+
+    def load_checkpoint(self):
+        """Function to resume from the checkpoint of the partition directory."""
+        with open(str(self.path / "checkpoint.json")) as file:
+            state = json.load(file)
+        if state["num_partitions"] != self.num_partitions:
+            raise ValueError("The checkpoint in %s has %d partitions, not %d." % (self.path, state["num_partitions"], self.num_partitions))
+        self.epoch, self.bucket_idx = state["epoch"], state["bucket"]
+
+        others = np.load(str(self.path / "others.npy"), allow_pickle=True).item()
+        for idx, variable in enumerate(self.variables):
+            if idx in self.entity_tables:
+                continue
+            variable.assign(others["variable_%d" % idx])
+            accumulator = self.accumulator(variable)
+            if accumulator is not None:
+                accumulator.assign(others["accumulator_%d" % idx])
+
+    @tf.function
+    def train_step_pairwise(self, pos_h, pos_r, pos_t, neg_h, neg_r, neg_t):
+        with tf.GradientTape() as tape:
+            loss = self.model.get_loss(pos_h, pos_r, pos_t, neg_h, neg_r, neg_t)
+        gradients = tape.gradient(loss, self.variables)
+        self.optimizer.apply_gradients(zip(gradients, self.variables))
+        return loss
+
+    @tf.function
+    def train_step_pointwise(self, h, r, t, y):
+        with tf.GradientTape() as tape:
+            loss = self.model.get_loss(h, r, t, y)
+        gradients = tape.gradient(loss, self.variables)
+        self.optimizer.apply_gradients(zip(gradients, self.variables))
+        return loss
+
+    def train_bucket(self, bucket_idx, epoch_idx, num_batch=None):
+        """Function to train on the triples of a bucket, returns the sum of the batch losses."""
+        head_partition, tail_partition, triples = self.buckets[bucket_idx]
+        head_slot = self.load(head_partition, keep=tail_partition)
+        tail_slot = self.load(tail_partition, keep=head_partition)
+        head_offset = head_slot * self.partition_size - self.bounds[head_partition]
+        tail_offset = tail_slot * self.partition_size - self.bounds[tail_partition]
+
+        rng = make_rng(self.config, PARTITION_STREAM, epoch_idx, bucket_idx)
+        triples = triples[rng.permutation(len(triples))]
+        batch_size, neg_rate = self.config.batch_size, self.config.neg_rate
+        if num_batch is not None:
+            triples = triples[:num_batch * batch_size]
+
+        loss = 0.0
+        for start in range(0, len(triples), batch_size):
+            pos = triples[start:start + batch_size].astype(np.int64)
+            pos[:, 0] += head_offset
+            pos[:, 2] += tail_offset
+
+            # the negatives are drawn within the loaded partitions.
+            neg = np.repeat(pos, neg_rate, axis=0)
+            corrupt_head = rng.random(len(neg)) < 0.5
+            neg[corrupt_head, 0] = rng.integers(self.bounds[head_partition], self.bounds[head_partition + 1], size=corrupt_head.sum()) + head_offset
+            neg[~corrupt_head, 2] = rng.integers(self.bounds[tail_partition], self.bounds[tail_partition + 1], size=(~corrupt_head).sum()) + tail_offset
+            pos, neg = pos.astype(np.int32), neg.astype(np.int32)
+
+            if self.training_strategy == "pointwise_based":
+                point = np.concatenate([pos, neg])
+                y = np.concatenate([np.ones(len(pos), dtype=np.float32), -np.ones(len(neg), dtype=np.float32)])
+                loss += float(self.train_step_pointwise(point[:, 0], point[:, 1], point[:, 2], y))
+            else:
+                loss += float(self.train_step_pairwise(pos[:, 0], pos[:, 1], pos[:, 2], neg[:, 0], neg[:, 1], neg[:, 2]))
+        return loss
+
+    def train_epoch(self, epoch_idx, num_batch=None):
+        """Function to train on every bucket once, checkpointing after each of them.
+
+            Args:
+                epoch_idx (int): Index of the epoch, a resumed epoch skips the buckets already done.
+                num_batch (int): Number of batches per bucket, all of them if None.
+
+            Returns:
+                float: Sum of the losses of the batches of the epoch.
+        """
+        first_bucket = self.bucket_idx if epoch_idx == self.epoch else 0
+        loss = 0.0
+        for bucket_idx in range(first_bucket, len(self.buckets)):
+            loss += self.train_bucket(bucket_idx, epoch_idx, num_batch)
+            self.epoch, self.bucket_idx = epoch_idx, bucket_idx + 1
+            if self.bucket_idx == len(self.buckets):
+                self.epoch, self.bucket_idx = epoch_idx + 1, 0
+            self.save_checkpoint()
+        return loss
+
+    def assemble(self, model):
+        """Function to gather the partitions into the full tables of a model, for when they fit in memory."""
+        if not model.trainable_variables:
+            model.def_parameters()
+        self.save_checkpoint()
+        for idx, (variable, local) in enumerate(zip(model.trainable_variables, self.variables)):
+            if idx in self.entity_tables:
+                variable.assign(np.concatenate([np.load(str(self.files(idx, partition)[0])) for partition in range(self.num_partitions)]))
+            else:
+                variable.assign(local)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+This module is for the instrumentation of the training: where the wall time of the epochs goes.
+
+PhaseTimer sums the time spent in the phases of an epoch and appends one JSON record per
+epoch to a JSON-lines file:
+
+    {"stage": "epoch", "epoch": 3, "generator_wait": 0.41, "conversion": 0.08, "train_step": 5.12,
+     "evaluation": 1.73, "checkpoint": 0.02, "export": 0.0, "other": 0.11, "wall": 7.47}
+
+"other" is the wall time of the epoch outside of the timed phases, and the record written
+after the training ("stage": "end") holds the time of saving and exporting the model.
+The training steps are timed until their loss is computed, which on a GPU synchronizes
+the host with the device after every step.
+
+ProfilerWindow captures a tf.profiler trace of a window of training steps, to be opened
+with the profile plugin of TensorBoard.
+"""
+import contextlib
+import json
+import timeit
+
+import tensorflow as tf
+
+
+class PhaseTimer:
+    """Class timing the phases of the training epochs.
+
+        Args:
+            path (object): Path of the JSON-lines file the records are appended to, None to time nothing.
+
+        Examples:
+            >>> timer = PhaseTimer(config.path_result / "transe_phase_timings.jsonl")
+            >>> with timer.phase("generator_wait"):
+            >>>     batch = next(generator)
+            >>> timer.write(epoch_idx)
+    """
+    PHASES = ["generator_wait", "conversion", "train_step", "evaluation", "checkpoint", "export"]
+
+    def __init__(self, path=None):
+        self.path = path
+        self.enabled = path is not None
+        self.reset()
+
+    def reset(self):
+        """Function to start the timing of a new record."""
+        self.times = {name: 0.0 for name in self.PHASES}
+        self.start_time = timeit.default_timer()
+
+    def phase(self, name):
+        """Function to get the context manager adding the time it spans to the named phase."""
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self.timed(name)
+
+    @contextlib.contextmanager
+    def timed(self, name):
+        start = timeit.default_timer()
+        try:
+            yield
+        finally:
+            self.times[name] += timeit.default_timer() - start
+
+    def wait(self, tensor):
+        """Function to wait for a tensor to be computed, so that its phase includes the computation."""
+        if self.enabled and isinstance(tensor, tf.Tensor):
+            tensor.numpy()
+
+    def write(self, epoch_idx, stage="epoch"):
+        """Function to append the record of the phases timed since the last one, and to start a new one."""
+        if not self.enabled:
+            return
+        wall = timeit.default_timer() - self.start_time
+        record = {"stage": stage, "epoch": int(epoch_idx)}
+        record.update({name: round(seconds, 6) for name, seconds in self.times.items()})
+        record["other"] = round(max(wall - sum(self.times.values()), 0.0), 6)
+        record["wall"] = round(wall, 6)
+        with open(str(self.path), "a") as file:
+            file.write(json.dumps(record) + "\n")
+        self.reset()
+
+
+class ProfilerWindow:
+    """Class capturing a tf.profiler trace of num_steps training steps from the start_step-th one.
+
+        Args:
+            logdir (object): Directory of the trace.
+            start_step (int): Number of training steps run before the trace starts (the first ones trace the functions).
+            num_steps (int): Number of training steps traced, 0 to trace nothing.
+
+        Examples:
+            >>> profiler = ProfilerWindow(config.path_result / "profile", 10, 20)
+            >>> for batch in batches:
+            >>>     profiler.step(1)
+            >>>     train_step(*batch)
+            >>> profiler.stop()
+    """
+    def __init__(self, logdir, start_step, num_steps):
+        self.logdir = logdir
+        self.start_step = start_step
+        self.stop_step = start_step + num_steps
+        self.enabled = num_steps > 0
+        self.steps = 0
+        self.active = False
+
+    def step(self, num_steps):
+        """Function to call before running num_steps training steps, it starts and stops the trace."""
+        if not self.enabled:
+            return
+        if self.active and self.steps >= self.stop_step:
+            self.stop()
+        elif not self.active and self.start_step <= self.steps < self.stop_step:
+            tf.profiler.experimental.start(str(self.logdir))
+            self.active = True
+            print("Tracing the training steps %d to %d in %s." % (self.steps, self.stop_step - 1, self.logdir))
+        self.steps += num_steps
+
+    def stop(self):
+        """Function to stop the trace if it is running, the window may end with the training."""
+        if self.active:
+            tf.profiler.experimental.stop()
+            self.active = False
+            self.enabled = False
@@ -3,14 +3,26 @@
 """
 This module is for training process.
 """
+import queue
 import timeit
+import types
+import numpy as np
 import tensorflow as tf
 import pandas as pd
+from tensorflow.python.eager import context
 
 from pykg2vec.core.KGMeta import TrainerMeta
-from pykg2vec.utils.evaluator import Evaluator
+from pykg2vec.utils.evaluator import Evaluator, AsyncEvaluator
 from pykg2vec.utils.visualization import Visualization
-from pykg2vec.utils.generator import Generator
+from pykg2vec.utils.generator import Generator, read_training_triples
+from pykg2vec.utils.hogwild import HogwildTrainer
+from pykg2vec.utils.partition import PartitionedTrainer
+from pykg2vec.utils.checkpoint import TrainingCheckpoint
+from pykg2vec.utils.profiling import PhaseTimer, ProfilerWindow
+from pykg2vec.utils.memory import MemoryEstimator, MB
+from pykg2vec.utils.warmstart import WarmStart, save_labels
+from pykg2vec.utils.optimizer import LazyAdam, RowWiseAdagrad, SparseSGD, WarmupSchedule, add_gradients, scaled_learning_rate
+from pykg2vec.utils.xla import CompiledFunction
 from pykg2vec.utils.kgcontroller import KnowledgeGraph
 
 tf.config.set_soft_device_placement(True)
@@ -31,6 +43,14 @@ class Trainer(TrainerMeta):
             patience (int): Number of epochs to wait before early stopping the training on no improvement.
             No early stopping if it is a negative number (default: {-1}).
 
+        With config.multi_worker, the model is trained data-parallel with MultiWorkerMirroredStrategy
+        across the workers of the TF_CONFIG cluster, one device per worker. Every worker feeds its own
+        shard of the training triples with its own Generator, the chief (or the first worker)
+        evaluates and saves the model. On a single box, it can be run as local processes:
+
+            $ TF_CONFIG='{"cluster": {"worker": ["localhost:12345", "localhost:12346"]}, "task": {"type": "worker", "index": 0}}' python train.py -mw true
+            $ TF_CONFIG='{"cluster": {"worker": ["localhost:12345", "localhost:12346"]}, "task": {"type": "worker", "index": 1}}' python train.py -mw true
+
         Examples:
             >>> from pykg2vec.utils.trainer import Trainer
             >>> from pykg2vec.core.TransE import TransE
@@ -38,6 +58,17 @@ class Trainer(TrainerMeta):
             >>> trainer.build_model()
             >>> trainer.train_model()
     """
+    # the training step and field dtypes of the strategies whose steps can be fused (config.steps_per_call).
+    FUSED_STEPS = {"pairwise_based": ("train_step", [tf.int32] * 6),
+                   "pointwise_based": ("train_step_pointwise", [tf.int32] * 3 + [tf.float32]),
+                   "shared_negative_based": ("train_step_shared_negatives", [tf.int32] * 4)}
+
+    # the input signatures of the training steps compiled with XLA (config.jit_compile), any batch size.
+    STEP_SIGNATURES = {"train_step": [tf.TensorSpec([None], tf.int32)] * 6,
+                       "train_step_pointwise": [tf.TensorSpec([None], tf.int32)] * 3 + [tf.TensorSpec([None], tf.float32)],
+                       "train_step_shared_negatives": [tf.TensorSpec([None], tf.int32)] * 4,
+                       "train_step_projection": [tf.TensorSpec([None], tf.int32)] * 3 + [tf.SparseTensorSpec([None, None], tf.int32)] * 2}
+
     def __init__(self, model, trainon='train', teston='valid', debug=False):
         self.debug = debug
         self.model = model
@@ -48,6 +79,37 @@ class Trainer(TrainerMeta):
 
         self.evaluator = None
         self.generator = None
+        self.hogwild = None
+        self.partitioned = None
+        self.checkpoint = None
+        self.warm_start = None
+        self.compiled_steps = {}
+
+        # instrumentation of the training (config.phase_timing, config.profile_steps), set up by train_model.
+        self.timer = PhaseTimer()
+        self.profiler = ProfilerWindow(None, 0, 0)
+
+        # data-parallel training across workers (config.multi_worker).
+        self.strategy = None
+        self.worker_index = 0
+        self.num_workers = 1
+        self.is_chief = True
+        if self.config.multi_worker:
+            self.create_multi_worker_strategy()
+
+        # early stopping on a validation metric (config.early_stop_metric), the best weights kept on the host.
+        self.best_metric = None
+        self.best_epoch = None
+        self.best_weights = None
+        self.checks_without_improvement = 0
+        # number of tests whose metrics are yet to be received.
+        self.pending_metrics = 0
+        if self.config.early_stop_metric != "loss":
+            metrics = ["mr", "fmr", "mrr", "fmrr"] + ["%shits%d" % (prefix, hit) for prefix in ("", "f") for hit in self.config.hits]
+            if self.config.early_stop_metric not in metrics:
+                raise NotImplementedError("No support for early stopping on %s (choice: loss/%s)" % (self.config.early_stop_metric, "/".join(metrics)))
+            if self.config.multi_worker:
+                raise NotImplementedError("Early stopping on a validation metric is not supported with multi-worker training, only the chief evaluates.")
 
         if model.model_name.lower() in ["tucker", "tucker_v2", "conve", "proje_pointwise"]:
             self.training_strategy = "projection_based"
@@ -56,108 +118,470 @@ class Trainer(TrainerMeta):
         else:
             self.training_strategy = "pairwise_based"
 
+        if self.config.num_shared_negatives > 0:
+            if not hasattr(model, "get_loss_shared_negatives"):
+                raise NotImplementedError("%s has no support for shared negatives (-sng), only TransE, DistMult, Complex and RotatE." % model.model_name)
+            self.training_strategy = "shared_negative_based"
+
+        # the losses are summed over the triples of the batch, but for these models which average them.
+        if model.model_name.lower() in ["convkb", "tucker", "tucker_v2"]:
+            self.loss_reduction = "mean"
+        else:
+            self.loss_reduction = "sum"
+
+        # gradient accumulation over micro-batches (config.accumulation_steps) and warmup, in the training steps of the trainer.
+        if self.config.accumulation_steps > 1:
+            if self.config.batch_size % self.config.accumulation_steps != 0:
+                raise ValueError("The batch size %d is not a multiple of the %d accumulation steps." % (self.config.batch_size, self.config.accumulation_steps))
+        if self.config.accumulation_steps > 1 or self.config.warmup_steps > 0:
+            if self.config.hogwild_workers > 0 or self.config.entity_partitions > 0:
+                raise NotImplementedError("Gradient accumulation and warmup are not supported with the Hogwild workers or the entity partitions, which run their own steps.")
 
     def build_model(self):
         """function to build the model"""
-        self.global_step = tf.Variable(0, name="global_step", trainable=False)
+        if self.strategy is None:
+            self.strategy = tf.distribute.get_strategy()
+
+        with self.strategy.scope():
+            self.global_step = tf.Variable(0, name="global_step", trainable=False)
+
+            if self.config.entity_partitions > 0:
+                # the entity tables only live on disk and in the PartitionedTrainer.
+                pass
+            elif self.config.optimizer in ['rms', 'adagrad', 'adadelta']:
+                with tf.device('cpu:0'):
+                    self.model.def_parameters()
+            else:
+                self.model.def_parameters()
 
+            if self.config.warm_start is not None:
+                self.warm_start_model()
+
+            if self.config.memory_budget > 0 and self.config.entity_partitions == 0:
+                self.check_memory()
+
+            # after the batch size is final, the learning rate may be scaled to it.
+            self.optimizer = self.create_optimizer()
+
+        if self.is_chief:
+            self.config.summary()
+            self.config.summary_hyperparameter(self.model.model_name)
+
+    def create_optimizer(self):
+        """Function to create the optimizer of config.optimizer."""
+        learning_rate = self.learning_rate()
         if self.config.optimizer == 'sgd':
-            self.optimizer = tf.keras.optimizers.SGD(learning_rate=self.config.learning_rate)
+            return tf.keras.optimizers.SGD(learning_rate=learning_rate)
         elif self.config.optimizer == 'rms':
-            self.optimizer = tf.keras.optimizers.RMSprop(learning_rate=self.config.learning_rate)
+            return tf.keras.optimizers.RMSprop(learning_rate=learning_rate)
         elif self.config.optimizer == 'adam':
-            self.optimizer = tf.keras.optimizers.Adam(learning_rate=self.config.learning_rate)
+            return tf.keras.optimizers.Adam(learning_rate=learning_rate)
         elif self.config.optimizer == 'adagrad':
-            self.optimizer = tf.keras.optimizers.Adagrad(learning_rate=self.config.learning_rate)
+            return tf.keras.optimizers.Adagrad(learning_rate=learning_rate)
         elif self.config.optimizer == 'adadelta':
-            self.optimizer = tf.keras.optimizers.Adadelta(learning_rate=self.config.learning_rate)
+            return tf.keras.optimizers.Adadelta(learning_rate=learning_rate)
+        elif self.config.optimizer == 'lazy_adam':
+            return LazyAdam(learning_rate=learning_rate)
+        elif self.config.optimizer == 'rowwise_adagrad':
+            return RowWiseAdagrad(learning_rate=learning_rate)
+        elif self.config.optimizer == 'sparse_sgd':
+            return SparseSGD(learning_rate=learning_rate, momentum=self.config.momentum)
         else:
             raise NotImplementedError("No support for %s optimizer" % self.config.optimizer)
-        
-        if self.config.optimizer in ['rms', 'adagrad', 'adadelta']:
-            with tf.device('cpu:0'):
-                self.model.def_parameters()
-        else:
-            self.model.def_parameters()
 
-        self.config.summary()
-        self.config.summary_hyperparameter(self.model.model_name)
+    def learning_rate(self):
+        """Function to get the learning rate of the optimizer, scaled to the global batch size (config.lr_scaling)
+           and warmed up over the first config.warmup_steps steps."""
+        learning_rate = scaled_learning_rate(self.config, self.num_workers)
+        if self.config.lr_scaling != "none" and self.is_chief:
+            print("The learning rate %g is scaled (%s) to %g for a global batch of %d triples." % (
+                self.config.learning_rate, self.config.lr_scaling, learning_rate, self.config.batch_size * self.num_workers))
+        if self.config.warmup_steps > 0:
+            return WarmupSchedule(learning_rate, self.config.warmup_steps)
+        return learning_rate
+
+    def warm_start_model(self):
+        """Function to initialize the model from the parameters of a previous run (config.warm_start).
+
+            The rows of the entities and relations are aligned by their labels, the new ones
+            keep their fresh initialization.
+        """
+        if self.config.entity_partitions > 0:
+            raise NotImplementedError("Warm start is not supported with the partitioned training, the entity tables live on disk.")
+        if self.config.warm_start_hops > 0 and self.config.hogwild_workers > 0:
+            raise NotImplementedError("The Hogwild workers train on all triples, warm start without -wsh.")
+        self.warm_start = WarmStart(self.config, self.config.warm_start)
+        return self.warm_start.initialize(self.model)
+
+    def check_memory(self):
+        """Function to estimate the memory of the training against config.memory_budget (in MB).
+
+            With config.auto_batch_size, the batch size is set to the largest one fitting the
+            budget. Otherwise, a configured batch size which does not fit is warned about.
+
+            Returns:
+                dict: The estimate of the parameter, optimizer and activation memory in bytes.
+        """
+        estimator = MemoryEstimator(self.model, self.training_strategy)
+        budget = self.config.memory_budget * MB
+
+        if self.config.auto_batch_size:
+            batch_size = estimator.largest_batch_size(budget)
+            if batch_size == 0:
+                raise MemoryError("%s does not fit in the memory budget of %.1f MB, even with a batch of one triple." % (self.model.model_name, self.config.memory_budget))
+            print("The largest batch size fitting the memory budget of %.1f MB is %d." % (self.config.memory_budget, batch_size))
+            self.config.batch_size = batch_size
+
+        estimate = estimator.summary(self.config.batch_size)
+        if estimate["total"] > budget:
+            print("Warning: the training is estimated to need %.1f MB, over the memory budget of %.1f MB. Lower the batch size or set -abs true." % (estimate["total"] / MB, self.config.memory_budget))
+        return estimate
+
+    def create_multi_worker_strategy(self):
+        """Function to create the MultiWorkerMirroredStrategy of the TF_CONFIG cluster.
+
+            The collective ops of the strategy can only be configured before TensorFlow
+            initializes, which creating the (keras) model already did. The eager context is
+            therefore reset before the strategy is created and the model, which holds no
+            parameters yet, is created again in the new context.
+        """
+        context._reset_context()
+        self.strategy = tf.distribute.MultiWorkerMirroredStrategy()
+        self.model = type(self.model)(self.config)
+
+        self.worker_index, self.num_workers = self.cluster_position()
+        self.is_chief = self.worker_index == 0
+        # every worker feeds its own batch to a single replica.
+        if self.strategy.num_replicas_in_sync != self.num_workers:
+            raise NotImplementedError("Multi-worker training needs one device per worker, start one worker per device.")
+
+    def cluster_position(self):
+        """Function to get the (index, number) of this worker among the workers of the cluster, the chief first."""
+        resolver = self.strategy.cluster_resolver
+        cluster = resolver.cluster_spec().as_dict()
+        num_chiefs = len(cluster.get("chief", []))
+        num_workers = num_chiefs + len(cluster.get("worker", []))
+        if resolver.task_type == "worker":
+            return num_chiefs + resolver.task_id, max(num_workers, 1)
+        return 0, max(num_workers, 1)
 
     ''' Training related functions:'''
+    def compute_gradients(self, step_name, loss_function, batch):
+        """Function to compute the loss of a batch of the named training step and its gradients.
+
+            With config.accumulation_steps, the batch is split into that many micro-batches
+            which run one after another, each one starting once the gradients of the previous
+            one are computed, so that only the activations of one micro-batch are alive at a
+            time. Their losses and gradients are summed, which gives those of the whole batch,
+            the losses of the models being sums over the triples (the averaged ones are
+            weighted by the share of the micro-batch). The regularization which does not depend
+            on the batch (the get_reg of the model, e.g. of DistMult) is left out of the losses
+            of the micro-batches and added once per step.
+
+            Returns:
+                tuple: The loss and the gradients of the trainable variables.
+        """
+        variables = self.model.trainable_variables
+        num_micro_batches = self.config.accumulation_steps
+        if num_micro_batches <= 1:
+            with tf.GradientTape() as tape:
+                loss = loss_function(*batch)
+            return loss, tape.gradient(loss, variables)
+
+        num_triples = self.batch_triples(step_name, batch)
+        micro_batch_size = (num_triples + num_micro_batches - 1) // num_micro_batches
+        # the models reshaping with the configured batch size (e.g. ConvE) are traced with the one of the micro-batches.
+        configured_batch_size = self.config.batch_size
+        self.config.batch_size = configured_batch_size // num_micro_batches
+        self.model.include_reg = False
+        try:
+            with tf.GradientTape() as tape:
+                loss = tf.convert_to_tensor(self.model.get_reg(), dtype=tf.float32)
+            gradients = tape.gradient(loss, variables)
+            previous = [loss] + [gradient for gradient in gradients if gradient is not None]
+            for micro_batch_idx in range(num_micro_batches):
+                with tf.control_dependencies(previous):
+                    start = micro_batch_idx * micro_batch_size
+                    stop = tf.minimum(start + micro_batch_size, num_triples)
+                    micro_batch = self.micro_batch(step_name, batch, num_triples, start, stop)
+                    with tf.GradientTape() as tape:
+                        micro_loss = loss_function(*micro_batch)
+                        if self.loss_reduction == "mean":
+                            micro_loss *= tf.cast(stop - start, tf.float32) / tf.cast(num_triples, tf.float32)
+                    micro_gradients = tape.gradient(micro_loss, variables)
+                loss += micro_loss
+                gradients = [add_gradients(total, gradient) for total, gradient in zip(gradients, micro_gradients)]
+                previous = [micro_loss] + [gradient.values if isinstance(gradient, tf.IndexedSlices) else gradient
+                                           for gradient in micro_gradients if gradient is not None]
+        finally:
+            self.config.batch_size = configured_batch_size
+            self.model.include_reg = True
+        return loss, gradients
+
+    def batch_triples(self, step_name, batch):
+        """Function to get the number of positive triples of a batch of the named training step."""
+        if step_name == "train_step_pointwise":
+            return tf.shape(batch[0])[0] // (1 + self.config.neg_rate)
+        return tf.shape(batch[0])[0]
+
+    def micro_batch(self, step_name, batch, num_triples, start, stop):
+        """Function to get the fields of the micro-batch of the positive triples start:stop of a batch.
+
+            The negatives of a positive triple are next to each other, after the positive
+            triples for the pointwise batches. The pool of the shared negatives is shared
+            by the micro-batches and the rows of the projection targets are sliced.
+        """
+        if step_name == "train_step":
+            neg_rate = tf.shape(batch[3])[0] // num_triples
+            return [field[start:stop] for field in batch[:3]] + [field[start * neg_rate:stop * neg_rate] for field in batch[3:]]
+        if step_name == "train_step_pointwise":
+            neg_rate = self.config.neg_rate
+            return [tf.concat([field[start:stop], field[num_triples + start * neg_rate:num_triples + stop * neg_rate]], 0) for field in batch]
+        if step_name == "train_step_shared_negatives":
+            return [field[start:stop] for field in batch[:3]] + [batch[3]]
+        rows = tf.cast(stop - start, tf.int64)
+        return [field[start:stop] for field in batch[:3]] + \
+               [tf.sparse.slice(field, [tf.cast(start, tf.int64), 0], [rows, field.dense_shape[1]]) for field in batch[3:]]
+
     @tf.function
     def train_step(self, pos_h, pos_r, pos_t, neg_h, neg_r, neg_t):
-        with tf.GradientTape() as tape:
-            loss = self.model.get_loss(pos_h, pos_r, pos_t, neg_h, neg_r, neg_t)
-
-        gradients = tape.gradient(loss, self.model.trainable_variables)
+        loss, gradients = self.compute_gradients("train_step", self.model.get_loss, [pos_h, pos_r, pos_t, neg_h, neg_r, neg_t])
         self.optimizer.apply_gradients(zip(gradients, self.model.trainable_variables))
 
         return loss
 
     @tf.function
     def train_step_projection(self, h, r, t, hr_t, rt_h):
-        with tf.GradientTape() as tape:
-            loss = self.model.get_loss(h, r, t, hr_t, rt_h)
+        loss, gradients = self.compute_gradients("train_step_projection", self.model.get_loss, [h, r, t, hr_t, rt_h])
+        self.optimizer.apply_gradients(zip(gradients, self.model.trainable_variables))
+
+        return loss
 
-        gradients = tape.gradient(loss, self.model.trainable_variables)
+    @tf.function
+    def train_step_shared_negatives(self, pos_h, pos_r, pos_t, neg_pool):
+        loss, gradients = self.compute_gradients("train_step_shared_negatives", self.model.get_loss_shared_negatives, [pos_h, pos_r, pos_t, neg_pool])
         self.optimizer.apply_gradients(zip(gradients, self.model.trainable_variables))
 
         return loss
 
     @tf.function
     def train_step_pointwise(self, h, r, t, y):
-        with tf.GradientTape() as tape:
-            loss = self.model.get_loss(h, r, t, y)
-
-        gradients = tape.gradient(loss, self.model.trainable_variables)
+        loss, gradients = self.compute_gradients("train_step_pointwise", self.model.get_loss, [h, r, t, y])
         self.optimizer.apply_gradients(zip(gradients, self.model.trainable_variables))
 
         return loss
 
+    @tf.function
+    def fused_steps(self, step_name, batches):
+        """Function to run the named training step on each of the K stacked batches, the loss summed in-graph."""
+        acc_loss = tf.constant(0.0)
+        for step_idx in tf.range(tf.shape(batches[0])[0]):
+            acc_loss += getattr(self, step_name)(*[field[step_idx] for field in batches])
+        return acc_loss
+
+    def run_step(self, step_name, *batch):
+        """Function to run the named training step on a batch, on every worker with config.multi_worker.
+
+            Every worker runs the step on its own batch, the gradients are summed across the
+            workers (all-reduce) before the update and the returned loss is the sum of their losses.
+        """
+        if not self.config.multi_worker:
+            return self.step_function(step_name)(*batch)
+        return self.distributed_step(step_name, batch)
+
+    def step_function(self, step_name):
+        """Function to get the named training step, compiled with XLA if config.jit_compile is set."""
+        if not self.config.jit_compile:
+            return getattr(self, step_name)
+        if step_name not in self.compiled_steps:
+            function = types.MethodType(getattr(type(self), step_name).python_function, self)
+            self.compiled_steps[step_name] = CompiledFunction(function, self.STEP_SIGNATURES[step_name], step_name,
+                                                              fallback=getattr(self, step_name))
+        return self.compiled_steps[step_name]
+
+    def fused_function(self, step_name):
+        """Function to get the fused training loop of the named step, compiled with XLA if config.jit_compile is set."""
+        if not self.config.jit_compile:
+            return lambda batches: self.fused_steps(step_name, batches)
+        key = "fused_" + step_name
+        if key not in self.compiled_steps:
+            _, dtypes = self.FUSED_STEPS[self.training_strategy]
+            fused_steps = type(self).fused_steps.python_function
+            signature = [[tf.TensorSpec([None, None], dtype) for dtype in dtypes]]
+            self.compiled_steps[key] = CompiledFunction(lambda batches: fused_steps(self, step_name, batches), signature, key,
+                                                        fallback=lambda batches: self.fused_steps(step_name, batches))
+        return self.compiled_steps[key]
+
+    @tf.function
+    def distributed_step(self, step_name, batch):
+        losses = self.strategy.run(getattr(self, step_name), args=batch)
+        return self.strategy.reduce(tf.distribute.ReduceOp.SUM, losses, axis=None)
+
+    @tf.function
+    def score_candidates(self, h, r, t, candidates, head):
+        """Function to score the [b, n] candidate heads (if head is set) or tails of a batch of triples."""
+        num_candidates = tf.shape(candidates)[1]
+        flat = tf.reshape(candidates, [-1])
+        h = tf.repeat(h, num_candidates)
+        r = tf.repeat(r, num_candidates)
+        t = tf.repeat(t, num_candidates)
+
+        if head:
+            score = self.model.plausibility(flat, r, t)
+        else:
+            score = self.model.plausibility(h, r, flat)
+
+        return tf.reshape(score, [-1, num_candidates])
+
+    def update_negative_cache(self, h, r, t):
+        """Function to refresh the hard-negative cache rows of a batch of training triples.
+
+            The cached and the fresh random candidates are scored with the current model,
+            the positive triples among them are excluded and the best ones are kept.
+        """
+        sampler = self.generator.sampler
+        h, r, t = np.asarray(h), np.asarray(r), np.asarray(t)
+
+        for head in (True, False):
+            rows, candidates = sampler.cache.candidates(h, r, t, head)
+            scores = self.score_candidates(h, r, t, candidates, head).numpy()
+
+            num_candidates = candidates.shape[1]
+            flat = candidates.reshape(-1)
+            if head:
+                positive = sampler.is_positive(flat, np.repeat(r, num_candidates), np.repeat(t, num_candidates))
+            else:
+                positive = sampler.is_positive(np.repeat(h, num_candidates), np.repeat(r, num_candidates), flat)
+            scores[positive.reshape(scores.shape)] = -np.inf
+
+            sampler.cache.update(rows, candidates, scores, head)
 
     def train_model(self):
         """Function to train the model."""
+        if self.config.entity_partitions > 0:
+            return self.train_model_partitioned()
+
+        start_epoch = self.start_training()
+        self.create_workers(start_epoch)
+        self.create_instrumentation()
+
+        # the last epoch trained, none if resumed after the last one.
+        cur_epoch_idx = start_epoch - 1
+        loss = float("inf")
+        for cur_epoch_idx in range(start_epoch, self.config.epochs):
+            print("Epoch[%d/%d]"%(cur_epoch_idx,self.config.epochs))
+            loss = self.train_model_epoch(cur_epoch_idx)
+            if self.end_epoch(cur_epoch_idx, loss):
+                break
+
+        self.profiler.stop()
+        self.stop_workers()
+
+        return self.finish_training(cur_epoch_idx, loss)
+
+    def start_training(self):
+        """Function to set up the evaluator, the loaded weights and the checkpoints of a training.
+
+            Returns:
+                int: The epoch to start from, after the last checkpointed one if resumed.
+        """
         ### Early Stop Mechanism
-        loss = previous_loss = float("inf")
-        patience_left = self.config.patience
+        self.previous_loss = float("inf")
+        self.patience_left = self.config.patience
         ### Early Stop Mechanism
 
-        self.generator = Generator(self.model.config, training_strategy=self.training_strategy)
-        self.evaluator = Evaluator(model=self.model, data_type=self.teston, debug=self.debug)
+        # with several workers, the models are identical and only the chief evaluates them.
+        # with config.async_evaluation, the tests evaluate snapshots while the training continues.
+        if self.is_chief and self.config.async_evaluation:
+            self.evaluator = AsyncEvaluator(model=self.model, data_type=self.teston, debug=self.debug,
+                                            keep_snapshots=self.config.early_stop_metric != "loss")
+        elif self.is_chief:
+            self.evaluator = Evaluator(model=self.model, data_type=self.teston, debug=self.debug)
 
         if self.config.loadFromData:
             self.load_model()
-        
-        for cur_epoch_idx in range(self.config.epochs):
-            print("Epoch[%d/%d]"%(cur_epoch_idx,self.config.epochs))
-            loss = self.train_model_epoch(cur_epoch_idx)
-            self.test(cur_epoch_idx)
 
-            ### Early Stop Mechanism
-            ### start to check if the loss is still decreasing after an interval. 
-            ### Example, if early_stop_epoch == 50, the trainer will check loss every 50 epoche.
-            ### TODO: change to support different metrics.
-            if ((cur_epoch_idx + 1) % self.config.early_stop_epoch) == 0: 
-                if patience_left > 0 and previous_loss <= loss:
-                    patience_left -= 1
-                    print('%s more chances before the trainer stops the training. (prev_loss, curr_loss): (%.f, %.f)' % \
-                        (patience_left, previous_loss, loss))
+        start_epoch = 0
+        if self.config.checkpoint_epochs > 0 or self.config.resume:
+            self.checkpoint = TrainingCheckpoint(self.model, self.optimizer, self.global_step)
+            if self.config.resume:
+                start_epoch, self.training_results = self.checkpoint.restore()
+        return start_epoch
 
-                elif patience_left == 0 and previous_loss <= loss:
-                    self.evaluator.result_queue.put(Evaluator.TEST_BATCH_EARLY_STOP)
-                    break
-                else:
-                    patience_left = self.config.patience
+    def end_epoch(self, cur_epoch_idx, loss):
+        """Function to test and checkpoint the model after an epoch, and to check for an early stop.
 
-            previous_loss = loss
-            ### Early Stop Mechanism
+            Returns:
+                bool: True if the training should stop.
+        """
+        tested = False
+        stop = False
+        if self.is_chief:
+            with self.timer.phase("evaluation"):
+                tested = self.test(cur_epoch_idx)
+            with self.timer.phase("checkpoint"):
+                self.save_checkpoint(cur_epoch_idx)
+
+        ### Early Stop Mechanism
+        ### with a validation metric, every test is checked for an improvement, as sent back by the evaluation process
+        ### (as soon as it is evaluated with config.async_evaluation, some epochs later).
+        ### otherwise, start to check if the loss is still decreasing after an interval.
+        ### Example, if early_stop_epoch == 50, the trainer will check loss every 50 epoche.
+        if self.config.early_stop_metric != "loss":
+            self.pending_metrics += tested
+            with self.timer.phase("evaluation"):
+                stop = self.check_metrics(block=not self.config.async_evaluation)
+        elif ((cur_epoch_idx + 1) % self.config.early_stop_epoch) == 0: 
+            if self.patience_left > 0 and self.previous_loss <= loss:
+                self.patience_left -= 1
+                print('%s more chances before the trainer stops the training. (prev_loss, curr_loss): (%.f, %.f)' % \
+                    (self.patience_left, self.previous_loss, loss))
+
+            elif self.patience_left == 0 and self.previous_loss <= loss:
+                stop = True
+            else:
+                self.patience_left = self.config.patience
+
+        self.previous_loss = loss
+        self.timer.write(cur_epoch_idx)
+        if stop and self.is_chief:
+            self.evaluator.early_stop()
+        ### Early Stop Mechanism
+        return stop
+
+    def finish_training(self, cur_epoch_idx, loss):
+        """Function to collect the last tests, then to save and export the model once the workers are stopped.
+
+            Args:
+                cur_epoch_idx (int): The last epoch trained.
+                loss (float): The loss of the last epoch.
+
+            Returns:
+                float: The loss of the last epoch.
+        """
+        if self.is_chief and self.config.early_stop_metric != "loss":
+            # the metrics of the tests still being evaluated, which may hold the best weights.
+            with self.timer.phase("evaluation"):
+                self.check_metrics(block=True)
+
+        if self.checkpoint is not None:
+            with self.timer.phase("checkpoint"):
+                self.checkpoint.sync()
+
+        if not self.is_chief:
+            self.timer.write(cur_epoch_idx, stage="end")
+            return loss
+
+        if self.best_weights is not None:
+            self.restore_best_weights()
 
-        self.generator.stop()
         self.evaluator.save_training_result(self.training_results)
-        self.evaluator.stop()
+        with self.timer.phase("evaluation"):
+            self.evaluator.stop()
 
         if self.config.save_model:
-            self.save_model()
+            with self.timer.phase("export"):
+                self.save_model()
 
         if self.config.disp_result:
             self.display()
@@ -166,10 +590,69 @@ class Trainer(TrainerMeta):
             self.config.summary()
             self.config.summary_hyperparameter(self.model.model_name)
 
-        self.export_embeddings()
+        with self.timer.phase("export"):
+            self.export_embeddings()
+        self.timer.write(cur_epoch_idx, stage="end")
 
         return loss
 
+    def check_metrics(self, block):
+        """Function to check the metrics received from the evaluation process for an early stop.
+
+            Args:
+                block (bool): Wait for the metrics of all the tests run so far if set.
+
+            Returns:
+                bool: True if the training should stop.
+        """
+        stop = False
+        while self.pending_metrics > 0:
+            try:
+                metrics = self.evaluator.output_queue.get(block=block)
+            except queue.Empty:
+                break
+            self.pending_metrics -= 1
+            # the asynchronous tests evaluated snapshots, the model has been trained further since.
+            weights = self.evaluator.pop_snapshot(metrics["epoch"]) if isinstance(self.evaluator, AsyncEvaluator) else None
+            stop = self.early_stop_on_metric(metrics, weights) or stop
+        return stop
+
+    def early_stop_on_metric(self, metrics, weights=None):
+        """Function to check a test for an improvement of the validation metric.
+
+            The weights of the best test are kept on the host, and the training stops once
+            config.patience tests in a row did not improve on it.
+
+            Args:
+                metrics (dict): The metrics of a test, from MetricCalculator.get_metrics.
+                weights (list): The values of the model variables tested, the current ones if None.
+
+            Returns:
+                bool: True if the training should stop.
+        """
+        name = self.config.early_stop_metric
+        value = metrics[name]
+        lower_is_better = name in ("mr", "fmr")
+
+        if self.best_metric is None or (value < self.best_metric if lower_is_better else value > self.best_metric):
+            self.best_metric = value
+            self.best_epoch = metrics["epoch"]
+            self.best_weights = weights if weights is not None else [variable.numpy() for variable in self.model.variables]
+            self.checks_without_improvement = 0
+            return False
+
+        self.checks_without_improvement += 1
+        print('%s has not improved on %.4f (epoch %d) for %d test(s), %d more chances before the trainer stops the training.' % \
+            (name, self.best_metric, self.best_epoch, self.checks_without_improvement,
+             max(self.config.patience - self.checks_without_improvement, 0)))
+        return self.checks_without_improvement >= self.config.patience
+
+    def restore_best_weights(self):
+        """Function to restore the weights of the best test of the validation metric."""
+        for variable, value in zip(self.model.variables, self.best_weights):
+            variable.assign(value)
+        print("Restored the weights of epoch %d, %s: %.4f" % (self.best_epoch, self.config.early_stop_metric, self.best_metric))
+
     def tune_model(self):
         """Function to tune the model."""
         acc = 0
@@ -178,7 +661,7 @@ class Trainer(TrainerMeta):
         patience_left = self.config.patience
         ### Early Stop Mechanism
 
-        self.generator = Generator(self.model.config, training_strategy=self.training_strategy)
+        self.create_workers()
         self.evaluator = Evaluator(model=self.model,data_type=self.teston, debug=self.debug, tuning=True)
        
         for cur_epoch_idx in range(self.config.epochs):
@@ -201,56 +684,215 @@ class Trainer(TrainerMeta):
 
             previous_loss = loss
 
-        self.generator.stop()
+        self.stop_workers()
         self.evaluator.test(cur_epoch_idx)
         acc = self.evaluator.output_queue.get()
         self.evaluator.stop()
 
         return acc
 
+    def train_model_partitioned(self):
+        """Function to train the model bucket by bucket, with its entity tables partitioned on disk.
+
+            The training resumes from the checkpoint of the partition directory. As the full
+            tables may not fit in memory, the model is neither evaluated nor saved here: the
+            partition files are the trained model, gathered with PartitionedTrainer.assemble
+            when they fit.
+        """
+        self.partitioned = PartitionedTrainer(self.model, self.training_strategy)
+
+        loss = float("inf")
+        for cur_epoch_idx in range(self.partitioned.epoch, self.config.epochs):
+            print("Epoch[%d/%d]" % (cur_epoch_idx, self.config.epochs))
+            loss = self.partitioned.train_epoch(cur_epoch_idx, 10 if self.debug else None)
+            self.training_results.append([cur_epoch_idx, loss])
+            print("acc_loss: %.4f" % loss)
+
+        return loss
+
+    def create_workers(self, start_epoch=0):
+        """Function to start the generator, or the Hogwild workers if config.hogwild_workers is set.
+
+            Args:
+                start_epoch (int): The epoch the generator starts feeding from, to resume a run.
+        """
+        if self.config.hogwild_workers > 0:
+            self.hogwild = HogwildTrainer(self.model, self.training_strategy)
+        else:
+            shard = (self.worker_index, self.num_workers) if self.config.multi_worker else None
+            self.generator = Generator(self.model.config, training_strategy=self.training_strategy, shard=shard,
+                                       start_epoch=start_epoch, data=self.touched_triples(),
+                                       max_batches=10 if self.debug else None)
+
+    def touched_triples(self):
+        """Function to get the triples of the neighbourhood touched by the update of the graph (config.warm_start_hops).
+
+            Returns:
+                array: The triples to train on, None to train on all of them.
+        """
+        if self.warm_start is None or self.config.warm_start_hops <= 0:
+            return None
+        data = read_training_triples(self.config)
+        touched = self.warm_start.touched_triples(data, self.config.warm_start_hops)
+        if len(touched) == 0:
+            print("The update touched no triples, training on all %d triples." % len(data))
+            return None
+        print("Training on the %d of %d triples within %d hops of the update." % (len(touched), len(data), self.config.warm_start_hops))
+        return touched
+
+    def create_instrumentation(self):
+        """Function to set up the phase timing (config.phase_timing) and the profiler window (config.profile_steps).
+
+            With several workers, every worker times its own phases in its own file.
+        """
+        suffix = "_worker%d" % self.worker_index if self.config.multi_worker else ""
+        if self.config.phase_timing:
+            self.timer = PhaseTimer(self.config.path_result / ("%s_phase_timings%s.jsonl" % (self.model.model_name, suffix)))
+        logdir = self.config.path_result / ("%s_profile%s" % (self.model.model_name, suffix))
+        self.profiler = ProfilerWindow(logdir, self.config.profile_start_step, self.config.profile_steps)
+
+    def save_checkpoint(self, epoch_idx):
+        """Function to take a training checkpoint every config.checkpoint_epochs epochs and after the last one."""
+        if self.checkpoint is None or self.config.checkpoint_epochs <= 0:
+            return
+        if (epoch_idx + 1) % self.config.checkpoint_epochs == 0 or epoch_idx == self.config.epochs - 1:
+            self.checkpoint.save(epoch_idx, self.training_results)
+
+    def stop_workers(self):
+        """Function to stop the generator or the Hogwild workers."""
+        if self.hogwild is not None:
+            self.hogwild.stop()
+            self.hogwild = None
+        else:
+            self.generator.stop()
+
     def train_model_epoch(self, epoch_idx, tuning=False):
-        """Function to train the model for one epoch."""
+        """Function to train the model for one epoch, until the generator has handed out all its batches."""
+        if self.hogwild is not None:
+            # the workers train on their shards and the model gets the shared parameters back.
+            with self.timer.phase("train_step"):
+                acc_loss = self.hogwild.train_epoch(epoch_idx, 10 if self.debug else None)
+            self.training_results.append([epoch_idx, acc_loss])
+            if not tuning:
+                print("acc_loss: %.4f" % acc_loss)
+            return acc_loss
+
         acc_loss = 0
 
-        num_batch = self.model.config.kg_meta.tot_train_triples // self.config.batch_size if not self.debug else 10
+        num_batch = self.generator.num_batch
        
         metrics_names = ['acc_loss', 'loss'] 
         progress_bar = tf.keras.utils.Progbar(num_batch, stateful_metrics=metrics_names)
 
-        for batch_idx in range(num_batch):
-            data = list(next(self.generator))
-            
-            if self.training_strategy == "projection_based":
-                h = tf.convert_to_tensor(data[0], dtype=tf.int32)
-                r = tf.convert_to_tensor(data[1], dtype=tf.int32)
-                t = tf.convert_to_tensor(data[2], dtype=tf.int32)
-                hr_t = data[3] # tf.convert_to_tensor(data[3], dtype=tf.float32)
-                rt_h = data[4] # tf.convert_to_tensor(data[4], dtype=tf.float32)
-                loss = self.train_step_projection(h, r, t, hr_t, rt_h)
-            elif self.training_strategy == "pointwise_based":
-                h = tf.convert_to_tensor(data[0], dtype=tf.int32)
-                r = tf.convert_to_tensor(data[1], dtype=tf.int32)
-                t = tf.convert_to_tensor(data[2], dtype=tf.int32)
-                y = tf.convert_to_tensor(data[3], dtype=tf.float32)
-                loss = self.train_step_pointwise(h, r, t, y)
+        steps_per_call = self.steps_per_call()
+        while self.generator.batches_left(epoch_idx) > 0:
+            num_steps = min(steps_per_call, self.generator.batches_left(epoch_idx))
+            self.profiler.step(num_steps)
+            if num_steps > 1:
+                batches = []
+                for _ in range(num_steps):
+                    with self.timer.phase("generator_wait"):
+                        batch = next(self.generator)
+                    # the generator may reuse the memory of a batch once the next one is taken.
+                    with self.timer.phase("conversion"):
+                        batches.append([np.array(field) for field in batch])
+                loss = self.train_batches(batches)
             else:
-                ph = tf.convert_to_tensor(data[0], dtype=tf.int32)
-                pr = tf.convert_to_tensor(data[1], dtype=tf.int32)
-                pt = tf.convert_to_tensor(data[2], dtype=tf.int32)
-                nh = tf.convert_to_tensor(data[3], dtype=tf.int32)
-                nr = tf.convert_to_tensor(data[4], dtype=tf.int32)
-                nt = tf.convert_to_tensor(data[5], dtype=tf.int32)
-                loss = self.train_step(ph, pr, pt, nh, nr, nt)
+                with self.timer.phase("generator_wait"):
+                    batch = list(next(self.generator))
+                loss = self.train_batch(batch)
+            self.global_step.assign_add(num_steps)
 
             acc_loss += loss
 
             if not tuning:
-                progress_bar.add(1, values=[('acc_loss', acc_loss), ('loss', loss)])
+                progress_bar.add(num_steps, values=[('acc_loss', acc_loss), ('loss', loss / num_steps)])
 
         self.training_results.append([epoch_idx, acc_loss.numpy()])
 
+        if self.config.generator_stats:
+            self.generator.stats.log()
+        self.generator.stats.reset()
+
         return acc_loss
 
+    def steps_per_call(self):
+        """Function to get the number of training steps fused in one call, 1 where they cannot be.
+
+            The projection batches hold sparse tensors, the cache sampling refreshes the cache
+            between the steps and the multi-worker steps are distributed one by one.
+        """
+        if self.training_strategy not in self.FUSED_STEPS or self.config.sampling == "cache" or self.config.multi_worker:
+            return 1
+        return max(self.config.steps_per_call, 1)
+
+    def train_batches(self, batches):
+        """Function to train on K batches with one call of the fused training loop, returns the summed loss.
+
+            The batches are stacked field by field into [K, ...] tensors, the K steps and the
+            sum of their losses run in the graph, so there is a single host synchronization
+            per call. Batches of different sizes (a final partial batch) are trained one by one.
+        """
+        step_name, dtypes = self.FUSED_STEPS[self.training_strategy]
+        fields = list(zip(*batches))
+        if any(len({np.shape(value) for value in field}) > 1 for field in fields):
+            return sum(self.train_batch(batch) for batch in batches)
+
+        with self.timer.phase("conversion"):
+            stacked = [tf.convert_to_tensor(np.stack(field), dtype=dtype) for field, dtype in zip(fields, dtypes)]
+        with self.timer.phase("train_step"):
+            loss = self.fused_function(step_name)(stacked)
+            self.timer.wait(loss)
+        return loss
+
+    def train_batch(self, data):
+        """Function to train on one batch of the generator, returns its loss."""
+        with self.timer.phase("conversion"):
+            step_name, tensors = self.convert_batch(data)
+
+        with self.timer.phase("train_step"):
+            loss = self.run_step(step_name, *tensors)
+            self.timer.wait(loss)
+
+        if self.config.sampling == "cache" and step_name == "train_step_pointwise":
+            h, r, t, y = tensors
+            positive = y.numpy() > 0
+            self.update_negative_cache(h.numpy()[positive], r.numpy()[positive], t.numpy()[positive])
+        elif self.config.sampling == "cache" and step_name == "train_step":
+            self.update_negative_cache(*tensors[:3])
+
+        return loss
+
+    def convert_batch(self, data):
+        """Function to convert a batch of the generator to the tensors of the training step, returns (step_name, tensors)."""
+        if self.training_strategy == "projection_based":
+            h = tf.convert_to_tensor(data[0], dtype=tf.int32)
+            r = tf.convert_to_tensor(data[1], dtype=tf.int32)
+            t = tf.convert_to_tensor(data[2], dtype=tf.int32)
+            hr_t = data[3] # tf.convert_to_tensor(data[3], dtype=tf.float32)
+            rt_h = data[4] # tf.convert_to_tensor(data[4], dtype=tf.float32)
+            return "train_step_projection", [h, r, t, hr_t, rt_h]
+        elif self.training_strategy == "pointwise_based":
+            h = tf.convert_to_tensor(data[0], dtype=tf.int32)
+            r = tf.convert_to_tensor(data[1], dtype=tf.int32)
+            t = tf.convert_to_tensor(data[2], dtype=tf.int32)
+            y = tf.convert_to_tensor(data[3], dtype=tf.float32)
+            return "train_step_pointwise", [h, r, t, y]
+        elif self.training_strategy == "shared_negative_based":
+            ph = tf.convert_to_tensor(data[0], dtype=tf.int32)
+            pr = tf.convert_to_tensor(data[1], dtype=tf.int32)
+            pt = tf.convert_to_tensor(data[2], dtype=tf.int32)
+            neg_pool = tf.convert_to_tensor(data[3], dtype=tf.int32)
+            return "train_step_shared_negatives", [ph, pr, pt, neg_pool]
+        else:
+            ph = tf.convert_to_tensor(data[0], dtype=tf.int32)
+            pr = tf.convert_to_tensor(data[1], dtype=tf.int32)
+            pt = tf.convert_to_tensor(data[2], dtype=tf.int32)
+            nh = tf.convert_to_tensor(data[3], dtype=tf.int32)
+            nr = tf.convert_to_tensor(data[4], dtype=tf.int32)
+            nt = tf.convert_to_tensor(data[5], dtype=tf.int32)
+            return "train_step", [ph, pr, pt, nh, nr, nt]
+
     ''' Testing related functions:'''
 
     def test(self, curr_epoch):
@@ -258,14 +900,20 @@ class Trainer(TrainerMeta):
            
            Args:
                 curr_epoch (int): The current epoch number.
+
+           Returns:
+                bool: True if the model was tested at this epoch.
         """
         if not self.config.full_test_flag and (curr_epoch % self.config.test_step == 0 or
                                                curr_epoch == 0 or
                                                curr_epoch == self.config.epochs - 1):
             self.evaluator.test(curr_epoch)
+            return True
         else:
             if curr_epoch == self.config.epochs - 1:
                 self.evaluator.test(curr_epoch)
+                return True
+        return False
 
 
     ''' Interactive Inference related '''
@@ -338,6 +986,7 @@ class Trainer(TrainerMeta):
         saved_path = self.config.path_tmp / self.model.model_name
         saved_path.mkdir(parents=True, exist_ok=True)
         self.model.save_weights(str(saved_path / 'model.vec'))
+        save_labels(saved_path, self.config)
 
     def load_model(self):
         """Function to load the model."""
@@ -380,10 +1029,7 @@ class Trainer(TrainerMeta):
         idx2rel = self.model.config.knowledge_graph.read_cache_data('idx2relation')
 
 
-        series_ent = pd.Series(idx2ent)
-        series_rel = pd.Series(idx2rel)
-        series_ent.to_pickle(save_path / "ent_labels.pickle")
-        series_rel.to_pickle(save_path / "rel_labels.pickle")
+        save_labels(save_path, self.config)
 
         with open(str(save_path / "ent_labels.tsv"), 'w') as l_export_file:
             for label in idx2ent.values():
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+This module is for warm-starting a training from the parameters of a previous run.
+
+After the knowledge graph is updated, the ids of the entities and the relations change,
+so the rows of the previous tables are aligned through their labels: the previous run
+leaves ent_labels.pickle and rel_labels.pickle (id -> label) next to its parameters,
+which can be
+
+    - the exported embeddings (Trainer.export_embeddings), one <variable>.pickle per table,
+    - the training checkpoints (-cke) or the saved model (Trainer.save_model).
+
+The rows of the entities and relations still in the graph are copied, the new ones keep
+their fresh initialization, and the parameters which are not indexed by entity or
+relation (e.g. the kernels of ConvE) are copied if their shape is unchanged.
+
+Optionally, the training is restricted to the neighbourhood the update touched: the
+training triples within warm_start_hops hops of the new entities and relations, and of
+the new training triples if the previous run left its own (train_triples.npy).
+"""
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+
+from pykg2vec.utils.generator import read_training_triples
+
+# the checkpoint keys of a model variable, for the training checkpoints and the saved weights.
+CHECKPOINT_KEYS = ["model/%s/.ATTRIBUTES/VARIABLE_VALUE", "%s/.ATTRIBUTES/VARIABLE_VALUE"]
+
+
+def save_labels(path, config):
+    """Function to write the labels of the entities and relations, and the training triples, next to parameters."""
+    path.mkdir(parents=True, exist_ok=True)
+    pd.Series(config.knowledge_graph.read_cache_data('idx2entity')).to_pickle(path / "ent_labels.pickle")
+    pd.Series(config.knowledge_graph.read_cache_data('idx2relation')).to_pickle(path / "rel_labels.pickle")
+    np.save(str(path / "train_triples.npy"), read_training_triples(config))
+
+
+class WarmStart:
+    """Class initializing a model from the parameters of a previous run on another version of the knowledge graph.
+
+        Args:
+            config (object): Model configuration object of the new run.
+            path (object): Directory of the previous parameters and their labels.
+
+        Examples:
+            >>> warm_start = WarmStart(config, "../dataset/FB15k/embeddings/TransE")
+            >>> model.def_parameters()
+            >>> warm_start.initialize(model)
+            >>> data = warm_start.touched_triples(read_training_triples(config), hops=1)
+    """
+    def __init__(self, config, path):
+        self.config = config
+        self.path = path
+
+        for name in ["ent_labels.pickle", "rel_labels.pickle"]:
+            if not (path / name).exists():
+                raise FileNotFoundError("%s has no %s to align the previous parameters with, warm start from the exported "
+                                        "embeddings, the training checkpoints or the saved model." % (path, name))
+        old_entities = pd.read_pickle(path / "ent_labels.pickle")
+        old_relations = pd.read_pickle(path / "rel_labels.pickle")
+
+        # the (new ids, old ids) of the entities and relations in both graphs.
+        self.entity_rows = self.align(old_entities, config.knowledge_graph.read_cache_data('idx2entity'))
+        self.relation_rows = self.align(old_relations, config.knowledge_graph.read_cache_data('idx2relation'))
+        self.old_sizes = (len(old_entities), len(old_relations))
+
+        # the previous training triples, in the new ids, if they are known.
+        self.old_triples = None
+        if (path / "train_triples.npy").exists():
+            self.old_triples = self.translate(np.load(str(path / "train_triples.npy")))
+
+        self.reader = None
+        checkpoint = tf.train.latest_checkpoint(str(path))
+        if checkpoint is None and (path / "model.vec.index").exists():
+            checkpoint = str(path / "model.vec")
+        if checkpoint is not None:
+            self.reader = tf.train.load_checkpoint(checkpoint)
+
+    @staticmethod
+    def align(old_labels, new_labels):
+        """Function to get the (new ids, old ids) of the labels of both versions."""
+        old_ids = {label: idx for idx, label in old_labels.items()}
+        pairs = [(idx, old_ids[label]) for idx, label in new_labels.items() if label in old_ids]
+        new_rows = np.asarray([new for new, _ in pairs], dtype=np.int64)
+        old_rows = np.asarray([old for _, old in pairs], dtype=np.int64)
+        return new_rows, old_rows
+
+    def translate(self, old_triples):
+        """Function to map previous triple ids to the new ids, dropping the triples of removed entities or relations."""
+        entity_map = np.full(self.old_sizes[0], -1, dtype=np.int64)
+        entity_map[self.entity_rows[1]] = self.entity_rows[0]
+        relation_map = np.full(self.old_sizes[1], -1, dtype=np.int64)
+        relation_map[self.relation_rows[1]] = self.relation_rows[0]
+        triples = np.stack([entity_map[old_triples[:, 0]], relation_map[old_triples[:, 1]], entity_map[old_triples[:, 2]]], axis=1)
+        return triples[np.all(triples >= 0, axis=1)]
+
+    def triple_keys(self, triples):
+        """Function to encode triples as single integers."""
+        tot_entity, tot_relation = self.config.kg_meta.tot_entity, self.config.kg_meta.tot_relation
+        triples = np.asarray(triples, dtype=np.int64)
+        return (triples[:, 0] * tot_relation + triples[:, 1]) * tot_entity + triples[:, 2]
+
+    def previous_value(self, attribute, variable):
+        """Function to get the previous value of a model variable, None if the previous run has none."""
+        if self.reader is not None:
+            for key in CHECKPOINT_KEYS:
+                if self.reader.has_tensor(key % attribute):
+                    return self.reader.get_tensor(key % attribute)
+            return None
+        table = self.path / ("%s.pickle" % variable.name.split(':')[0])
+        if table.exists():
+            return pd.read_pickle(table).to_numpy()
+        return None
+
+    def initialize(self, model):
+        """Function to assign the aligned previous parameters to the variables of the model.
+
+            Returns:
+                dict: The attribute names of the variables warm-started, and of those left fresh.
+        """
+        tot_entity, tot_relation = self.config.kg_meta.tot_entity, self.config.kg_meta.tot_relation
+        old_entity, old_relation = self.old_sizes
+        report = {"warm": [], "fresh": []}
+
+        for attribute, variable in vars(model).items():
+            if not isinstance(variable, tf.Variable):
+                continue
+            old = self.previous_value(attribute, variable)
+            shape = variable.shape.as_list()
+            if old is None or list(old.shape[1:]) != shape[1:]:
+                report["fresh"].append(attribute)
+                continue
+
+            if shape[0] == tot_entity and old.shape[0] == old_entity:
+                new_rows, old_rows = self.entity_rows
+            elif shape[0] == tot_relation and old.shape[0] == old_relation:
+                new_rows, old_rows = self.relation_rows
+            elif list(old.shape) == shape:
+                new_rows = old_rows = np.arange(shape[0])
+            else:
+                report["fresh"].append(attribute)
+                continue
+
+            value = variable.numpy()
+            value[new_rows] = old[old_rows]
+            variable.assign(value)
+            report["warm"].append(attribute)
+
+        print("Warm-started %s from %s (%d of %d entities, %d of %d relations), fresh: %s." % (
+            ", ".join(report["warm"]), self.path, len(self.entity_rows[0]), tot_entity,
+            len(self.relation_rows[0]), tot_relation, ", ".join(report["fresh"]) or "none"))
+        return report
+
+    def touched_triples(self, data, hops):
+        """Function to get the training triples within hops hops of the new entities and relations.
+
+            The triples of the new relations and the new entities, and the new triples, are
+            one hop away, those sharing an entity with them two hops, and so on.
+
+            Args:
+                data (array): [n, 3] array of the training triple ids.
+                hops (int): Number of hops, at least 1.
+
+            Returns:
+                array: The [m, 3] touched training triples.
+        """
+        new_entities = np.ones(self.config.kg_meta.tot_entity, dtype=bool)
+        new_entities[self.entity_rows[0]] = False
+        new_relations = np.ones(self.config.kg_meta.tot_relation, dtype=bool)
+        new_relations[self.relation_rows[0]] = False
+
+        selected = new_entities[data[:, 0]] | new_entities[data[:, 2]] | new_relations[data[:, 1]]
+        if self.old_triples is not None:
+            selected |= ~np.isin(self.triple_keys(data), self.triple_keys(self.old_triples))
+        for _ in range(hops - 1):
+            touched = np.zeros(self.config.kg_meta.tot_entity, dtype=bool)
+            touched[data[selected][:, [0, 2]].reshape(-1)] = True
+            selected |= touched[data[:, 0]] | touched[data[:, 2]]
+        return data[selected]
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+This module is for the optional XLA compilation of the training and scoring functions.
+
+A function is compiled with jit_compile=True and a static input signature, so that it
+is traced once: the batch dimensions are left unknown and XLA specializes the compiled
+program on the shapes it sees. The functions that cannot be compiled fall back to the
+plain tf.function: the ops without an XLA kernel show up when the function is compiled,
+and some models (ConvE, ConvKB) cannot be traced without knowing the batch size.
+"""
+import tensorflow as tf
+
+
+class CompiledFunction:
+    """Callable running a function compiled with XLA, or the plain tf.function if it cannot be compiled.
+
+        On the first call, the function is traced and converted to XLA without running it
+        (experimental_get_compiler_ir). The tracing errors (ValueError, TypeError) and the
+        ops without an XLA kernel found by the conversion make it fall back for good. Once
+        the conversion succeeded, the function only runs compiled and every error of the
+        computation (e.g. out-of-range ids) is raised as usual.
+
+        Args:
+            function (callable): Python function taking the tensors of the input signature.
+            input_signature (list): tf.TensorSpec of the arguments.
+            name (str): Name of the function, shown when it falls back.
+            fallback (callable): Function to run instead, the plain tf.function of the signature if None.
+
+        Examples:
+            >>> step = CompiledFunction(train_step, [tf.TensorSpec([None], tf.int32)] * 6, "train_step")
+            >>> loss = step(pos_h, pos_r, pos_t, neg_h, neg_r, neg_t)
+    """
+    # the errors of the tracing and of the conversion to XLA, raised before anything runs.
+    COMPILATION_ERRORS = (ValueError, TypeError, tf.errors.InvalidArgumentError, tf.errors.UnimplementedError)
+
+    def __init__(self, function, input_signature, name, fallback=None):
+        self.name = name
+        self.compiled = tf.function(function, input_signature=input_signature, jit_compile=True)
+        self.plain = tf.function(function, input_signature=input_signature) if fallback is None else fallback
+        self.fallback = False
+        self.traced = False
+
+    def __call__(self, *args):
+        if not self.traced and not self.fallback:
+            self.fallback = not self.compiles(*args)
+        if self.fallback:
+            return self.plain(*args)
+        return self.compiled(*args)
+
+    def compiles(self, *args):
+        """Function to check that the function traces and converts to XLA on these arguments, without running it."""
+        try:
+            self.compiled.experimental_get_compiler_ir(*args)(stage="hlo")
+        except self.COMPILATION_ERRORS as error:
+            print("%s cannot be compiled with XLA, it runs without: %s" % (self.name, str(error).strip().splitlines()[0].strip()))
+            return False
+        self.traced = True
+        return True